@@ -15,7 +15,9 @@ CREATE TABLE IF NOT EXISTS PRODUCT (
     P_Name VARCHAR(255) NOT NULL,
     Description TEXT,
     Price DECIMAL(10, 2) NOT NULL,
-    Expiry_Date DATE
+    Expiry_Date DATE,
+    INDEX idx_product_name (P_Name),                          -- Picker: name starts with ...
+    FULLTEXT INDEX ft_product_search (P_Name, Description)    -- Picker: any word starts with ...
 );
 
 CREATE TABLE IF NOT EXISTS WAREHOUSE (
@@ -35,11 +37,72 @@ CREATE TABLE IF NOT EXISTS Inventory (
     FOREIGN KEY (Warehouse_ID) REFERENCES WAREHOUSE(Warehouse_ID) ON DELETE CASCADE
 );
 
+-- Sharded-counter mode for hot SKUs: the stock of each Inventory row of a
+-- listed product lives in Shard_Count sub-rows of Inventory_Shard (its
+-- Inventory.Quantity stays 0), so concurrent orders decrement different
+-- rows instead of queueing on one row lock. Set with ShardInventory.
+CREATE TABLE IF NOT EXISTS Sharded_Product (
+    Product_ID INT PRIMARY KEY,
+    Shard_Count INT NOT NULL,
+    FOREIGN KEY (Product_ID) REFERENCES PRODUCT(Product_ID) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS Inventory_Shard (
+    Product_ID INT NOT NULL,
+    Warehouse_ID INT NOT NULL,
+    Shard_No INT NOT NULL,
+    Inventory_ID INT NOT NULL,
+    Quantity INT NOT NULL,
+    PRIMARY KEY (Product_ID, Warehouse_ID, Shard_No),
+    FOREIGN KEY (Inventory_ID) REFERENCES Inventory(Inventory_ID) ON DELETE CASCADE
+);
+
+-- Per-SKU availability index: stock summed over every warehouse, kept
+-- current by the Inventory triggers in section 4. The shop reads this
+-- instead of aggregating Inventory on every refresh. Sharded stock is not
+-- counted in Total_Quantity (that would recreate the hot row); readers add
+-- the shard sums, and Listed keeps sharded SKUs in the in-stock index.
+CREATE TABLE IF NOT EXISTS Product_Availability (
+    Product_ID INT PRIMARY KEY,
+    Total_Quantity INT NOT NULL DEFAULT 0,
+    Warehouse_Count INT NOT NULL DEFAULT 0, -- Warehouses with stock > 0
+    Shard_Count INT NOT NULL DEFAULT 1,
+    Listed TINYINT AS (Total_Quantity > 0 OR Shard_Count > 1) STORED,
+    INDEX idx_availability_listed (Listed, Product_ID),
+    FOREIGN KEY (Product_ID) REFERENCES PRODUCT(Product_ID) ON DELETE CASCADE
+);
+
+-- Stock per Inventory row whether it is single-row or sharded, for ad-hoc
+-- reads. (The subquery keeps MySQL from merging the view, so the app
+-- inlines the same expression where it looks rows up by key.)
+CREATE OR REPLACE VIEW Inventory_Available AS
+SELECT i.Inventory_ID, i.Product_ID, i.Warehouse_ID,
+       i.Quantity + IFNULL((SELECT SUM(s.Quantity) FROM Inventory_Shard s
+                            WHERE s.Product_ID = i.Product_ID AND s.Warehouse_ID = i.Warehouse_ID), 0) AS Quantity
+FROM Inventory i;
+
+-- Short-lived stock holds for shopping carts: adding to the cart reserves
+-- the units for a few minutes (ReserveStock), so they cannot be sold to
+-- anyone else while the customer checks out. Holds are per SKU across all
+-- warehouses; a hold counts only while Expires_At is in the future, so
+-- expired rows are harmless until ReleaseExpiredReservations deletes them.
+CREATE TABLE IF NOT EXISTS Stock_Reservation (
+    Cart_Token VARCHAR(36) NOT NULL,
+    Product_ID INT NOT NULL,
+    Quantity INT NOT NULL,
+    Expires_At DATETIME NOT NULL,
+    PRIMARY KEY (Cart_Token, Product_ID),
+    INDEX idx_reservation_product (Product_ID, Expires_At),
+    INDEX idx_reservation_expiry (Expires_At),
+    FOREIGN KEY (Product_ID) REFERENCES PRODUCT(Product_ID) ON DELETE CASCADE
+);
+
 CREATE TABLE IF NOT EXISTS DRIVER (
     Driver_ID INT PRIMARY KEY AUTO_INCREMENT,
     D_Name VARCHAR(100) NOT NULL,
     Availability ENUM('Available', 'On-Trip', 'Unavailable') DEFAULT 'Available',
-    Vehicle_no VARCHAR(20)
+    Vehicle_no VARCHAR(20),
+    Location VARCHAR(255) NULL -- Where the driver starts a shift (matched against FLEET.Location)
 );
 
 CREATE TABLE IF NOT EXISTS FLEET (
@@ -58,7 +121,9 @@ CREATE TABLE IF NOT EXISTS CUSTOMER (
     C_Name VARCHAR(100) NOT NULL,
     Email_ID VARCHAR(255) UNIQUE NOT NULL,
     Driver_ID INT,
-    Payment_ID INT
+    Payment_ID INT,
+    INDEX idx_customer_name (C_Name),                         -- Picker prefix search (Email_ID's UNIQUE index serves emails)
+    FULLTEXT INDEX ft_customer_search (C_Name, Email_ID)
 );
 
 CREATE TABLE IF NOT EXISTS `ORDER` (
@@ -67,6 +132,8 @@ CREATE TABLE IF NOT EXISTS `ORDER` (
     Order_Total DECIMAL(10, 2) NOT NULL,
     Warehouse_ID INT,
     Status VARCHAR(50) DEFAULT 'Pending',
+    Driver_ID INT NULL, -- Set by DispatchOrders
+    INDEX idx_order_status (Status, Order_ID), -- Pending-order scans (dispatch)
     FOREIGN KEY (Warehouse_ID) REFERENCES WAREHOUSE(Warehouse_ID) ON DELETE SET NULL
 );
 
@@ -86,6 +153,7 @@ CREATE TABLE IF NOT EXISTS PAYMENT (
     Trans_date DATETIME NOT NULL,
     Status VARCHAR(50) DEFAULT 'Pending',
     Order_ID INT UNIQUE NOT NULL,
+    INDEX idx_payment_trans_date (Trans_date, Order_ID), -- Date-range reports
     FOREIGN KEY (Order_ID) REFERENCES `ORDER`(Order_ID) ON DELETE CASCADE
 );
 
@@ -93,6 +161,8 @@ CREATE TABLE IF NOT EXISTS CUST_ORDER (
     Cust_OrderID INT PRIMARY KEY AUTO_INCREMENT,
     Customer_ID INT,
     Order_ID INT,
+    INDEX idx_cust_order_order (Order_ID, Customer_ID),    -- Order -> customer (reports)
+    INDEX idx_cust_order_customer (Customer_ID, Order_ID), -- Customer -> orders
     FOREIGN KEY (Customer_ID) REFERENCES CUSTOMER(Customer_ID) ON DELETE CASCADE,
     FOREIGN KEY (Order_ID) REFERENCES `ORDER`(Order_ID) ON DELETE CASCADE
 );
@@ -102,9 +172,100 @@ CREATE TABLE IF NOT EXISTS Order_History (
     Order_ID INT,
     Status VARCHAR(50),
     Log_Time DATETIME NOT NULL,
+    INDEX idx_history_order_time (Order_ID, Log_Time), -- One order's history, in order
     FOREIGN KEY (Order_ID) REFERENCES `ORDER`(Order_ID) ON DELETE CASCADE
 );
 
+-- Change log for delta sync: one row per insert/update/delete on the
+-- tables the GUI displays, written by the triggers in section 4.
+CREATE TABLE IF NOT EXISTS Change_Log (
+    Change_ID BIGINT PRIMARY KEY AUTO_INCREMENT,
+    Table_Name VARCHAR(32) NOT NULL,
+    Row_Key VARCHAR(64) NOT NULL,
+    Operation CHAR(1) NOT NULL, -- 'I', 'U' or 'D'
+    Changed_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_change_log_time (Changed_At)
+);
+
+-- Daily sales rollups, kept current by PlaceNewOrder / PlaceOrderBatch and
+-- rebuilt from the order tables by RebuildDailySalesSummary. Revenue is
+-- price x quantity at the time of sale. Warehouse/customer 0 = deleted.
+CREATE TABLE IF NOT EXISTS Daily_Sales_Summary (
+    Sale_Date DATE NOT NULL,
+    Warehouse_ID INT NOT NULL,
+    Orders INT NOT NULL DEFAULT 0,
+    Units INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (Sale_Date, Warehouse_ID)
+);
+
+CREATE TABLE IF NOT EXISTS Daily_Sales_Breakdown (
+    Sale_Date DATE NOT NULL,
+    Warehouse_ID INT NOT NULL,
+    Customer_ID INT NOT NULL,
+    Product_ID INT NOT NULL,
+    Order_Lines INT NOT NULL DEFAULT 0,
+    Units INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (Sale_Date, Warehouse_ID, Customer_ID, Product_ID),
+    INDEX idx_breakdown_product (Product_ID, Sale_Date),
+    INDEX idx_breakdown_customer (Customer_ID, Sale_Date)
+);
+
+-- Cold storage for closed orders, moved out of the hot order tables by
+-- ArchiveClosedOrders so the tables new orders and dispatch work on (and
+-- their indexes) stay small enough to live in the buffer pool. Same
+-- columns as the hot tables; no foreign keys, since the archive only
+-- ever receives whole orders copied in one transaction.
+CREATE TABLE IF NOT EXISTS Archive_Order (
+    Order_ID INT PRIMARY KEY,
+    Items TEXT NULL,
+    Order_Total DECIMAL(10, 2) NOT NULL,
+    Warehouse_ID INT,
+    Status VARCHAR(50),
+    Driver_ID INT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Archive_Order_Items (
+    OrderItem_ID INT PRIMARY KEY,
+    Order_ID INT,
+    Product_ID INT,
+    Quantity INT NOT NULL,
+    INDEX idx_archive_items_order (Order_ID)
+);
+
+CREATE TABLE IF NOT EXISTS Archive_Payment (
+    Payment_ID INT PRIMARY KEY,
+    Payment_mode VARCHAR(50) NOT NULL,
+    Trans_date DATETIME NOT NULL,
+    Status VARCHAR(50),
+    Order_ID INT UNIQUE NOT NULL,
+    INDEX idx_archive_payment_trans_date (Trans_date, Order_ID)
+);
+
+CREATE TABLE IF NOT EXISTS Archive_Cust_Order (
+    Cust_OrderID INT PRIMARY KEY,
+    Customer_ID INT,
+    Order_ID INT,
+    INDEX idx_archive_cust_order_order (Order_ID, Customer_ID),
+    INDEX idx_archive_cust_order_customer (Customer_ID, Order_ID)
+);
+
+CREATE TABLE IF NOT EXISTS Archive_Order_History (
+    History_ID INT PRIMARY KEY,
+    Order_ID INT,
+    Status VARCHAR(50),
+    Log_Time DATETIME NOT NULL,
+    INDEX idx_archive_history_order_time (Order_ID, Log_Time)
+);
+
+-- Latest Trans_date moved to the archive (one row, Id = 1). Reads whose
+-- range starts after it never touch the archive tables.
+CREATE TABLE IF NOT EXISTS Archive_Watermark (
+    Id TINYINT PRIMARY KEY,
+    Archived_Until DATETIME NOT NULL
+);
+
 -- -------------------------------------------------------------------
 -- 3. Required Data & Database Fixes
 -- -------------------------------------------------------------------
@@ -117,6 +278,81 @@ VALUES (1, 'Main Warehouse', 99999);
 ALTER TABLE `ORDER`
 MODIFY COLUMN Items TEXT NULL;
 
+-- Indexes added after the first release. CREATE TABLE above covers fresh
+-- installs; this adds them to existing databases (MySQL has no
+-- CREATE INDEX IF NOT EXISTS).
+DROP PROCEDURE IF EXISTS CreateIndexIfMissing;
+DELIMITER $$
+CREATE PROCEDURE CreateIndexIfMissing(IN p_table VARCHAR(64), IN p_index VARCHAR(64), IN p_columns VARCHAR(255))
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND INDEX_NAME = p_index
+    ) THEN
+        SET @ddl = CONCAT('CREATE INDEX ', p_index, ' ON `', p_table, '` (', p_columns, ')');
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+DELIMITER ;
+
+CALL CreateIndexIfMissing('PAYMENT', 'idx_payment_trans_date', 'Trans_date, Order_ID');
+CALL CreateIndexIfMissing('CUST_ORDER', 'idx_cust_order_order', 'Order_ID, Customer_ID');
+CALL CreateIndexIfMissing('CUST_ORDER', 'idx_cust_order_customer', 'Customer_ID, Order_ID');
+CALL CreateIndexIfMissing('PRODUCT', 'idx_product_name', 'P_Name');
+CALL CreateIndexIfMissing('CUSTOMER', 'idx_customer_name', 'C_Name');
+
+DROP PROCEDURE IF EXISTS CreateFulltextIndexIfMissing;
+DELIMITER $$
+CREATE PROCEDURE CreateFulltextIndexIfMissing(IN p_table VARCHAR(64), IN p_index VARCHAR(64), IN p_columns VARCHAR(255))
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND INDEX_NAME = p_index
+    ) THEN
+        SET @ddl = CONCAT('CREATE FULLTEXT INDEX ', p_index, ' ON `', p_table, '` (', p_columns, ')');
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+DELIMITER ;
+
+CALL CreateFulltextIndexIfMissing('PRODUCT', 'ft_product_search', 'P_Name, Description');
+CALL CreateFulltextIndexIfMissing('CUSTOMER', 'ft_customer_search', 'C_Name, Email_ID');
+
+-- Columns added after the first release, likewise
+DROP PROCEDURE IF EXISTS AddColumnIfMissing;
+DELIMITER $$
+CREATE PROCEDURE AddColumnIfMissing(IN p_table VARCHAR(64), IN p_column VARCHAR(64), IN p_definition VARCHAR(255))
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND COLUMN_NAME = p_column
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE `', p_table, '` ADD COLUMN ', p_column, ' ', p_definition);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+DELIMITER ;
+
+CALL AddColumnIfMissing('DRIVER', 'Location', 'VARCHAR(255) NULL');
+CALL AddColumnIfMissing('ORDER', 'Driver_ID', 'INT NULL');
+CALL CreateIndexIfMissing('ORDER', 'idx_order_status', 'Status, Order_ID');
+CALL CreateIndexIfMissing('Order_History', 'idx_history_order_time', 'Order_ID, Log_Time');
+
+-- (Re)build the availability index from Inventory
+INSERT INTO Product_Availability (Product_ID, Total_Quantity, Warehouse_Count)
+SELECT Product_ID, SUM(Quantity), SUM(Quantity > 0)
+FROM Inventory
+GROUP BY Product_ID
+ON DUPLICATE KEY UPDATE
+    Total_Quantity = VALUES(Total_Quantity),
+    Warehouse_Count = VALUES(Warehouse_Count);
+
 -- -------------------------------------------------------------------
 -- 4. Triggers
 -- -------------------------------------------------------------------
@@ -124,150 +360,1847 @@ MODIFY COLUMN Items TEXT NULL;
 DROP TRIGGER IF EXISTS After_OrderStatusUpdate_Log;
 DROP TRIGGER IF EXISTS After_ProductSale_UpdateInventory; -- Dropped to fix bug
 
+-- Set-based status changes (BulkSetOrderStatus, DispatchOrders) set
+-- @qc_defer_history and write their history in one multi-row INSERT
+-- instead; nothing else should set it.
 DELIMITER $$
 CREATE TRIGGER After_OrderStatusUpdate_Log
 AFTER UPDATE ON `ORDER`
 FOR EACH ROW
 BEGIN
-    IF OLD.Status <> NEW.Status THEN
+    IF OLD.Status <> NEW.Status AND @qc_defer_history IS NULL THEN
         INSERT INTO Order_History (Order_ID, Status, Log_Time)
         VALUES (NEW.Order_ID, NEW.Status, NOW());
     END IF;
 END$$
 DELIMITER ;
 
+-- Change-tracking triggers (delta sync). Note that rows removed by an
+-- ON DELETE CASCADE do not fire triggers; clients resync on a parent delete.
+DROP TRIGGER IF EXISTS After_ProductInsert_ChangeLog;
+DROP TRIGGER IF EXISTS After_ProductUpdate_ChangeLog;
+DROP TRIGGER IF EXISTS After_ProductDelete_ChangeLog;
+DROP TRIGGER IF EXISTS After_InventoryInsert_ChangeLog;
+DROP TRIGGER IF EXISTS After_InventoryUpdate_ChangeLog;
+DROP TRIGGER IF EXISTS After_InventoryDelete_ChangeLog;
+DROP TRIGGER IF EXISTS After_DriverInsert_ChangeLog;
+DROP TRIGGER IF EXISTS After_DriverUpdate_ChangeLog;
+DROP TRIGGER IF EXISTS After_DriverDelete_ChangeLog;
+DROP TRIGGER IF EXISTS After_FleetInsert_ChangeLog;
+DROP TRIGGER IF EXISTS After_FleetUpdate_ChangeLog;
+DROP TRIGGER IF EXISTS After_FleetDelete_ChangeLog;
+DROP TRIGGER IF EXISTS After_CustomerInsert_ChangeLog;
+DROP TRIGGER IF EXISTS After_CustomerUpdate_ChangeLog;
+DROP TRIGGER IF EXISTS After_CustomerDelete_ChangeLog;
+DROP TRIGGER IF EXISTS After_InventoryInsert_Availability;
+DROP TRIGGER IF EXISTS After_InventoryUpdate_Availability;
+DROP TRIGGER IF EXISTS After_InventoryDelete_Availability;
+DROP TRIGGER IF EXISTS After_InventoryShardInsert_ChangeLog;
+DROP TRIGGER IF EXISTS After_InventoryShardUpdate_ChangeLog;
+DROP TRIGGER IF EXISTS After_ReservationInsert_ChangeLog;
+DROP TRIGGER IF EXISTS After_ReservationUpdate_ChangeLog;
+DROP TRIGGER IF EXISTS After_ReservationDelete_ChangeLog;
+
+DELIMITER $$
+CREATE TRIGGER After_ProductInsert_ChangeLog
+AFTER INSERT ON PRODUCT
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('PRODUCT', NEW.Product_ID, 'I');
+END$$
+
+CREATE TRIGGER After_ProductUpdate_ChangeLog
+AFTER UPDATE ON PRODUCT
+FOR EACH ROW
+BEGIN
+    IF OLD.Product_ID <> NEW.Product_ID THEN
+        INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+        VALUES ('PRODUCT', OLD.Product_ID, 'D');
+    END IF;
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('PRODUCT', NEW.Product_ID, 'U');
+END$$
+
+CREATE TRIGGER After_ProductDelete_ChangeLog
+AFTER DELETE ON PRODUCT
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('PRODUCT', OLD.Product_ID, 'D');
+END$$
+
+CREATE TRIGGER After_InventoryInsert_ChangeLog
+AFTER INSERT ON Inventory
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('Inventory', NEW.Inventory_ID, 'I');
+END$$
+
+CREATE TRIGGER After_InventoryUpdate_ChangeLog
+AFTER UPDATE ON Inventory
+FOR EACH ROW
+BEGIN
+    IF OLD.Inventory_ID <> NEW.Inventory_ID THEN
+        INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+        VALUES ('Inventory', OLD.Inventory_ID, 'D');
+    END IF;
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('Inventory', NEW.Inventory_ID, 'U');
+END$$
+
+CREATE TRIGGER After_InventoryDelete_ChangeLog
+AFTER DELETE ON Inventory
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('Inventory', OLD.Inventory_ID, 'D');
+END$$
+
+CREATE TRIGGER After_DriverInsert_ChangeLog
+AFTER INSERT ON DRIVER
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('DRIVER', NEW.Driver_ID, 'I');
+END$$
+
+CREATE TRIGGER After_DriverUpdate_ChangeLog
+AFTER UPDATE ON DRIVER
+FOR EACH ROW
+BEGIN
+    IF OLD.Driver_ID <> NEW.Driver_ID THEN
+        INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+        VALUES ('DRIVER', OLD.Driver_ID, 'D');
+    END IF;
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('DRIVER', NEW.Driver_ID, 'U');
+END$$
+
+CREATE TRIGGER After_DriverDelete_ChangeLog
+AFTER DELETE ON DRIVER
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('DRIVER', OLD.Driver_ID, 'D');
+END$$
+
+CREATE TRIGGER After_FleetInsert_ChangeLog
+AFTER INSERT ON FLEET
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('FLEET', NEW.Vehicle_no, 'I');
+END$$
+
+CREATE TRIGGER After_FleetUpdate_ChangeLog
+AFTER UPDATE ON FLEET
+FOR EACH ROW
+BEGIN
+    IF OLD.Vehicle_no <> NEW.Vehicle_no THEN
+        INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+        VALUES ('FLEET', OLD.Vehicle_no, 'D');
+    END IF;
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('FLEET', NEW.Vehicle_no, 'U');
+END$$
+
+CREATE TRIGGER After_FleetDelete_ChangeLog
+AFTER DELETE ON FLEET
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('FLEET', OLD.Vehicle_no, 'D');
+END$$
+
+CREATE TRIGGER After_CustomerInsert_ChangeLog
+AFTER INSERT ON CUSTOMER
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('CUSTOMER', NEW.Customer_ID, 'I');
+END$$
+
+CREATE TRIGGER After_CustomerUpdate_ChangeLog
+AFTER UPDATE ON CUSTOMER
+FOR EACH ROW
+BEGIN
+    IF OLD.Customer_ID <> NEW.Customer_ID THEN
+        INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+        VALUES ('CUSTOMER', OLD.Customer_ID, 'D');
+    END IF;
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('CUSTOMER', NEW.Customer_ID, 'U');
+END$$
+
+CREATE TRIGGER After_CustomerDelete_ChangeLog
+AFTER DELETE ON CUSTOMER
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('CUSTOMER', OLD.Customer_ID, 'D');
+END$$
+
+-- Availability index maintenance (Product_Availability)
+CREATE TRIGGER After_InventoryInsert_Availability
+AFTER INSERT ON Inventory
+FOR EACH ROW
+BEGIN
+    INSERT INTO Product_Availability (Product_ID, Total_Quantity, Warehouse_Count)
+    VALUES (NEW.Product_ID, NEW.Quantity, NEW.Quantity > 0)
+    ON DUPLICATE KEY UPDATE
+        Total_Quantity = Total_Quantity + VALUES(Total_Quantity),
+        Warehouse_Count = Warehouse_Count + VALUES(Warehouse_Count);
+END$$
+
+CREATE TRIGGER After_InventoryUpdate_Availability
+AFTER UPDATE ON Inventory
+FOR EACH ROW
+BEGIN
+    IF OLD.Product_ID = NEW.Product_ID THEN
+        UPDATE Product_Availability
+        SET Total_Quantity = Total_Quantity - OLD.Quantity + NEW.Quantity,
+            Warehouse_Count = Warehouse_Count - (OLD.Quantity > 0) + (NEW.Quantity > 0)
+        WHERE Product_ID = NEW.Product_ID;
+    ELSE
+        UPDATE Product_Availability
+        SET Total_Quantity = Total_Quantity - OLD.Quantity,
+            Warehouse_Count = Warehouse_Count - (OLD.Quantity > 0)
+        WHERE Product_ID = OLD.Product_ID;
+        INSERT INTO Product_Availability (Product_ID, Total_Quantity, Warehouse_Count)
+        VALUES (NEW.Product_ID, NEW.Quantity, NEW.Quantity > 0)
+        ON DUPLICATE KEY UPDATE
+            Total_Quantity = Total_Quantity + VALUES(Total_Quantity),
+            Warehouse_Count = Warehouse_Count + VALUES(Warehouse_Count);
+    END IF;
+END$$
+
+CREATE TRIGGER After_InventoryDelete_Availability
+AFTER DELETE ON Inventory
+FOR EACH ROW
+BEGIN
+    UPDATE Product_Availability
+    SET Total_Quantity = Total_Quantity - OLD.Quantity,
+        Warehouse_Count = Warehouse_Count - (OLD.Quantity > 0)
+    WHERE Product_ID = OLD.Product_ID;
+END$$
+
+-- Shard changes are reported as changes to their Inventory row
+CREATE TRIGGER After_InventoryShardInsert_ChangeLog
+AFTER INSERT ON Inventory_Shard
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('Inventory', NEW.Inventory_ID, 'U');
+END$$
+
+CREATE TRIGGER After_InventoryShardUpdate_ChangeLog
+AFTER UPDATE ON Inventory_Shard
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('Inventory', NEW.Inventory_ID, 'U');
+END$$
+
+-- Holds change the stock the shop shows, so they are logged per product
+CREATE TRIGGER After_ReservationInsert_ChangeLog
+AFTER INSERT ON Stock_Reservation
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('Stock_Reservation', NEW.Product_ID, 'U');
+END$$
+
+CREATE TRIGGER After_ReservationUpdate_ChangeLog
+AFTER UPDATE ON Stock_Reservation
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Quantity <=> OLD.Quantity) THEN
+        INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+        VALUES ('Stock_Reservation', NEW.Product_ID, 'U');
+    END IF;
+END$$
+
+CREATE TRIGGER After_ReservationDelete_ChangeLog
+AFTER DELETE ON Stock_Reservation
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Row_Key, Operation)
+    VALUES ('Stock_Reservation', OLD.Product_ID, 'U');
+END$$
+DELIMITER ;
+
 -- -------------------------------------------------------------------
 -- 5. Stored Procedures
 -- -------------------------------------------------------------------
 
+DROP PROCEDURE IF EXISTS TakeFromShards;
 DROP PROCEDURE IF EXISTS PlaceNewOrder;
+DROP PROCEDURE IF EXISTS PlaceOrderBatch;
 DROP PROCEDURE IF EXISTS AssignDriverToVehicle;
+DROP PROCEDURE IF EXISTS AssignDriversBatch;
+DROP PROCEDURE IF EXISTS DispatchOrders;
+DROP PROCEDURE IF EXISTS BulkSetOrderStatus;
+DROP PROCEDURE IF EXISTS ArchiveClosedOrders;
 DROP PROCEDURE IF EXISTS GenerateSalesReport;
+DROP PROCEDURE IF EXISTS GenerateSalesSummary;
+DROP PROCEDURE IF EXISTS RebuildDailySalesSummary;
+DROP PROCEDURE IF EXISTS PruneChangeLog;
+DROP PROCEDURE IF EXISTS SpreadShards;
+DROP PROCEDURE IF EXISTS ShardInventory;
+DROP PROCEDURE IF EXISTS RestockInventory;
+DROP PROCEDURE IF EXISTS ReserveStock;
+DROP PROCEDURE IF EXISTS ReleaseStock;
+DROP PROCEDURE IF EXISTS ReleaseExpiredReservations;
+DROP PROCEDURE IF EXISTS MergeProductImport;
+DROP PROCEDURE IF EXISTS MergeInventoryImport;
+
+-- Procedure: TakeFromShards
+-- Internal helper for the order procedures: takes p_quantity of a sharded
+-- SKU from its fullest shards (in one warehouse, or any when
+-- p_warehouseID is NULL) and records each take in tmp_shard_take. The
+-- caller must already hold the shard locks and own the transaction.
+DELIMITER $$
+CREATE PROCEDURE TakeFromShards(IN p_productID INT, IN p_warehouseID INT, IN p_quantity INT)
+BEGIN
+    DECLARE remaining INT DEFAULT p_quantity;
+    DECLARE take_warehouse INT;
+    DECLARE take_shard INT;
+    DECLARE take_qty INT;
+
+    WHILE remaining > 0 DO
+        SET take_warehouse = NULL;
+        SELECT s.Warehouse_ID, s.Shard_No, LEAST(s.Quantity, remaining)
+        INTO take_warehouse, take_shard, take_qty
+        FROM Inventory_Shard s
+        WHERE s.Product_ID = p_productID AND s.Quantity > 0
+          AND (p_warehouseID IS NULL OR s.Warehouse_ID = p_warehouseID)
+        ORDER BY s.Quantity DESC, s.Warehouse_ID, s.Shard_No
+        LIMIT 1
+        FOR UPDATE;
+
+        IF take_warehouse IS NULL THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Not enough stock for one or more items.';
+        END IF;
+
+        UPDATE Inventory_Shard SET Quantity = Quantity - take_qty
+        WHERE Product_ID = p_productID AND Warehouse_ID = take_warehouse AND Shard_No = take_shard;
+
+        INSERT INTO tmp_shard_take (Product_ID, Warehouse_ID, Quantity)
+        VALUES (p_productID, take_warehouse, take_qty)
+        ON DUPLICATE KEY UPDATE Quantity = Quantity + VALUES(Quantity);
+
+        SET remaining = remaining - take_qty;
+    END WHILE;
+END$$
+DELIMITER ;
 
 -- Procedure: PlaceNewOrder
+-- Set-based: the cart is parsed once with JSON_TABLE, every stock row is
+-- locked in one SELECT ... FOR UPDATE, and items, stock and total are each
+-- handled by a single statement, so the work per order no longer grows
+-- with the number of items.
+-- With p_warehouseID NULL the order is routed: the lowest-numbered
+-- warehouse that can fill the whole cart gets it; otherwise each line is
+-- taken from the warehouses holding the most of it and the order is split
+-- into one ORDER per warehouse. Returns (Order_ID, Warehouse_ID, Order_Total)
+-- for every order created.
+-- Sharded SKUs (Sharded_Product) never lock their Inventory row: each line
+-- claims one random shard that can cover it with SKIP LOCKED, and only
+-- when no free shard can does it wait for all of the SKU's shards.
+-- Stock held for other carts (Stock_Reservation) is not for sale; the
+-- holds of p_cartToken are the customer's own and are used up by the order.
 DELIMITER $$
 CREATE PROCEDURE PlaceNewOrder(
     IN p_customerID INT,
     IN p_warehouseID INT,
-    IN p_cart_json JSON
+    IN p_cart_json JSON,
+    IN p_cartToken VARCHAR(36)
 )
 BEGIN
-    DECLARE new_orderID INT;
-    DECLARE order_total DECIMAL(10, 2) DEFAULT 0.00;
-    DECLARE i INT DEFAULT 0;
-    DECLARE num_items INT;
-    DECLARE p_id INT;
-    DECLARE p_qty INT;
-    DECLARE current_stock INT;
-    
+    DECLARE cart_lines INT;
+    DECLARE row_lines INT;
+    DECLARE locked_rows INT;
+    DECLARE short_lines INT;
+    DECLARE chosen_warehouse INT DEFAULT NULL;
+    DECLARE next_warehouse INT;
+    DECLARE line_product INT;
+    DECLARE line_qty INT;
+    DECLARE pick_warehouse INT;
+    DECLARE pick_shard INT;
+    DECLARE claimed_shard INT;
+    DECLARE sale_time DATETIME DEFAULT NOW();
+
     DECLARE EXIT HANDLER FOR SQLEXCEPTION
     BEGIN
         ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS tmp_cart, tmp_alloc, tmp_split, tmp_shard_take, tmp_shard_tried;
         RESIGNAL;
     END;
 
-    SET num_items = JSON_LENGTH(p_cart_json);
+    -- 1. Parse the cart once (the same product added twice becomes one line)
+    DROP TEMPORARY TABLE IF EXISTS tmp_cart, tmp_alloc, tmp_split, tmp_shard_take, tmp_shard_tried;
+    CREATE TEMPORARY TABLE tmp_cart (
+        Product_ID INT PRIMARY KEY,
+        Quantity INT NOT NULL,
+        Sharded TINYINT NOT NULL DEFAULT 0
+    );
+    CREATE TEMPORARY TABLE tmp_alloc (
+        Product_ID INT NOT NULL,
+        Warehouse_ID INT NOT NULL,
+        Quantity INT NOT NULL,
+        PRIMARY KEY (Product_ID, Warehouse_ID)
+    );
+    CREATE TEMPORARY TABLE tmp_split (
+        Warehouse_ID INT PRIMARY KEY,
+        Order_ID INT NULL,
+        Units INT NOT NULL,
+        Order_Total DECIMAL(10, 2) NOT NULL
+    );
+    CREATE TEMPORARY TABLE tmp_shard_take (
+        Product_ID INT NOT NULL,
+        Warehouse_ID INT NOT NULL,
+        Quantity INT NOT NULL,
+        PRIMARY KEY (Product_ID, Warehouse_ID)
+    );
+    CREATE TEMPORARY TABLE tmp_shard_tried (
+        Warehouse_ID INT NOT NULL,
+        Shard_No INT NOT NULL,
+        PRIMARY KEY (Warehouse_ID, Shard_No)
+    );
+    INSERT INTO tmp_cart (Product_ID, Quantity)
+    SELECT jt.product_id, SUM(jt.quantity)
+    FROM JSON_TABLE(p_cart_json, '$[*]' COLUMNS (
+        product_id INT PATH '$.product_id' ERROR ON EMPTY,
+        quantity INT PATH '$.quantity' ERROR ON EMPTY
+    )) AS jt
+    GROUP BY jt.product_id;
+
+    SELECT COUNT(*) INTO cart_lines FROM tmp_cart;
+    IF cart_lines = 0 OR EXISTS (SELECT 1 FROM tmp_cart WHERE Quantity <= 0) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cart is empty or has an invalid quantity.';
+    END IF;
+
     START TRANSACTION;
 
-    -- 1. Check stock
-    WHILE i < num_items DO
-        SET p_id = JSON_UNQUOTE(JSON_EXTRACT(p_cart_json, CONCAT('$[', i, '].product_id')));
-        SET p_qty = JSON_UNQUOTE(JSON_EXTRACT(p_cart_json, CONCAT('$[', i, '].quantity')));
+    -- 2. Share-lock the shard settings of the cart's SKUs so none is
+    -- re-sharded mid-order (shared locks do not block other orders)
+    SELECT COUNT(*) INTO locked_rows
+    FROM tmp_cart c
+    STRAIGHT_JOIN Sharded_Product k ON k.Product_ID = c.Product_ID
+    FOR SHARE;
 
-        SELECT Quantity INTO current_stock FROM Inventory 
-        WHERE Product_ID = p_id AND Warehouse_ID = 1; -- Using hardcoded WH 1
-        
-        IF current_stock IS NULL OR current_stock < p_qty THEN
-            ROLLBACK;
-            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Not enough stock for one or more items.';
+    UPDATE tmp_cart c
+    JOIN Sharded_Product k ON k.Product_ID = c.Product_ID
+    SET c.Sharded = 1;
+
+    SELECT COUNT(*) INTO row_lines FROM tmp_cart WHERE Sharded = 0;
+
+    -- 3. Lock every candidate stock row of the single-row SKUs in one
+    -- statement. STRAIGHT_JOIN walks tmp_cart in Product_ID order and the
+    -- Inventory key is (Product_ID, Warehouse_ID), so concurrent orders
+    -- always lock rows in the same order and cannot deadlock each other.
+    IF p_warehouseID IS NULL THEN
+        SELECT COUNT(*) INTO locked_rows
+        FROM tmp_cart c
+        STRAIGHT_JOIN Inventory i ON i.Product_ID = c.Product_ID
+        WHERE c.Sharded = 0
+        FOR UPDATE;
+    ELSE
+        SELECT COUNT(*) INTO locked_rows
+        FROM tmp_cart c
+        STRAIGHT_JOIN Inventory i ON i.Product_ID = c.Product_ID AND i.Warehouse_ID = p_warehouseID
+        WHERE c.Sharded = 0
+        FOR UPDATE;
+    END IF;
+
+    -- 4. Check stock under the lock (summed over warehouses when routing)
+    SELECT COUNT(*) INTO short_lines
+    FROM tmp_cart c
+    WHERE c.Sharded = 0 AND c.Quantity > (
+        SELECT IFNULL(SUM(i.Quantity), 0) FROM Inventory i
+        WHERE i.Product_ID = c.Product_ID
+          AND (p_warehouseID IS NULL OR i.Warehouse_ID = p_warehouseID)
+    );
+
+    IF short_lines > 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Not enough stock for one or more items.';
+    END IF;
+
+    -- Units held for other carts count as sold. Holds are read without
+    -- locking so checkouts never queue behind add-to-cart calls.
+    SELECT COUNT(*) INTO short_lines
+    FROM tmp_cart c
+    LEFT JOIN Product_Availability a ON a.Product_ID = c.Product_ID
+    WHERE c.Quantity > IFNULL(a.Total_Quantity, 0)
+        + IFNULL((SELECT SUM(s.Quantity) FROM Inventory_Shard s WHERE s.Product_ID = c.Product_ID), 0)
+        - IFNULL((SELECT SUM(r.Quantity) FROM Stock_Reservation r
+                  WHERE r.Product_ID = c.Product_ID AND r.Expires_At > NOW()
+                    AND NOT (r.Cart_Token <=> p_cartToken)), 0);
+
+    IF short_lines > 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Not enough stock for one or more items (some is held in other carts).';
+    END IF;
+
+    -- 5. Decide where every single-row line ships from
+    IF p_warehouseID IS NULL THEN
+        SELECT i.Warehouse_ID INTO chosen_warehouse
+        FROM tmp_cart c
+        JOIN Inventory i ON i.Product_ID = c.Product_ID AND i.Quantity >= c.Quantity
+        WHERE c.Sharded = 0
+        GROUP BY i.Warehouse_ID
+        HAVING COUNT(*) = row_lines
+        ORDER BY i.Warehouse_ID
+        LIMIT 1;
+    ELSE
+        SET chosen_warehouse = p_warehouseID;
+    END IF;
+
+    IF chosen_warehouse IS NOT NULL THEN
+        INSERT INTO tmp_alloc (Product_ID, Warehouse_ID, Quantity)
+        SELECT c.Product_ID, chosen_warehouse, c.Quantity FROM tmp_cart c WHERE c.Sharded = 0;
+    ELSE
+        -- No single warehouse can fill the cart: take each line from the
+        -- warehouses with the most stock first, until the quantity is covered
+        INSERT INTO tmp_alloc (Product_ID, Warehouse_ID, Quantity)
+        SELECT s.Product_ID, s.Warehouse_ID, LEAST(s.Quantity, s.Wanted - (s.Running - s.Quantity))
+        FROM (
+            SELECT i.Product_ID, i.Warehouse_ID, i.Quantity, c.Quantity AS Wanted,
+                   SUM(i.Quantity) OVER (PARTITION BY i.Product_ID
+                                         ORDER BY i.Quantity DESC, i.Warehouse_ID) AS Running
+            FROM tmp_cart c
+            JOIN Inventory i ON i.Product_ID = c.Product_ID
+            WHERE c.Sharded = 0 AND i.Quantity > 0
+        ) s
+        WHERE s.Running - s.Quantity < s.Wanted;
+    END IF;
+
+    -- 6. Sharded lines, in Product_ID order: claim one free shard that can
+    -- cover the line, trying shards in random order; if none can, wait for
+    -- all of the SKU's shards and take from the fullest ones.
+    SET line_product = (SELECT MIN(Product_ID) FROM tmp_cart WHERE Sharded = 1);
+    WHILE line_product IS NOT NULL DO
+        SET line_qty = (SELECT Quantity FROM tmp_cart WHERE Product_ID = line_product);
+        SET claimed_shard = NULL;
+        DELETE FROM tmp_shard_tried;
+
+        shard_search: LOOP
+            -- Candidates come from a plain (non-locking) read and are
+            -- re-checked under the row lock below
+            SET pick_warehouse = NULL;
+            SELECT s.Warehouse_ID, s.Shard_No INTO pick_warehouse, pick_shard
+            FROM Inventory_Shard s
+            LEFT JOIN tmp_shard_tried t ON t.Warehouse_ID = s.Warehouse_ID AND t.Shard_No = s.Shard_No
+            WHERE s.Product_ID = line_product AND s.Quantity >= line_qty AND t.Shard_No IS NULL
+              AND (p_warehouseID IS NULL OR s.Warehouse_ID = p_warehouseID)
+            ORDER BY RAND()
+            LIMIT 1;
+
+            IF pick_warehouse IS NULL THEN
+                LEAVE shard_search;
+            END IF;
+            INSERT INTO tmp_shard_tried (Warehouse_ID, Shard_No) VALUES (pick_warehouse, pick_shard);
+
+            SELECT s.Shard_No INTO claimed_shard
+            FROM Inventory_Shard s
+            WHERE s.Product_ID = line_product AND s.Warehouse_ID = pick_warehouse AND s.Shard_No = pick_shard
+              AND s.Quantity >= line_qty
+            FOR UPDATE SKIP LOCKED;
+
+            IF claimed_shard IS NOT NULL THEN
+                UPDATE Inventory_Shard SET Quantity = Quantity - line_qty
+                WHERE Product_ID = line_product AND Warehouse_ID = pick_warehouse AND Shard_No = claimed_shard;
+
+                INSERT INTO tmp_shard_take (Product_ID, Warehouse_ID, Quantity)
+                VALUES (line_product, pick_warehouse, line_qty);
+                LEAVE shard_search;
+            END IF;
+        END LOOP;
+
+        IF claimed_shard IS NULL THEN
+            SELECT COUNT(*) INTO locked_rows
+            FROM Inventory_Shard s
+            WHERE s.Product_ID = line_product
+              AND (p_warehouseID IS NULL OR s.Warehouse_ID = p_warehouseID)
+            FOR UPDATE;
+
+            CALL TakeFromShards(line_product, p_warehouseID, line_qty);
         END IF;
-        SET i = i + 1;
+
+        SET line_product = (SELECT MIN(Product_ID) FROM tmp_cart WHERE Sharded = 1 AND Product_ID > line_product);
     END WHILE;
-    
-    -- 2. Create order
-    INSERT INTO `ORDER` (Warehouse_ID, Status, Order_Total) 
-    VALUES (1, 'Pending', 0.00); -- Using hardcoded WH 1
-    
-    SET new_orderID = LAST_INSERT_ID();
-
-    -- 3. Link customer
-    INSERT INTO CUST_ORDER (Customer_ID, Order_ID) VALUES (p_customerID, new_orderID);
-
-    -- 4. Add items, update inventory, calculate total
-    SET i = 0;
-    WHILE i < num_items DO
-        SET p_id = JSON_UNQUOTE(JSON_EXTRACT(p_cart_json, CONCAT('$[', i, '].product_id')));
-        SET p_qty = JSON_UNQUOTE(JSON_EXTRACT(p_cart_json, CONCAT('$[', i, '].quantity')));
-
-        INSERT INTO ORDER_ITEMS (Order_ID, Product_ID, Quantity) 
-        VALUES (new_orderID, p_id, p_qty);
-
-        UPDATE Inventory SET Quantity = Quantity - p_qty 
-        WHERE Product_ID = p_id AND Warehouse_ID = 1; -- Using hardcoded WH 1
-
-        SELECT order_total + (p.Price * p_qty) INTO order_total 
-        FROM PRODUCT p WHERE p.Product_ID = p_id;
-        
-        SET i = i + 1;
+
+    INSERT INTO tmp_alloc (Product_ID, Warehouse_ID, Quantity)
+    SELECT t.Product_ID, t.Warehouse_ID, t.Quantity FROM tmp_shard_take t;
+
+    -- 7. One order per warehouse, totals from one join
+    INSERT INTO tmp_split (Warehouse_ID, Units, Order_Total)
+    SELECT a.Warehouse_ID, SUM(a.Quantity), SUM(p.Price * a.Quantity)
+    FROM tmp_alloc a
+    JOIN PRODUCT p ON p.Product_ID = a.Product_ID
+    GROUP BY a.Warehouse_ID;
+
+    SELECT MIN(Warehouse_ID) INTO next_warehouse FROM tmp_split;
+    WHILE next_warehouse IS NOT NULL DO
+        INSERT INTO `ORDER` (Warehouse_ID, Status, Order_Total)
+        SELECT Warehouse_ID, 'Pending', Order_Total FROM tmp_split WHERE Warehouse_ID = next_warehouse;
+
+        UPDATE tmp_split SET Order_ID = LAST_INSERT_ID() WHERE Warehouse_ID = next_warehouse;
+
+        SET next_warehouse = (SELECT MIN(Warehouse_ID) FROM tmp_split WHERE Warehouse_ID > next_warehouse);
     END WHILE;
-    
-    -- 5. Update order total
-    UPDATE `ORDER` SET Order_Total = order_total WHERE Order_ID = new_orderID;
 
-    -- 6. Create payment record
+    INSERT INTO CUST_ORDER (Customer_ID, Order_ID)
+    SELECT p_customerID, s.Order_ID FROM tmp_split s;
+
+    -- 8. Add all items and decrement the single-row stock (shards were
+    -- decremented as they were claimed)
+    INSERT INTO ORDER_ITEMS (Order_ID, Product_ID, Quantity)
+    SELECT s.Order_ID, a.Product_ID, a.Quantity
+    FROM tmp_alloc a
+    JOIN tmp_split s ON s.Warehouse_ID = a.Warehouse_ID
+    ORDER BY s.Order_ID, a.Product_ID;
+
+    UPDATE Inventory i
+    JOIN tmp_alloc a ON a.Product_ID = i.Product_ID AND a.Warehouse_ID = i.Warehouse_ID
+    JOIN tmp_cart c ON c.Product_ID = a.Product_ID
+    SET i.Quantity = i.Quantity - a.Quantity
+    WHERE c.Sharded = 0;
+
+    -- 9. Create payment records
     INSERT INTO PAYMENT (Payment_mode, Trans_date, Status, Order_ID)
-    VALUES ('Pending', NOW(), 'Awaiting Payment', new_orderID);
+    SELECT 'Pending', sale_time, 'Awaiting Payment', s.Order_ID FROM tmp_split s;
+
+    -- 10. Roll the sale into the daily summaries
+    INSERT INTO Daily_Sales_Summary (Sale_Date, Warehouse_ID, Orders, Units, Revenue)
+    SELECT DATE(sale_time), s.Warehouse_ID, 1, s.Units, s.Order_Total
+    FROM tmp_split s
+    ON DUPLICATE KEY UPDATE
+        Orders = Orders + VALUES(Orders),
+        Units = Units + VALUES(Units),
+        Revenue = Revenue + VALUES(Revenue);
+
+    INSERT INTO Daily_Sales_Breakdown (Sale_Date, Warehouse_ID, Customer_ID, Product_ID, Order_Lines, Units, Revenue)
+    SELECT DATE(sale_time), a.Warehouse_ID, p_customerID, a.Product_ID, 1, a.Quantity, p.Price * a.Quantity
+    FROM tmp_alloc a
+    JOIN PRODUCT p ON p.Product_ID = a.Product_ID
+    ON DUPLICATE KEY UPDATE
+        Order_Lines = Order_Lines + VALUES(Order_Lines),
+        Units = Units + VALUES(Units),
+        Revenue = Revenue + VALUES(Revenue);
+
+    -- 11. The cart's holds have become the order
+    IF p_cartToken IS NOT NULL THEN
+        DELETE FROM Stock_Reservation WHERE Cart_Token = p_cartToken;
+    END IF;
 
     COMMIT;
+
+    SELECT Order_ID, Warehouse_ID, Order_Total FROM tmp_split ORDER BY Order_ID;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_cart, tmp_alloc, tmp_split, tmp_shard_take, tmp_shard_tried;
 END$$
 DELIMITER ;
 
--- Procedure: AssignDriverToVehicle
+-- Procedure: PlaceOrderBatch
+-- Places a group of orders in one call and one transaction. Each order is
+-- accepted or rejected on its own (unknown customer, empty cart or not enough
+-- stock), so one bad cart does not sink the rest. Stock for the whole group
+-- is locked once and allocated to orders in the order given. Returns one
+-- result row per order. Sharded SKUs are locked shard by shard and the
+-- units sold are taken from their fullest shards.
+-- p_orders_json: [{"customer_id": 1, "warehouse_id": 1, "items": [{"product_id": 2, "quantity": 3}, ...]}, ...]
 DELIMITER $$
-CREATE PROCEDURE AssignDriverToVehicle(
-    IN p_driverID INT,
-    IN p_vehicleNo VARCHAR(20)
-)
+CREATE PROCEDURE PlaceOrderBatch(IN p_orders_json JSON)
 BEGIN
+    DECLARE order_count INT;
+    DECLARE n INT DEFAULT 1;
+    DECLARE locked_lines INT;
+    DECLARE short_lines INT;
+    DECLARE sold_product INT;
+    DECLARE sold_warehouse INT;
+    DECLARE sold_qty INT;
+    DECLARE sale_time DATETIME DEFAULT NOW();
+
     DECLARE EXIT HANDLER FOR SQLEXCEPTION
     BEGIN
         ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS tmp_batch_orders, tmp_batch_lines, tmp_batch_stock, tmp_batch_free, tmp_shard_take;
         RESIGNAL;
     END;
 
+    -- 1. Parse the batch once
+    DROP TEMPORARY TABLE IF EXISTS tmp_batch_orders, tmp_batch_lines, tmp_batch_stock, tmp_batch_free, tmp_shard_take;
+    CREATE TEMPORARY TABLE tmp_batch_orders (
+        Order_No INT PRIMARY KEY,
+        Customer_ID INT,
+        Warehouse_ID INT NOT NULL,
+        Order_Total DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+        Status VARCHAR(10) NOT NULL DEFAULT 'Pending',
+        Order_ID INT NULL,
+        Message VARCHAR(255) NULL
+    );
+    CREATE TEMPORARY TABLE tmp_batch_lines (
+        Order_No INT NOT NULL,
+        Warehouse_ID INT NOT NULL,
+        Product_ID INT NOT NULL,
+        Quantity INT NOT NULL,
+        PRIMARY KEY (Order_No, Product_ID)
+    );
+    CREATE TEMPORARY TABLE tmp_batch_stock (
+        Warehouse_ID INT NOT NULL,
+        Product_ID INT NOT NULL,
+        Available INT NULL,
+        Stocked INT NULL,
+        Sharded TINYINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (Product_ID, Warehouse_ID) -- Same lock order as PlaceNewOrder
+    );
+    CREATE TEMPORARY TABLE tmp_batch_free (
+        Product_ID INT PRIMARY KEY,
+        Free INT NOT NULL -- Stock in all warehouses less live cart holds, less what the batch took
+    );
+    CREATE TEMPORARY TABLE tmp_shard_take (
+        Product_ID INT NOT NULL,
+        Warehouse_ID INT NOT NULL,
+        Quantity INT NOT NULL,
+        PRIMARY KEY (Product_ID, Warehouse_ID)
+    );
+
+    INSERT INTO tmp_batch_orders (Order_No, Customer_ID, Warehouse_ID)
+    SELECT jt.order_no, jt.customer_id, IFNULL(jt.warehouse_id, 1)
+    FROM JSON_TABLE(p_orders_json, '$[*]' COLUMNS (
+        order_no FOR ORDINALITY,
+        customer_id INT PATH '$.customer_id',
+        warehouse_id INT PATH '$.warehouse_id'
+    )) AS jt;
+
+    INSERT INTO tmp_batch_lines (Order_No, Warehouse_ID, Product_ID, Quantity)
+    SELECT jt.order_no, IFNULL(jt.warehouse_id, 1), jt.product_id, IFNULL(SUM(jt.quantity), 0)
+    FROM JSON_TABLE(p_orders_json, '$[*]' COLUMNS (
+        order_no FOR ORDINALITY,
+        warehouse_id INT PATH '$.warehouse_id',
+        NESTED PATH '$.items[*]' COLUMNS (
+            product_id INT PATH '$.product_id',
+            quantity INT PATH '$.quantity'
+        )
+    )) AS jt
+    WHERE jt.product_id IS NOT NULL
+    GROUP BY jt.order_no, jt.warehouse_id, jt.product_id;
+
+    SELECT COUNT(*) INTO order_count FROM tmp_batch_orders;
+
+    -- 2. Reject what can be rejected without stock
+    UPDATE tmp_batch_orders o
+    LEFT JOIN CUSTOMER c ON c.Customer_ID = o.Customer_ID
+    SET o.Status = 'Rejected', o.Message = 'Unknown customer.'
+    WHERE c.Customer_ID IS NULL;
+
+    UPDATE tmp_batch_orders o
+    SET o.Status = 'Rejected', o.Message = 'Cart is empty or has an invalid quantity.'
+    WHERE o.Status = 'Pending'
+      AND o.Order_No NOT IN (
+          SELECT l.Order_No FROM tmp_batch_lines l
+          GROUP BY l.Order_No
+          HAVING MIN(l.Quantity) > 0
+      ); -- A temporary table may only appear once per statement
+
+    -- 3. Totals for every order from one join
+    UPDATE tmp_batch_orders o
+    JOIN (
+        SELECT l.Order_No, SUM(p.Price * l.Quantity) AS Total
+        FROM tmp_batch_lines l
+        JOIN PRODUCT p ON p.Product_ID = l.Product_ID
+        GROUP BY l.Order_No
+    ) t ON t.Order_No = o.Order_No
+    SET o.Order_Total = t.Total;
+
     START TRANSACTION;
 
-    UPDATE DRIVER
-    SET Availability = 'On-Trip', Vehicle_no = p_vehicleNo
-    WHERE Driver_ID = p_driverID AND Availability = 'Available';
+    -- 4. Lock every stock row the batch touches, once, in key order
+    INSERT INTO tmp_batch_stock (Warehouse_ID, Product_ID)
+    SELECT DISTINCT l.Warehouse_ID, l.Product_ID FROM tmp_batch_lines l;
 
-    UPDATE FLEET
-    SET Availability = 'In-Use', Driver_ID = p_driverID
-    WHERE Vehicle_no = p_vehicleNo AND Availability = 'Available';
+    SELECT COUNT(*) INTO locked_lines
+    FROM tmp_batch_stock s
+    STRAIGHT_JOIN Sharded_Product k ON k.Product_ID = s.Product_ID
+    FOR SHARE;
 
-    COMMIT;
-END$$
-DELIMITER ;
+    UPDATE tmp_batch_stock s
+    JOIN Sharded_Product k ON k.Product_ID = s.Product_ID
+    SET s.Sharded = 1;
 
--- Procedure: GenerateSalesReport
-DELIMITER $$
-CREATE PROCEDURE GenerateSalesReport(IN p_startDate DATE, IN p_endDate DATE)
-BEGIN
-    SELECT
-        p.Order_ID,
-        c.C_Name AS Customer_Name,
-        o.Order_Total,
-        p.Trans_date AS Payment_Date,
-        w.Location AS Warehouse
-    FROM PAYMENT p
-    JOIN `ORDER` o ON p.Order_ID = o.Order_ID
-    JOIN CUST_ORDER co ON o.Order_ID = co.Order_ID
-    JOIN CUSTOMER c ON co.Customer_ID = c.Customer_ID
-    JOIN WAREHOUSE w ON o.Warehouse_ID = w.Warehouse_ID
-    WHERE
-        -- Fixed: Removed "p.Status = 'Completed'" to show all orders
-        DATE(p.Trans_date) BETWEEN p_startDate AND p_endDate
-    ORDER BY
-        p.Trans_date DESC;
-END$$
-DELIMITER ;
\ No newline at end of file
+    SELECT COUNT(*) INTO locked_lines
+    FROM tmp_batch_stock s
+    STRAIGHT_JOIN Inventory i ON i.Product_ID = s.Product_ID AND i.Warehouse_ID = s.Warehouse_ID
+    FOR UPDATE;
+
+    SELECT COUNT(*) INTO locked_lines
+    FROM tmp_batch_stock s
+    STRAIGHT_JOIN Inventory_Shard sh ON sh.Product_ID = s.Product_ID AND sh.Warehouse_ID = s.Warehouse_ID
+    WHERE s.Sharded = 1
+    FOR UPDATE;
+
+    UPDATE tmp_batch_stock s
+    JOIN Inventory i ON i.Product_ID = s.Product_ID AND i.Warehouse_ID = s.Warehouse_ID
+    SET s.Available = i.Quantity + IFNULL((
+        SELECT SUM(sh.Quantity) FROM Inventory_Shard sh
+        WHERE sh.Product_ID = s.Product_ID AND sh.Warehouse_ID = s.Warehouse_ID
+    ), 0);
+
+    UPDATE tmp_batch_stock SET Stocked = Available;
+
+    -- Units held in shoppers' carts are not for sale. Holds are per SKU, so
+    -- they are checked against the stock of all warehouses, read without
+    -- locking as in PlaceNewOrder.
+    INSERT INTO tmp_batch_free (Product_ID, Free)
+    SELECT k.Product_ID,
+           IFNULL(a.Total_Quantity, 0)
+           + IFNULL((SELECT SUM(sh.Quantity) FROM Inventory_Shard sh WHERE sh.Product_ID = k.Product_ID), 0)
+           - IFNULL((SELECT SUM(r.Quantity) FROM Stock_Reservation r
+                     WHERE r.Product_ID = k.Product_ID AND r.Expires_At > NOW()), 0)
+    FROM (SELECT DISTINCT Product_ID FROM tmp_batch_lines) k
+    LEFT JOIN Product_Availability a ON a.Product_ID = k.Product_ID;
+
+    -- 5. Allocate the locked stock to orders, first come first served
+    WHILE n <= order_count DO
+        IF (SELECT Status FROM tmp_batch_orders WHERE Order_No = n) = 'Pending' THEN
+            SELECT COUNT(*) INTO short_lines
+            FROM tmp_batch_lines l
+            LEFT JOIN tmp_batch_stock s ON s.Warehouse_ID = l.Warehouse_ID AND s.Product_ID = l.Product_ID
+            LEFT JOIN tmp_batch_free f ON f.Product_ID = l.Product_ID
+            WHERE l.Order_No = n AND (s.Available IS NULL OR s.Available < l.Quantity OR f.Free < l.Quantity);
+
+            IF short_lines > 0 THEN
+                UPDATE tmp_batch_orders
+                SET Status = 'Rejected', Message = 'Not enough stock for one or more items (some may be held in carts).'
+                WHERE Order_No = n;
+            ELSE
+                UPDATE tmp_batch_stock s
+                JOIN tmp_batch_lines l ON l.Warehouse_ID = s.Warehouse_ID AND l.Product_ID = s.Product_ID
+                SET s.Available = s.Available - l.Quantity
+                WHERE l.Order_No = n;
+
+                UPDATE tmp_batch_free f
+                JOIN tmp_batch_lines l ON l.Product_ID = f.Product_ID
+                SET f.Free = f.Free - l.Quantity
+                WHERE l.Order_No = n;
+
+                INSERT INTO `ORDER` (Warehouse_ID, Status, Order_Total)
+                SELECT Warehouse_ID, 'Pending', Order_Total FROM tmp_batch_orders WHERE Order_No = n;
+
+                UPDATE tmp_batch_orders
+                SET Status = 'Accepted', Order_ID = LAST_INSERT_ID()
+                WHERE Order_No = n;
+            END IF;
+        END IF;
+        SET n = n + 1;
+    END WHILE;
+
+    -- 6. Write links, items, payments and stock for all accepted orders at once
+    INSERT INTO CUST_ORDER (Customer_ID, Order_ID)
+    SELECT o.Customer_ID, o.Order_ID FROM tmp_batch_orders o WHERE o.Status = 'Accepted';
+
+    INSERT INTO ORDER_ITEMS (Order_ID, Product_ID, Quantity)
+    SELECT o.Order_ID, l.Product_ID, l.Quantity
+    FROM tmp_batch_orders o
+    JOIN tmp_batch_lines l ON l.Order_No = o.Order_No
+    WHERE o.Status = 'Accepted'
+    ORDER BY o.Order_ID, l.Product_ID;
+
+    INSERT INTO PAYMENT (Payment_mode, Trans_date, Status, Order_ID)
+    SELECT 'Pending', sale_time, 'Awaiting Payment', o.Order_ID
+    FROM tmp_batch_orders o
+    WHERE o.Status = 'Accepted';
+
+    UPDATE Inventory i
+    JOIN tmp_batch_stock s ON s.Product_ID = i.Product_ID AND s.Warehouse_ID = i.Warehouse_ID
+    SET i.Quantity = s.Available
+    WHERE s.Sharded = 0 AND s.Available <> i.Quantity;
+
+    sharded_stock: LOOP
+        SET sold_product = NULL;
+        SELECT Product_ID, Warehouse_ID, Stocked - Available INTO sold_product, sold_warehouse, sold_qty
+        FROM tmp_batch_stock
+        WHERE Sharded = 1 AND Available <> Stocked
+        ORDER BY Product_ID, Warehouse_ID
+        LIMIT 1;
+
+        IF sold_product IS NULL THEN
+            LEAVE sharded_stock;
+        END IF;
+        CALL TakeFromShards(sold_product, sold_warehouse, sold_qty);
+        UPDATE tmp_batch_stock SET Stocked = Available
+        WHERE Product_ID = sold_product AND Warehouse_ID = sold_warehouse;
+    END LOOP;
+
+    -- Roll the accepted orders into the daily summaries
+    INSERT INTO Daily_Sales_Summary (Sale_Date, Warehouse_ID, Orders, Units, Revenue)
+    SELECT DATE(sale_time), o.Warehouse_ID, COUNT(*), SUM(l.Units), SUM(o.Order_Total)
+    FROM tmp_batch_orders o
+    JOIN (
+        SELECT Order_No, SUM(Quantity) AS Units FROM tmp_batch_lines GROUP BY Order_No
+    ) l ON l.Order_No = o.Order_No
+    WHERE o.Status = 'Accepted'
+    GROUP BY o.Warehouse_ID
+    ON DUPLICATE KEY UPDATE
+        Orders = Orders + VALUES(Orders),
+        Units = Units + VALUES(Units),
+        Revenue = Revenue + VALUES(Revenue);
+
+    INSERT INTO Daily_Sales_Breakdown (Sale_Date, Warehouse_ID, Customer_ID, Product_ID, Order_Lines, Units, Revenue)
+    SELECT DATE(sale_time), o.Warehouse_ID, o.Customer_ID, l.Product_ID, COUNT(*), SUM(l.Quantity), SUM(p.Price * l.Quantity)
+    FROM tmp_batch_orders o
+    JOIN tmp_batch_lines l ON l.Order_No = o.Order_No
+    JOIN PRODUCT p ON p.Product_ID = l.Product_ID
+    WHERE o.Status = 'Accepted'
+    GROUP BY o.Warehouse_ID, o.Customer_ID, l.Product_ID
+    ON DUPLICATE KEY UPDATE
+        Order_Lines = Order_Lines + VALUES(Order_Lines),
+        Units = Units + VALUES(Units),
+        Revenue = Revenue + VALUES(Revenue);
+
+    COMMIT;
+
+    -- 7. One result row per order, in input order
+    SELECT Order_No, Customer_ID, Status, Order_ID, Order_Total, Message
+    FROM tmp_batch_orders
+    ORDER BY Order_No;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_batch_orders, tmp_batch_lines, tmp_batch_stock, tmp_batch_free, tmp_shard_take;
+END$$
+DELIMITER ;
+
+-- Procedure: AssignDriverToVehicle
+-- Fails (and changes nothing) if either side is no longer 'Available'.
+DELIMITER $$
+CREATE PROCEDURE AssignDriverToVehicle(
+    IN p_driverID INT,
+    IN p_vehicleNo VARCHAR(20)
+)
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    UPDATE DRIVER
+    SET Availability = 'On-Trip', Vehicle_no = p_vehicleNo
+    WHERE Driver_ID = p_driverID AND Availability = 'Available';
+
+    IF ROW_COUNT() = 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'The driver is no longer available.';
+    END IF;
+
+    UPDATE FLEET
+    SET Availability = 'In-Use', Driver_ID = p_driverID
+    WHERE Vehicle_no = p_vehicleNo AND Availability = 'Available';
+
+    IF ROW_COUNT() = 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'The vehicle is no longer available.';
+    END IF;
+
+    COMMIT;
+END$$
+DELIMITER ;
+
+-- Procedure: AssignDriversBatch
+-- Applies many driver-to-vehicle pairs in one transaction (shift start).
+-- Every driver and vehicle is locked, then each pair is checked under the
+-- lock; pairs whose driver or vehicle is unknown, no longer 'Available' or
+-- still linked elsewhere are skipped and reported, the rest are applied.
+-- Returns one (Driver_ID, Vehicle_no, Status) row per pair, then the
+-- (Drivers_Updated, Vehicles_Updated) row counts.
+-- p_pairs_json: [{"driver_id": 1, "vehicle_no": "KA01AB1234"}, ...]
+DELIMITER $$
+CREATE PROCEDURE AssignDriversBatch(IN p_pairs_json JSON)
+BEGIN
+    DECLARE locked_rows INT;
+    DECLARE drivers_updated INT DEFAULT 0;
+    DECLARE vehicles_updated INT DEFAULT 0;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS tmp_pairs;
+        RESIGNAL;
+    END;
+
+    -- A driver or vehicle listed twice fails the whole batch (duplicate key)
+    DROP TEMPORARY TABLE IF EXISTS tmp_pairs;
+    CREATE TEMPORARY TABLE tmp_pairs (
+        Driver_ID INT PRIMARY KEY,
+        Vehicle_no VARCHAR(20) NOT NULL,
+        Status VARCHAR(64) NULL,
+        UNIQUE KEY uq_pair_vehicle (Vehicle_no)
+    );
+    INSERT INTO tmp_pairs (Driver_ID, Vehicle_no)
+    SELECT jt.driver_id, jt.vehicle_no
+    FROM JSON_TABLE(p_pairs_json, '$[*]' COLUMNS (
+        driver_id INT PATH '$.driver_id' ERROR ON EMPTY,
+        vehicle_no VARCHAR(20) PATH '$.vehicle_no' ERROR ON EMPTY
+    )) AS jt;
+
+    START TRANSACTION;
+
+    -- Drivers first, then vehicles, like AssignDriverToVehicle
+    SELECT COUNT(*) INTO locked_rows
+    FROM tmp_pairs t
+    STRAIGHT_JOIN DRIVER d ON d.Driver_ID = t.Driver_ID
+    FOR UPDATE;
+
+    SELECT COUNT(*) INTO locked_rows
+    FROM tmp_pairs t
+    STRAIGHT_JOIN FLEET f ON f.Vehicle_no = t.Vehicle_no
+    FOR UPDATE;
+
+    -- Conflict detection under the locks
+    UPDATE tmp_pairs t
+    LEFT JOIN DRIVER d ON d.Driver_ID = t.Driver_ID
+    LEFT JOIN FLEET f ON f.Vehicle_no = t.Vehicle_no
+    SET t.Status = CASE
+        WHEN d.Driver_ID IS NULL THEN 'Unknown driver'
+        WHEN f.Vehicle_no IS NULL THEN 'Unknown vehicle'
+        WHEN d.Availability <> 'Available' THEN CONCAT('Driver is ', d.Availability)
+        WHEN f.Availability <> 'Available' THEN CONCAT('Vehicle is ', f.Availability)
+        WHEN EXISTS (SELECT 1 FROM FLEET o WHERE o.Driver_ID = t.Driver_ID AND o.Vehicle_no <> t.Vehicle_no)
+            THEN 'Driver is linked to another vehicle'
+        ELSE 'Assigned'
+    END;
+
+    UPDATE DRIVER d
+    JOIN tmp_pairs t ON t.Driver_ID = d.Driver_ID
+    SET d.Availability = 'On-Trip', d.Vehicle_no = t.Vehicle_no
+    WHERE t.Status = 'Assigned' AND d.Availability = 'Available';
+    SET drivers_updated = ROW_COUNT();
+
+    UPDATE FLEET f
+    JOIN tmp_pairs t ON t.Vehicle_no = f.Vehicle_no
+    SET f.Availability = 'In-Use', f.Driver_ID = t.Driver_ID
+    WHERE t.Status = 'Assigned' AND f.Availability = 'Available';
+    SET vehicles_updated = ROW_COUNT();
+
+    IF drivers_updated <> vehicles_updated THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Driver and vehicle updates did not match; no pairs were applied.';
+    END IF;
+
+    COMMIT;
+
+    SELECT Driver_ID, Vehicle_no, Status FROM tmp_pairs ORDER BY Driver_ID;
+    SELECT drivers_updated AS Drivers_Updated, vehicles_updated AS Vehicles_Updated;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_pairs;
+END$$
+DELIMITER ;
+
+-- Procedure: DispatchOrders
+-- Hands pending orders to driver/vehicle pairs in one transaction (used by
+-- the dispatch scheduler). Orders, drivers and vehicles are locked in that
+-- order and every assignment is re-checked under the lock; the ones that
+-- pass set the order to 'Dispatched' (logged to Order_History in one
+-- batch) and the driver and vehicle to 'On-Trip' / 'In-Use'. Returns (Order_ID, Driver_ID, Vehicle_no, Status,
+-- Wait_Seconds) per assignment; Status is 'Dispatched' or the conflict.
+-- p_dispatch_json: [{"order_id": 7, "driver_id": 1, "vehicle_no": "KA01AB1234"}, ...]
+DELIMITER $$
+CREATE PROCEDURE DispatchOrders(IN p_dispatch_json JSON)
+BEGIN
+    DECLARE locked_rows INT;
+    DECLARE log_time DATETIME DEFAULT NOW();
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @qc_defer_history = NULL;
+        ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS tmp_dispatch;
+        RESIGNAL;
+    END;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_dispatch;
+    CREATE TEMPORARY TABLE tmp_dispatch (
+        Order_ID INT PRIMARY KEY,
+        Driver_ID INT NOT NULL,
+        Vehicle_no VARCHAR(20) NOT NULL,
+        Status VARCHAR(64) NULL,
+        UNIQUE KEY uq_dispatch_driver (Driver_ID),
+        UNIQUE KEY uq_dispatch_vehicle (Vehicle_no)
+    );
+    INSERT INTO tmp_dispatch (Order_ID, Driver_ID, Vehicle_no)
+    SELECT jt.order_id, jt.driver_id, jt.vehicle_no
+    FROM JSON_TABLE(p_dispatch_json, '$[*]' COLUMNS (
+        order_id INT PATH '$.order_id' ERROR ON EMPTY,
+        driver_id INT PATH '$.driver_id' ERROR ON EMPTY,
+        vehicle_no VARCHAR(20) PATH '$.vehicle_no' ERROR ON EMPTY
+    )) AS jt;
+
+    START TRANSACTION;
+
+    SELECT COUNT(*) INTO locked_rows
+    FROM tmp_dispatch t
+    STRAIGHT_JOIN `ORDER` o ON o.Order_ID = t.Order_ID
+    FOR UPDATE;
+
+    SELECT COUNT(*) INTO locked_rows
+    FROM tmp_dispatch t
+    STRAIGHT_JOIN DRIVER d ON d.Driver_ID = t.Driver_ID
+    FOR UPDATE;
+
+    SELECT COUNT(*) INTO locked_rows
+    FROM tmp_dispatch t
+    STRAIGHT_JOIN FLEET f ON f.Vehicle_no = t.Vehicle_no
+    FOR UPDATE;
+
+    UPDATE tmp_dispatch t
+    LEFT JOIN `ORDER` o ON o.Order_ID = t.Order_ID
+    LEFT JOIN DRIVER d ON d.Driver_ID = t.Driver_ID
+    LEFT JOIN FLEET f ON f.Vehicle_no = t.Vehicle_no
+    SET t.Status = CASE
+        WHEN o.Order_ID IS NULL THEN 'Order is gone'
+        WHEN o.Status <> 'Pending' OR o.Driver_ID IS NOT NULL THEN CONCAT('Order is ', o.Status)
+        WHEN d.Driver_ID IS NULL THEN 'Unknown driver'
+        WHEN f.Vehicle_no IS NULL THEN 'Unknown vehicle'
+        WHEN d.Availability <> 'Available' THEN CONCAT('Driver is ', d.Availability)
+        WHEN f.Availability <> 'Available' THEN CONCAT('Vehicle is ', f.Availability)
+        WHEN EXISTS (SELECT 1 FROM FLEET x WHERE x.Driver_ID = t.Driver_ID AND x.Vehicle_no <> t.Vehicle_no)
+            THEN 'Driver is linked to another vehicle'
+        ELSE 'Dispatched'
+    END;
+
+    SET @qc_defer_history = 1;
+    UPDATE `ORDER` o
+    JOIN tmp_dispatch t ON t.Order_ID = o.Order_ID
+    SET o.Status = 'Dispatched', o.Driver_ID = t.Driver_ID
+    WHERE t.Status = 'Dispatched';
+    SET @qc_defer_history = NULL;
+
+    INSERT INTO Order_History (Order_ID, Status, Log_Time)
+    SELECT t.Order_ID, 'Dispatched', log_time
+    FROM tmp_dispatch t
+    WHERE t.Status = 'Dispatched'
+    ORDER BY t.Order_ID;
+
+    UPDATE DRIVER d
+    JOIN tmp_dispatch t ON t.Driver_ID = d.Driver_ID
+    SET d.Availability = 'On-Trip', d.Vehicle_no = t.Vehicle_no
+    WHERE t.Status = 'Dispatched';
+
+    UPDATE FLEET f
+    JOIN tmp_dispatch t ON t.Vehicle_no = f.Vehicle_no
+    SET f.Availability = 'In-Use', f.Driver_ID = t.Driver_ID
+    WHERE t.Status = 'Dispatched';
+
+    COMMIT;
+
+    SELECT t.Order_ID, t.Driver_ID, t.Vehicle_no, t.Status,
+           TIMESTAMPDIFF(SECOND, p.Trans_date, NOW()) AS Wait_Seconds
+    FROM tmp_dispatch t
+    LEFT JOIN PAYMENT p ON p.Order_ID = t.Order_ID
+    ORDER BY t.Order_ID;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_dispatch;
+END$$
+DELIMITER ;
+
+-- Procedure: GenerateSalesReport
+-- Half-open range on the bare Trans_date column so idx_payment_trans_date
+-- can be used (DATE(p.Trans_date) BETWEEN ... forced a full scan).
+-- Archived orders are added only when the range starts at or before the
+-- archive watermark.
+DELIMITER $$
+CREATE PROCEDURE GenerateSalesReport(IN p_startDate DATE, IN p_endDate DATE)
+BEGIN
+    DECLARE watermark DATETIME;
+
+    SELECT MAX(Archived_Until) INTO watermark FROM Archive_Watermark;
+
+    IF watermark IS NOT NULL AND p_startDate <= watermark THEN
+        SELECT p.Order_ID, c.C_Name AS Customer_Name, o.Order_Total, p.Trans_date AS Payment_Date, w.Location AS Warehouse
+        FROM PAYMENT p
+        JOIN `ORDER` o ON p.Order_ID = o.Order_ID
+        JOIN CUST_ORDER co ON o.Order_ID = co.Order_ID
+        JOIN CUSTOMER c ON co.Customer_ID = c.Customer_ID
+        JOIN WAREHOUSE w ON o.Warehouse_ID = w.Warehouse_ID
+        WHERE p.Trans_date >= p_startDate
+          AND p.Trans_date < p_endDate + INTERVAL 1 DAY
+        UNION ALL
+        SELECT p.Order_ID, c.C_Name, o.Order_Total, p.Trans_date, w.Location
+        FROM Archive_Payment p
+        JOIN Archive_Order o ON p.Order_ID = o.Order_ID
+        JOIN Archive_Cust_Order co ON o.Order_ID = co.Order_ID
+        JOIN CUSTOMER c ON co.Customer_ID = c.Customer_ID
+        JOIN WAREHOUSE w ON o.Warehouse_ID = w.Warehouse_ID
+        WHERE p.Trans_date >= p_startDate
+          AND p.Trans_date < p_endDate + INTERVAL 1 DAY
+        ORDER BY Payment_Date DESC;
+    ELSE
+        SELECT
+            p.Order_ID,
+            c.C_Name AS Customer_Name,
+            o.Order_Total,
+            p.Trans_date AS Payment_Date,
+            w.Location AS Warehouse
+        FROM PAYMENT p
+        JOIN `ORDER` o ON p.Order_ID = o.Order_ID
+        JOIN CUST_ORDER co ON o.Order_ID = co.Order_ID
+        JOIN CUSTOMER c ON co.Customer_ID = c.Customer_ID
+        JOIN WAREHOUSE w ON o.Warehouse_ID = w.Warehouse_ID
+        WHERE
+            -- Fixed: Removed "p.Status = 'Completed'" to show all orders
+            p.Trans_date >= p_startDate
+            AND p.Trans_date < p_endDate + INTERVAL 1 DAY
+        ORDER BY
+            p.Trans_date DESC;
+    END IF;
+END$$
+DELIMITER ;
+
+-- Procedure: GenerateSalesSummary
+-- Per-day totals from the rollup; detail rows come from GenerateSalesReport
+-- for the day the user drills into.
+DELIMITER $$
+CREATE PROCEDURE GenerateSalesSummary(IN p_startDate DATE, IN p_endDate DATE)
+BEGIN
+    SELECT
+        s.Sale_Date,
+        SUM(s.Orders) AS Orders,
+        SUM(s.Units) AS Units,
+        SUM(s.Revenue) AS Revenue
+    FROM Daily_Sales_Summary s
+    WHERE s.Sale_Date BETWEEN p_startDate AND p_endDate
+    GROUP BY s.Sale_Date
+    ORDER BY s.Sale_Date DESC;
+END$$
+DELIMITER ;
+
+-- Procedure: RebuildDailySalesSummary
+-- Recomputes both rollups for a date range from the order tables (backfill,
+-- or repair after manual edits). Revenue uses current product prices for the
+-- breakdown and the stored order totals for the summary. Archived orders
+-- in the range are added on top of the hot ones.
+DELIMITER $$
+CREATE PROCEDURE RebuildDailySalesSummary(IN p_startDate DATE, IN p_endDate DATE)
+BEGIN
+    DECLARE watermark DATETIME;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    DELETE FROM Daily_Sales_Summary WHERE Sale_Date BETWEEN p_startDate AND p_endDate;
+    DELETE FROM Daily_Sales_Breakdown WHERE Sale_Date BETWEEN p_startDate AND p_endDate;
+
+    INSERT INTO Daily_Sales_Summary (Sale_Date, Warehouse_ID, Orders, Units, Revenue)
+    SELECT DATE(pay.Trans_date), IFNULL(o.Warehouse_ID, 0), COUNT(*), SUM(u.Units), SUM(o.Order_Total)
+    FROM PAYMENT pay
+    JOIN `ORDER` o ON o.Order_ID = pay.Order_ID
+    JOIN (
+        SELECT oi.Order_ID, SUM(oi.Quantity) AS Units
+        FROM ORDER_ITEMS oi
+        GROUP BY oi.Order_ID
+    ) u ON u.Order_ID = o.Order_ID
+    WHERE pay.Trans_date >= p_startDate
+      AND pay.Trans_date < p_endDate + INTERVAL 1 DAY
+    GROUP BY DATE(pay.Trans_date), IFNULL(o.Warehouse_ID, 0);
+
+    INSERT INTO Daily_Sales_Breakdown (Sale_Date, Warehouse_ID, Customer_ID, Product_ID, Order_Lines, Units, Revenue)
+    SELECT DATE(pay.Trans_date), IFNULL(o.Warehouse_ID, 0), IFNULL(co.Customer_ID, 0), oi.Product_ID,
+           COUNT(*), SUM(oi.Quantity), SUM(oi.Quantity * pr.Price)
+    FROM PAYMENT pay
+    JOIN `ORDER` o ON o.Order_ID = pay.Order_ID
+    LEFT JOIN CUST_ORDER co ON co.Order_ID = o.Order_ID
+    JOIN ORDER_ITEMS oi ON oi.Order_ID = o.Order_ID
+    JOIN PRODUCT pr ON pr.Product_ID = oi.Product_ID
+    WHERE pay.Trans_date >= p_startDate
+      AND pay.Trans_date < p_endDate + INTERVAL 1 DAY
+    GROUP BY DATE(pay.Trans_date), IFNULL(o.Warehouse_ID, 0), IFNULL(co.Customer_ID, 0), oi.Product_ID;
+
+    SELECT MAX(Archived_Until) INTO watermark FROM Archive_Watermark;
+
+    -- Days can be split: old orders that were still open stayed hot
+    IF watermark IS NOT NULL AND p_startDate <= watermark THEN
+        INSERT INTO Daily_Sales_Summary (Sale_Date, Warehouse_ID, Orders, Units, Revenue)
+        SELECT DATE(pay.Trans_date), IFNULL(o.Warehouse_ID, 0), COUNT(*), SUM(u.Units), SUM(o.Order_Total)
+        FROM Archive_Payment pay
+        JOIN Archive_Order o ON o.Order_ID = pay.Order_ID
+        JOIN (
+            SELECT oi.Order_ID, SUM(oi.Quantity) AS Units
+            FROM Archive_Order_Items oi
+            GROUP BY oi.Order_ID
+        ) u ON u.Order_ID = o.Order_ID
+        WHERE pay.Trans_date >= p_startDate
+          AND pay.Trans_date < p_endDate + INTERVAL 1 DAY
+        GROUP BY DATE(pay.Trans_date), IFNULL(o.Warehouse_ID, 0)
+        ON DUPLICATE KEY UPDATE
+            Orders = Orders + VALUES(Orders),
+            Units = Units + VALUES(Units),
+            Revenue = Revenue + VALUES(Revenue);
+
+        INSERT INTO Daily_Sales_Breakdown (Sale_Date, Warehouse_ID, Customer_ID, Product_ID, Order_Lines, Units, Revenue)
+        SELECT DATE(pay.Trans_date), IFNULL(o.Warehouse_ID, 0), IFNULL(co.Customer_ID, 0), oi.Product_ID,
+               COUNT(*), SUM(oi.Quantity), SUM(oi.Quantity * pr.Price)
+        FROM Archive_Payment pay
+        JOIN Archive_Order o ON o.Order_ID = pay.Order_ID
+        LEFT JOIN Archive_Cust_Order co ON co.Order_ID = o.Order_ID
+        JOIN Archive_Order_Items oi ON oi.Order_ID = o.Order_ID
+        JOIN PRODUCT pr ON pr.Product_ID = oi.Product_ID
+        WHERE pay.Trans_date >= p_startDate
+          AND pay.Trans_date < p_endDate + INTERVAL 1 DAY
+        GROUP BY DATE(pay.Trans_date), IFNULL(o.Warehouse_ID, 0), IFNULL(co.Customer_ID, 0), oi.Product_ID
+        ON DUPLICATE KEY UPDATE
+            Order_Lines = Order_Lines + VALUES(Order_Lines),
+            Units = Units + VALUES(Units),
+            Revenue = Revenue + VALUES(Revenue);
+    END IF;
+
+    COMMIT;
+END$$
+DELIMITER ;
+
+-- Procedure: PruneChangeLog
+-- Clients whose version falls behind the pruned range simply resync.
+DELIMITER $$
+CREATE PROCEDURE PruneChangeLog(IN p_keepHours INT)
+BEGIN
+    DELETE FROM Change_Log
+    WHERE Changed_At < NOW() - INTERVAL p_keepHours HOUR;
+END$$
+DELIMITER ;
+
+-- Procedure: SpreadShards
+-- Internal helper: moves all stock of one Inventory row (its own Quantity
+-- plus any shards) into p_shardCount even shards, or back into the row
+-- itself when p_shardCount is 1. The caller owns the transaction.
+DELIMITER $$
+CREATE PROCEDURE SpreadShards(IN p_productID INT, IN p_warehouseID INT, IN p_shardCount INT)
+BEGIN
+    DECLARE inv_id INT;
+    DECLARE row_qty INT;
+    DECLARE total INT;
+
+    SELECT Inventory_ID, Quantity INTO inv_id, row_qty
+    FROM Inventory
+    WHERE Product_ID = p_productID AND Warehouse_ID = p_warehouseID
+    FOR UPDATE;
+
+    SELECT row_qty + IFNULL(SUM(Quantity), 0) INTO total
+    FROM Inventory_Shard
+    WHERE Product_ID = p_productID AND Warehouse_ID = p_warehouseID
+    FOR UPDATE;
+
+    IF total < 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Stock cannot go below zero.';
+    END IF;
+
+    DELETE FROM Inventory_Shard WHERE Product_ID = p_productID AND Warehouse_ID = p_warehouseID;
+
+    IF p_shardCount > 1 THEN
+        INSERT INTO Inventory_Shard (Product_ID, Warehouse_ID, Shard_No, Inventory_ID, Quantity)
+        WITH RECURSIVE shard (n) AS (
+            SELECT 0 UNION ALL SELECT n + 1 FROM shard WHERE n + 1 < p_shardCount
+        )
+        SELECT p_productID, p_warehouseID, n, inv_id, total DIV p_shardCount + (n < total MOD p_shardCount)
+        FROM shard;
+        SET total = 0;
+    END IF;
+
+    UPDATE Inventory SET Quantity = total WHERE Inventory_ID = inv_id AND Quantity <> total;
+END$$
+DELIMITER ;
+
+-- Procedure: ShardInventory
+-- Switches a SKU to sharded-counter mode with p_shardCount shards per
+-- warehouse (or back to single-row mode with 1) and redistributes its stock.
+DELIMITER $$
+CREATE PROCEDURE ShardInventory(IN p_productID INT, IN p_shardCount INT)
+BEGIN
+    DECLARE locked_rows INT;
+    DECLARE next_warehouse INT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_shardCount IS NULL OR p_shardCount < 1 OR p_shardCount > 64 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Shard count must be between 1 and 64.';
+    END IF;
+
+    START TRANSACTION;
+
+    -- The setting is written (or locked) first: orders share-lock it before
+    -- they touch any stock row, so this cannot deadlock with them
+    IF p_shardCount > 1 THEN
+        INSERT INTO Sharded_Product (Product_ID, Shard_Count) VALUES (p_productID, p_shardCount)
+        ON DUPLICATE KEY UPDATE Shard_Count = VALUES(Shard_Count);
+    ELSE
+        SELECT COUNT(*) INTO locked_rows FROM Sharded_Product WHERE Product_ID = p_productID FOR UPDATE;
+    END IF;
+
+    SELECT COUNT(*) INTO locked_rows FROM Inventory WHERE Product_ID = p_productID FOR UPDATE;
+
+    SET next_warehouse = (SELECT MIN(Warehouse_ID) FROM Inventory WHERE Product_ID = p_productID);
+    WHILE next_warehouse IS NOT NULL DO
+        CALL SpreadShards(p_productID, next_warehouse, p_shardCount);
+        SET next_warehouse = (SELECT MIN(Warehouse_ID) FROM Inventory
+                              WHERE Product_ID = p_productID AND Warehouse_ID > next_warehouse);
+    END WHILE;
+
+    IF p_shardCount = 1 THEN
+        DELETE FROM Sharded_Product WHERE Product_ID = p_productID;
+    END IF;
+
+    INSERT INTO Product_Availability (Product_ID, Shard_Count) VALUES (p_productID, p_shardCount)
+    ON DUPLICATE KEY UPDATE Shard_Count = VALUES(Shard_Count);
+
+    COMMIT;
+END$$
+DELIMITER ;
+
+-- Procedure: RestockInventory
+-- Adds p_quantity (may be negative) to a product's stock in a warehouse,
+-- creating the Inventory row if needed. For sharded SKUs the new total is
+-- spread evenly over the shards again.
+DELIMITER $$
+CREATE PROCEDURE RestockInventory(IN p_productID INT, IN p_warehouseID INT, IN p_quantity INT)
+BEGIN
+    DECLARE product_shards INT DEFAULT NULL;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    SELECT Shard_Count INTO product_shards FROM Sharded_Product WHERE Product_ID = p_productID FOR UPDATE;
+
+    INSERT INTO Inventory (Product_ID, Warehouse_ID, Quantity)
+    VALUES (p_productID, p_warehouseID, p_quantity)
+    ON DUPLICATE KEY UPDATE Quantity = Quantity + VALUES(Quantity);
+
+    IF product_shards IS NOT NULL THEN
+        CALL SpreadShards(p_productID, p_warehouseID, product_shards);
+    END IF;
+
+    COMMIT;
+END$$
+DELIMITER ;
+
+-- Procedure: ReserveStock
+-- Adds p_quantity of a product to a cart's hold and renews all of the
+-- cart's holds for p_ttlSeconds. Fails when the units are not available:
+-- stock over all warehouses minus the live holds of other carts. Holds on
+-- the same product are serialised on its Product_Availability row.
+DELIMITER $$
+CREATE PROCEDURE ReserveStock(IN p_cartToken VARCHAR(36), IN p_productID INT, IN p_quantity INT, IN p_ttlSeconds INT)
+BEGIN
+    DECLARE on_hand INT DEFAULT 0;
+    DECLARE held_elsewhere INT;
+    DECLARE held_here INT;
+    DECLARE msg VARCHAR(128);
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_quantity IS NULL OR p_quantity <= 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Quantity must be positive.';
+    END IF;
+
+    START TRANSACTION;
+
+    SELECT Total_Quantity INTO on_hand
+    FROM Product_Availability
+    WHERE Product_ID = p_productID
+    FOR UPDATE;
+
+    SELECT on_hand + IFNULL(SUM(Quantity), 0) INTO on_hand
+    FROM Inventory_Shard
+    WHERE Product_ID = p_productID;
+
+    SELECT IFNULL(SUM(Quantity), 0) INTO held_elsewhere
+    FROM Stock_Reservation
+    WHERE Product_ID = p_productID AND Expires_At > NOW() AND Cart_Token <> p_cartToken;
+
+    SELECT IFNULL(SUM(Quantity), 0) INTO held_here
+    FROM Stock_Reservation
+    WHERE Cart_Token = p_cartToken AND Product_ID = p_productID AND Expires_At > NOW();
+
+    IF held_here + p_quantity > on_hand - held_elsewhere THEN
+        SET msg = CONCAT('Only ', GREATEST(on_hand - held_elsewhere - held_here, 0), ' more can be reserved.');
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = msg;
+    END IF;
+
+    -- An expired hold of this cart starts again from zero
+    INSERT INTO Stock_Reservation (Cart_Token, Product_ID, Quantity, Expires_At)
+    VALUES (p_cartToken, p_productID, p_quantity, NOW() + INTERVAL p_ttlSeconds SECOND)
+    ON DUPLICATE KEY UPDATE
+        Quantity = IF(Expires_At > NOW(), Quantity, 0) + VALUES(Quantity),
+        Expires_At = VALUES(Expires_At);
+
+    UPDATE Stock_Reservation
+    SET Expires_At = NOW() + INTERVAL p_ttlSeconds SECOND
+    WHERE Cart_Token = p_cartToken AND Expires_At > NOW();
+
+    COMMIT;
+END$$
+DELIMITER ;
+
+-- Procedure: ReleaseStock
+-- Drops a cart's hold on one product, or on everything when p_productID is NULL.
+DELIMITER $$
+CREATE PROCEDURE ReleaseStock(IN p_cartToken VARCHAR(36), IN p_productID INT)
+BEGIN
+    DELETE FROM Stock_Reservation
+    WHERE Cart_Token = p_cartToken
+      AND (p_productID IS NULL OR Product_ID = p_productID);
+END$$
+DELIMITER ;
+
+-- Procedure: ReleaseExpiredReservations
+-- Deletes up to p_batchSize expired holds, oldest first, and returns how
+-- many it deleted; the sweeper calls it until a batch comes back short.
+-- Small batches keep each delete's locks and Change_Log burst short.
+DELIMITER $$
+CREATE PROCEDURE ReleaseExpiredReservations(IN p_batchSize INT)
+BEGIN
+    DELETE FROM Stock_Reservation
+    WHERE Expires_At <= NOW()
+    ORDER BY Expires_At
+    LIMIT p_batchSize;
+
+    SELECT ROW_COUNT() AS Released;
+END$$
+DELIMITER ;
+
+-- Procedure: MergeProductImport
+-- Merges the CSV rows staged in tmp_product_import (created and filled by
+-- catalog_import.py on the same connection) into PRODUCT in one statement:
+-- rows with a Product_ID update that product, the rest are added. When a
+-- Product_ID appears twice, the later line wins. A Product_ID that does not
+-- exist is not created (new products take the next AUTO_INCREMENT id); those
+-- lines are skipped and returned as (Line_No, Reason).
+DELIMITER $$
+CREATE PROCEDURE MergeProductImport()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- Marked before the insert, which may hand out one of these ids to a new row
+    UPDATE tmp_product_import s
+    LEFT JOIN PRODUCT p ON p.Product_ID = s.Product_ID
+    SET s.Reason = CONCAT('Unknown Product_ID ', s.Product_ID)
+    WHERE s.Product_ID IS NOT NULL AND p.Product_ID IS NULL;
+
+    INSERT INTO PRODUCT (Product_ID, P_Name, Description, Price, Expiry_Date)
+    SELECT s.Product_ID, s.P_Name, s.Description, s.Price, s.Expiry_Date
+    FROM tmp_product_import s
+    WHERE s.Reason IS NULL
+    ORDER BY s.Line_No
+    ON DUPLICATE KEY UPDATE
+        P_Name = VALUES(P_Name),
+        Description = VALUES(Description),
+        Price = VALUES(Price),
+        Expiry_Date = VALUES(Expiry_Date);
+
+    COMMIT;
+
+    SELECT s.Line_No, s.Reason
+    FROM tmp_product_import s
+    WHERE s.Reason IS NOT NULL
+    ORDER BY s.Line_No;
+END$$
+DELIMITER ;
+
+-- Procedure: MergeInventoryImport
+-- Merges the stock rows staged in tmp_inventory_import into Inventory with
+-- RestockInventory's semantics (the quantity is added, the row is created
+-- if needed, sharded SKUs are rebalanced) in one transaction. Lines naming
+-- an unknown product or warehouse are skipped and returned as
+-- (Line_No, Reason).
+DELIMITER $$
+CREATE PROCEDURE MergeInventoryImport()
+BEGIN
+    DECLARE locked_rows INT;
+    DECLARE next_row INT;
+    DECLARE row_product INT;
+    DECLARE row_warehouse INT;
+    DECLARE product_shards INT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS tmp_inventory_merge;
+        RESIGNAL;
+    END;
+
+    -- Duplicate lines for the same stock row are summed
+    DROP TEMPORARY TABLE IF EXISTS tmp_inventory_merge;
+    CREATE TEMPORARY TABLE tmp_inventory_merge (
+        Row_No INT AUTO_INCREMENT UNIQUE,
+        Product_ID INT NOT NULL,
+        Warehouse_ID INT NOT NULL,
+        Quantity INT NOT NULL,
+        Shard_Count INT NULL,
+        PRIMARY KEY (Product_ID, Warehouse_ID)
+    );
+
+    START TRANSACTION;
+
+    INSERT INTO tmp_inventory_merge (Product_ID, Warehouse_ID, Quantity)
+    SELECT s.Product_ID, s.Warehouse_ID, SUM(s.Quantity)
+    FROM tmp_inventory_import s
+    JOIN PRODUCT p ON p.Product_ID = s.Product_ID
+    JOIN WAREHOUSE w ON w.Warehouse_ID = s.Warehouse_ID
+    GROUP BY s.Product_ID, s.Warehouse_ID
+    ORDER BY s.Product_ID, s.Warehouse_ID;
+
+    -- Same lock order as the order procedures: shard settings (shared),
+    -- then the stock rows in key order
+    SELECT COUNT(*) INTO locked_rows
+    FROM tmp_inventory_merge m
+    STRAIGHT_JOIN Sharded_Product k ON k.Product_ID = m.Product_ID
+    FOR SHARE;
+
+    UPDATE tmp_inventory_merge m
+    JOIN Sharded_Product k ON k.Product_ID = m.Product_ID
+    SET m.Shard_Count = k.Shard_Count;
+
+    INSERT INTO Inventory (Product_ID, Warehouse_ID, Quantity)
+    SELECT m.Product_ID, m.Warehouse_ID, m.Quantity
+    FROM tmp_inventory_merge m
+    ORDER BY m.Product_ID, m.Warehouse_ID
+    ON DUPLICATE KEY UPDATE Quantity = Quantity + VALUES(Quantity);
+
+    SET next_row = (SELECT MIN(Row_No) FROM tmp_inventory_merge WHERE Shard_Count IS NOT NULL);
+    WHILE next_row IS NOT NULL DO
+        SELECT Product_ID, Warehouse_ID, Shard_Count INTO row_product, row_warehouse, product_shards
+        FROM tmp_inventory_merge WHERE Row_No = next_row;
+
+        CALL SpreadShards(row_product, row_warehouse, product_shards);
+
+        SET next_row = (SELECT MIN(Row_No) FROM tmp_inventory_merge
+                        WHERE Shard_Count IS NOT NULL AND Row_No > next_row);
+    END WHILE;
+
+    COMMIT;
+
+    SELECT s.Line_No,
+           IF(p.Product_ID IS NULL, CONCAT('Unknown Product_ID ', s.Product_ID),
+              CONCAT('Unknown Warehouse_ID ', s.Warehouse_ID)) AS Reason
+    FROM tmp_inventory_import s
+    LEFT JOIN PRODUCT p ON p.Product_ID = s.Product_ID
+    LEFT JOIN WAREHOUSE w ON w.Warehouse_ID = s.Warehouse_ID
+    WHERE p.Product_ID IS NULL OR w.Warehouse_ID IS NULL
+    ORDER BY s.Line_No;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_inventory_merge;
+END$$
+DELIMITER ;
+
+-- Procedure: BulkSetOrderStatus
+-- Sets many orders to p_status in one transaction. The per-row history
+-- trigger is bypassed; the transitions are written to Order_History with
+-- one multi-row INSERT, so a bulk update costs two set-based statements
+-- instead of one history insert per row. Returns the number of orders
+-- whose status changed.
+-- p_order_ids: JSON array of Order_IDs
+DELIMITER $$
+CREATE PROCEDURE BulkSetOrderStatus(IN p_order_ids JSON, IN p_status VARCHAR(50))
+BEGIN
+    DECLARE locked_rows INT;
+    DECLARE changed_rows INT;
+    DECLARE log_time DATETIME DEFAULT NOW();
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @qc_defer_history = NULL;
+        ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS tmp_status;
+        RESIGNAL;
+    END;
+
+    IF p_status IS NULL OR p_status = '' THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'A status is required.';
+    END IF;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_status;
+    CREATE TEMPORARY TABLE tmp_status (
+        Order_ID INT PRIMARY KEY,
+        Changed TINYINT NOT NULL DEFAULT 0
+    );
+    INSERT IGNORE INTO tmp_status (Order_ID)
+    SELECT jt.order_id
+    FROM JSON_TABLE(p_order_ids, '$[*]' COLUMNS (order_id INT PATH '$' ERROR ON EMPTY)) AS jt;
+
+    START TRANSACTION;
+
+    -- Lock first so the rows marked below are exactly the ones updated
+    SELECT COUNT(*) INTO locked_rows
+    FROM tmp_status t
+    STRAIGHT_JOIN `ORDER` o ON o.Order_ID = t.Order_ID
+    FOR UPDATE;
+
+    UPDATE tmp_status t
+    JOIN `ORDER` o ON o.Order_ID = t.Order_ID
+    SET t.Changed = 1
+    WHERE o.Status <> p_status;
+
+    SET @qc_defer_history = 1;
+    UPDATE `ORDER` o
+    JOIN tmp_status t ON t.Order_ID = o.Order_ID
+    SET o.Status = p_status
+    WHERE t.Changed = 1;
+    SET changed_rows = ROW_COUNT();
+    SET @qc_defer_history = NULL;
+
+    INSERT INTO Order_History (Order_ID, Status, Log_Time)
+    SELECT t.Order_ID, p_status, log_time
+    FROM tmp_status t
+    WHERE t.Changed = 1
+    ORDER BY t.Order_ID;
+
+    COMMIT;
+
+    SELECT changed_rows AS Changed;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_status;
+END$$
+DELIMITER ;
+
+-- Procedure: ArchiveClosedOrders
+-- Moves up to p_batchSize closed ('Delivered' / 'Cancelled') orders sold
+-- more than p_olderThanDays days ago, oldest first, into the Archive_
+-- tables: items, payment, customer link and history go with the order.
+-- Orders that were never paid are aged by their last status change. The
+-- candidates are picked without locking and re-checked under the lock, and
+-- each call is one short transaction, so the job can run beside normal
+-- traffic. Returns the number of orders moved and the number of candidates
+-- scanned (some may have been reopened meanwhile); call it until the scan
+-- comes back below p_batchSize.
+DELIMITER $$
+CREATE PROCEDURE ArchiveClosedOrders(IN p_olderThanDays INT, IN p_batchSize INT)
+BEGIN
+    DECLARE locked_rows INT;
+    DECLARE archived_rows INT;
+    DECLARE scanned_rows INT;
+    DECLARE unpaid_limit INT;
+    DECLARE batch_until DATETIME;
+    DECLARE cutoff DATETIME DEFAULT NOW() - INTERVAL p_olderThanDays DAY;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS tmp_archive;
+        RESIGNAL;
+    END;
+
+    IF p_olderThanDays IS NULL OR p_olderThanDays < 1 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Only orders at least a day old can be archived.';
+    END IF;
+    IF p_batchSize IS NULL OR p_batchSize < 1 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Batch size must be positive.';
+    END IF;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_archive;
+    CREATE TEMPORARY TABLE tmp_archive (Order_ID INT PRIMARY KEY);
+
+    -- Oldest sales first, by idx_payment_trans_date
+    INSERT INTO tmp_archive (Order_ID)
+    SELECT p.Order_ID
+    FROM PAYMENT p
+    JOIN `ORDER` o ON o.Order_ID = p.Order_ID
+    WHERE p.Trans_date < cutoff
+      AND o.Status IN ('Delivered', 'Cancelled')
+    ORDER BY p.Trans_date, p.Order_ID
+    LIMIT p_batchSize;
+    SET scanned_rows = ROW_COUNT();
+
+    -- Then closed orders with no payment (e.g. cancelled before paying), by idx_order_status
+    IF scanned_rows < p_batchSize THEN
+        SET unpaid_limit = p_batchSize - scanned_rows;
+        INSERT INTO tmp_archive (Order_ID)
+        SELECT o.Order_ID
+        FROM `ORDER` o
+        WHERE o.Status IN ('Delivered', 'Cancelled')
+          AND NOT EXISTS (SELECT 1 FROM PAYMENT p WHERE p.Order_ID = o.Order_ID)
+          AND (SELECT MAX(h.Log_Time) FROM Order_History h WHERE h.Order_ID = o.Order_ID) < cutoff
+        ORDER BY o.Order_ID
+        LIMIT unpaid_limit;
+        SET scanned_rows = scanned_rows + ROW_COUNT();
+    END IF;
+
+    START TRANSACTION;
+
+    SELECT COUNT(*) INTO locked_rows
+    FROM tmp_archive t
+    STRAIGHT_JOIN `ORDER` o ON o.Order_ID = t.Order_ID
+    FOR UPDATE;
+
+    -- Reopened since the scan: stays hot
+    DELETE t FROM tmp_archive t
+    JOIN `ORDER` o ON o.Order_ID = t.Order_ID
+    WHERE o.Status NOT IN ('Delivered', 'Cancelled');
+
+    INSERT INTO Archive_Order (Order_ID, Items, Order_Total, Warehouse_ID, Status, Driver_ID)
+    SELECT o.Order_ID, o.Items, o.Order_Total, o.Warehouse_ID, o.Status, o.Driver_ID
+    FROM tmp_archive t
+    JOIN `ORDER` o ON o.Order_ID = t.Order_ID;
+    SET archived_rows = ROW_COUNT();
+
+    INSERT INTO Archive_Order_Items (OrderItem_ID, Order_ID, Product_ID, Quantity)
+    SELECT oi.OrderItem_ID, oi.Order_ID, oi.Product_ID, oi.Quantity
+    FROM tmp_archive t
+    JOIN ORDER_ITEMS oi ON oi.Order_ID = t.Order_ID;
+
+    INSERT INTO Archive_Payment (Payment_ID, Payment_mode, Trans_date, Status, Order_ID)
+    SELECT p.Payment_ID, p.Payment_mode, p.Trans_date, p.Status, p.Order_ID
+    FROM tmp_archive t
+    JOIN PAYMENT p ON p.Order_ID = t.Order_ID;
+
+    INSERT INTO Archive_Cust_Order (Cust_OrderID, Customer_ID, Order_ID)
+    SELECT co.Cust_OrderID, co.Customer_ID, co.Order_ID
+    FROM tmp_archive t
+    JOIN CUST_ORDER co ON co.Order_ID = t.Order_ID;
+
+    INSERT INTO Archive_Order_History (History_ID, Order_ID, Status, Log_Time)
+    SELECT h.History_ID, h.Order_ID, h.Status, h.Log_Time
+    FROM tmp_archive t
+    JOIN Order_History h ON h.Order_ID = t.Order_ID;
+
+    SELECT MAX(p.Trans_date) INTO batch_until
+    FROM tmp_archive t
+    JOIN Archive_Payment p ON p.Order_ID = t.Order_ID;
+
+    -- Items, payment, customer link and history go by ON DELETE CASCADE
+    DELETE o FROM `ORDER` o
+    JOIN tmp_archive t ON t.Order_ID = o.Order_ID;
+
+    IF batch_until IS NOT NULL THEN
+        INSERT INTO Archive_Watermark (Id, Archived_Until)
+        VALUES (1, batch_until)
+        ON DUPLICATE KEY UPDATE Archived_Until = GREATEST(Archived_Until, VALUES(Archived_Until));
+    END IF;
+
+    COMMIT;
+
+    SELECT archived_rows AS Archived, scanned_rows AS Scanned;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_archive;
+END$$
+DELIMITER ;
@@ -1,9 +1,24 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import mysql.connector
-import json
+import threading
+import time
+import uuid
 from datetime import date
 
+import db_pool
+import db_worker
+import delta_sync
+import invalidation
+import query_stats
+import ref_cache
+import search
+import catalog_import
+import report_export
+import services
+from services import fetch_available_products, fetch_inventory, fetch_inventory_products
+from treeviews import PagedTreeview, TreeSync
+
 # --- DATABASE CONNECTION ---
 # IMPORTANT: Update this dictionary with your MySQL credentials!
 # I have set the user to 'root' based on the image you provided.
@@ -14,21 +29,21 @@ db_config = {
     'database': 'QuickCommerceDB'
 }
 
+SYNC_INTERVAL_MS = 3000 # How often to poll Change_Log for other consoles' edits
+PREFETCH_DELAY_MS = 750 # Idle time before the next tab's data is fetched in the background
+QUERY_STATS_TOP_N = 50  # Statements listed on the Query Stats tab
+SEARCH_DEBOUNCE_MS = 150 # Typing pause before a picker searches
+ALL_WAREHOUSES = "All warehouses (auto-route)" # Shop option: summed stock, orders routed by the database
+
 def get_db_connection():
-    """Establishes a connection to the MySQL database."""
-    try:
-        conn = mysql.connector.connect(**db_config)
-        return conn
-    except mysql.connector.Error as err:
-        messagebox.showerror("Database Error", f"Failed to connect to database: {err}")
-        return None
+    """Borrows a connection from the shared pool. Calling close() returns it to the pool.
 
-# --- HELPER FUNCTIONS ---
+    Runs on DB worker threads, so connection errors are raised to the caller
+    (and reported by the worker's error callback) instead of shown here.
+    """
+    return db_pool.get_pool(db_config).acquire()
 
-def clear_treeview(tree):
-    """Removes all items from a Treeview."""
-    for item in tree.get_children():
-        tree.delete(item)
+# --- HELPER FUNCTIONS ---
 
 def show_error(title, message):
     messagebox.showerror(title, message)
@@ -36,42 +51,69 @@ def show_error(title, message):
 def show_info(title, message):
     messagebox.showinfo(title, message)
 
-def populate_combobox(combobox, query, display_col, id_col=None):
-    """Populates a ComboBox from a database query."""
+def run_with_connection(work, *args, action=None):
+    """Runs work(conn, *args) on a pooled connection. Safe to call from worker threads.
+
+    Every statement is timed in query_stats under `action` (default: the
+    name of `work`).
+    """
+    action = action or query_stats.work_name(work)
+    started = time.perf_counter()
     conn = get_db_connection()
-    if not conn:
-        return
-        
-    combobox_data = {}
+    query_stats.recorder.record(query_stats.CONNECT, action, "connect", time.perf_counter() - started)
     try:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        display_values = []
-        for row in rows:
-            display_text = row[cursor.column_names.index(display_col)]
-            key = row[cursor.column_names.index(id_col or display_col)]
-            
-            # Format display text (e.g., "John Doe (ID: 1)")
-            formatted_text = f"{display_text} (ID: {key})"
-            display_values.append(formatted_text)
-            combobox_data[formatted_text] = key
-            
-        combobox['values'] = display_values
-        return combobox_data
-    except mysql.connector.Error as err:
-        show_error("Database Error", f"Failed to load data: {err}")
+        return work(query_stats.InstrumentedConnection(conn, action), *args)
     finally:
-        if conn:
-            conn.close()
+        conn.close()
+
+def fill_combobox(combobox, combobox_data):
+    """Shows the keys of combobox_data as the ComboBox values and returns the mapping."""
+    combobox['values'] = list(combobox_data)
     return combobox_data
 
+# --- QUERIES (run on DB worker threads) ---
+
+def shop_row(row):
+    return (row['Product_ID'], row['P_Name'], f"{row['Price']:.2f}", row['Quantity'])
+
+def fetch_shop_rows(conn, warehouse_id, key_col, keys):
+    """Re-reads the shop rows behind changed PRODUCT, Inventory or Stock_Reservation keys."""
+    if warehouse_id is None and key_col == "i.Inventory_ID":
+        # The all-warehouses view is keyed by product, not by stock row
+        key_col, keys = "p.Product_ID", fetch_inventory_products(conn, keys)
+    if not keys:
+        return []
+    return fetch_available_products(conn, warehouse_id, key_col, keys)
+
+def inventory_row(row):
+    return (row['Inventory_ID'], row['P_Name'], row['Location'], row['Quantity'])
+
+class StartupTimer:
+    """Records named checkpoints from app start and prints them once as a report."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []
+        self.reported = False
+
+    def mark(self, label):
+        if not self.reported:
+            self.marks.append((label, time.perf_counter() - self.start))
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        print("--- Startup Timing ---")
+        for label, elapsed in self.marks:
+            print(f"{elapsed * 1000:8.1f} ms  {label}")
+
 # --- MAIN APPLICATION ---
 
 class QuickCommerceApp(tk.Tk):
     def __init__(self):
         super().__init__()
+        self.startup = StartupTimer()
         self.title("Quick Commerce Management System")
         self.geometry("1200x800")
 
@@ -92,6 +134,24 @@ class QuickCommerceApp(tk.Tk):
 
         self.notebook.pack(expand=True, fill="both")
 
+        # --- Background DB Worker ---
+        # All queries run off the UI thread; results come back through after().
+        self.db = db_worker.DBWorker(self)
+
+        # --- Reference Data Cache ---
+        # Dropdown contents are served from memory until a TTL runs out or a write invalidates them.
+        self.ref_cache = ref_cache.RefCache()
+        # Type-ahead pickers (customers, products): top matches per typed text, narrowed in memory when possible.
+        self.search_cache = search.SearchCache()
+        self.search_pending = {}  # picker key -> after() id of its debounced search
+
+        # --- Lazy Views ---
+        # Each view loads its data the first time it becomes visible.
+        self.views = {}          # name -> loader
+        self.view_frames = {}    # frame widget path -> view name
+        self.sub_notebooks = {}  # top-level tab path -> its inner Notebook
+        self.loaded_views = set()
+
         # --- Populate Each Tab ---
         self.create_customer_tab()
         self.create_warehouse_tab()
@@ -102,23 +162,261 @@ class QuickCommerceApp(tk.Tk):
         self.selected_driver_id = None
         self.selected_vehicle_id = None
 
+        self.startup.mark("Widgets built")
+
         # --- Initial Data Load ---
-        # Load all data on startup
-        self.refresh_all_tabs()
+        # Only the visible tab is loaded; the others load when first opened.
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        for sub_notebook in self.sub_notebooks.values():
+            sub_notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.on_tab_changed()
+        self.after_idle(lambda: self.startup.mark("Window idle (usable)"))
+
+        # --- Delta Sync ---
+        # Afterwards only rows changed since the last poll are re-read.
+        self.sync = delta_sync.DeltaSync()
+        self.subscribe_to_changes()
+        self.poll_changes()
+
+        # --- Invalidation Bus ---
+        # Our own writes publish the tables they touched; each affected view
+        # refreshes at most once per frame instead of whole tabs cascading.
+        self.bus = invalidation.InvalidationBus(self)
+        self.bus.add_listener(self.ref_cache.invalidate_table)
+        self.bus.add_listener(self.search_cache.invalidate_table)
+        self.subscribe_to_invalidations()
+
+    # --- Lazy Loading ---
+
+    def register_view(self, name, frame, loader, notebook=None):
+        """Registers a (sub-)tab whose data is loaded by loader() on first display."""
+        self.views[name] = loader
+        self.view_frames[str(frame)] = name
+        if notebook is not None:
+            self.sub_notebooks[str(notebook.master)] = notebook
+
+    def visible_view(self):
+        tab = str(self.notebook.select())
+        if tab in self.sub_notebooks:
+            tab = str(self.sub_notebooks[tab].select())
+        return self.view_frames.get(tab)
+
+    def ensure_loaded(self, name):
+        if name in self.loaded_views:
+            return
+        self.loaded_views.add(name)
+        self.startup.mark(f"Loading '{name}'")
+        self.views[name]()
+
+    def refresh_views(self, *names):
+        """Re-runs the loaders of the given views that have already been shown."""
+        for name in names:
+            if name in self.loaded_views:
+                self.views[name]()
+
+    def when_loaded(self, name, fn):
+        """Wraps fn so it does nothing until view `name` has been loaded."""
+        def wrapper(*args):
+            if name in self.loaded_views:
+                return fn(*args)
+        return wrapper
+
+    def on_tab_changed(self, event=None):
+        """Loads the visible view on first display, then prefetches the next one."""
+        view = self.visible_view()
+        if view is not None:
+            self.ensure_loaded(view)
+            self.after(PREFETCH_DELAY_MS, lambda: self.prefetch_after(view))
+
+    def prefetch_after(self, view):
+        """Loads the view that follows `view` in tab order, if the user is still there."""
+        if self.visible_view() != view:
+            return
+        names = list(self.views)
+        for name in names[names.index(view) + 1:]:
+            if name not in self.loaded_views:
+                self.ensure_loaded(name)
+                return
+
+    def subscribe_to_changes(self):
+        """Wires every view to the Change_Log tables it displays."""
+        def subscribe(view, table, fetch_rows, apply, resync):
+            # Views that were never opened are skipped entirely.
+            self.sync.subscribe(table, lambda conn, keys: fetch_rows(conn, keys) if view in self.loaded_views else [],
+                                self.when_loaded(view, apply), self.when_loaded(view, resync))
+
+        for view, table, paged in (("products", "PRODUCT", self.product_list), ("customers", "CUSTOMER", self.customer_list),
+                                   ("drivers", "DRIVER", self.driver_list), ("fleet", "FLEET", self.fleet_list)):
+            subscribe(view, table, paged.fetch_rows, paged.apply_delta, paged.refresh)
+
+        # Shop and inventory views: re-read rows by the changed key.
+        subscribe("shop", "Inventory", lambda conn, keys: fetch_shop_rows(conn, self.shop_warehouse_id, "i.Inventory_ID", keys),
+                  self.apply_shop_delta, self.load_available_products)
+        subscribe("shop", "PRODUCT", lambda conn, keys: fetch_shop_rows(conn, self.shop_warehouse_id, "p.Product_ID", keys),
+                  self.apply_shop_delta, self.load_available_products)
+        subscribe("shop", "Stock_Reservation", lambda conn, keys: fetch_shop_rows(conn, self.shop_warehouse_id, "p.Product_ID", keys),
+                  self.apply_shop_delta, self.load_available_products)
+        subscribe("inventory", "Inventory", lambda conn, keys: fetch_inventory(conn, "i.Inventory_ID", keys),
+                  self.apply_inventory_delta, self.refresh_inventory_tree)
+        subscribe("inventory", "PRODUCT", lambda conn, keys: fetch_inventory(conn, "i.Product_ID", keys),
+                  self.apply_inventory_delta, self.refresh_inventory_tree)
+
+        # Dropdowns are small: any change drops the cached copy and reloads them.
+        no_rows = lambda conn, keys: []
+        for view, table, load in (("shop", "CUSTOMER", self.load_customer_combo),
+                                  ("inventory", "PRODUCT", self.load_inv_product_combo),
+                                  ("assign", "DRIVER", self.load_assign_driver_combo),
+                                  ("assign", "FLEET", self.load_assign_vehicle_combo)):
+            reload = lambda *_, table=table, load=load: (self.ref_cache.invalidate_table(table),
+                                                         self.search_cache.invalidate_table(table), load())
+            subscribe(view, table, no_rows, reload, reload)
+
+    def subscribe_to_invalidations(self):
+        """Maps each table to the views (and dropdowns) that show it."""
+        def subscribe(tables, view, name, refresh):
+            # Views that were never opened load fresh data when first shown.
+            for table in tables:
+                self.bus.subscribe(table, name, self.when_loaded(view, refresh))
+
+        subscribe(("PRODUCT", "Inventory", "Stock_Reservation"), "shop", "shop_products", self.load_available_products)
+        subscribe(("CUSTOMER",), "shop", "customer_combo", self.load_customer_combo)
+        subscribe(("PRODUCT",), "products", "product_list", self.refresh_product_tree)
+        subscribe(("PRODUCT", "Inventory"), "inventory", "inventory_tree", self.refresh_inventory_tree)
+        subscribe(("PRODUCT",), "inventory", "inv_product_combo", self.load_inv_product_combo)
+        subscribe(("DRIVER",), "drivers", "driver_list", self.refresh_driver_tree)
+        subscribe(("FLEET",), "fleet", "fleet_list", self.refresh_fleet_tree)
+        subscribe(("DRIVER",), "assign", "assign_driver_combo", self.load_assign_driver_combo)
+        subscribe(("FLEET",), "assign", "assign_vehicle_combo", self.load_assign_vehicle_combo)
+        subscribe(("CUSTOMER",), "customers", "customer_list", self.refresh_customer_tree)
+        subscribe(("ORDER", "PAYMENT", "CUSTOMER"), "reports", "sales_report", self.generate_report)
+
+    def poll_changes(self):
+        """Applies rows changed since the last poll, then schedules the next one."""
+        def on_polled(results):
+            self.sync.deliver(results)
+            self.after(SYNC_INTERVAL_MS, self.poll_changes)
+
+        def on_failed(err):
+            print(f"Delta sync failed: {err}") # Log error; retry on the next tick
+            self.after(SYNC_INTERVAL_MS, self.poll_changes)
+
+        # Polls are chained, never overlapped, so no key is needed.
+        self.db.submit(None, run_with_connection, self.sync.poll, on_success=on_polled, on_error=on_failed,
+                       action="delta_sync")
+
+    def apply_shop_delta(self, rows, deleted_keys):
+        if deleted_keys:
+            # Cascaded deletes are not logged per row; reload the small shop list.
+            self.load_available_products()
+            return
+        for row in rows:
+            if row['Quantity'] > 0:
+                # A product back in stock goes in Product_ID order, as on a full load
+                self.shop_sync.upsert(shop_row(row), self.shop_sync.sorted_index(row['Product_ID']))
+            else:
+                self.shop_sync.delete(row['Product_ID'])
+
+    def apply_inventory_delta(self, rows, deleted_keys):
+        if deleted_keys:
+            self.refresh_inventory_tree()
+            return
+        for row in rows:
+            self.inventory_sync.upsert(inventory_row(row))
+
+    def run_db(self, key, work, *args, on_success=None, on_error=None, error_title="Database Error",
+               error_prefix="Database call failed"):
+        """Runs work(conn, *args) on the DB worker and calls on_success(result) on the UI thread.
+
+        On failure the error is shown, then on_error(err) is called if given.
+        A newer job with the same key supersedes an older one; pass key=None for writes.
+        Query stats are recorded under the key, or the name of `work` for writes.
+        """
+        def report(err):
+            show_error(error_title, f"{error_prefix}: {err}")
+            if on_error:
+                on_error(err)
+        return self.db.submit(key, run_with_connection, work, *args, on_success=on_success, on_error=report,
+                              action=key)
+
+    def load_combobox(self, key, combobox, entity, attr_name, first=None):
+        """Fills a ComboBox with reference data and stores its {text: id} mapping on self.attr_name.
+
+        Served from the reference cache when possible, otherwise loaded in the
+        background. `first` is an optional {text: id} shown above the data.
+        """
+        def on_loaded(data):
+            setattr(self, attr_name, fill_combobox(combobox, {**(first or {}), **data}))
+
+        data = self.ref_cache.get(entity)
+        if data is not None:
+            self.db.cancel(key) # An older in-flight load must not overwrite this
+            on_loaded(data)
+            return
+        self.run_db(key, self.ref_cache.load, entity,
+                    on_success=on_loaded, error_prefix="Failed to load data")
+
+    def attach_search(self, key, combobox, entity, attr_name):
+        """Makes an editable ComboBox a type-ahead picker: typing searches `entity` after a short pause."""
+        def on_key(event):
+            if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+                return
+            pending = self.search_pending.pop(key, None)
+            if pending is not None:
+                self.after_cancel(pending)
+            self.search_pending[key] = self.after(SEARCH_DEBOUNCE_MS,
+                                                  lambda: self.load_search(key, combobox, entity, attr_name))
+        combobox.bind("<KeyRelease>", on_key)
+
+    def load_search(self, key, combobox, entity, attr_name):
+        """Fills a picker with the top matches for its text and stores its {text: id} mapping on self.attr_name."""
+        self.search_pending.pop(key, None)
+        text = combobox.get()
+
+        def on_loaded(rows):
+            data = search.combobox_data(rows)
+            current = getattr(self, attr_name)
+            chosen = combobox.get()
+            if chosen in current and chosen not in data:
+                data = {chosen: current[chosen], **data} # Keep an earlier pick valid
+            setattr(self, attr_name, data)
+            combobox['values'] = list(data)
+
+        rows = self.search_cache.get(entity, text)
+        if rows is not None:
+            self.db.cancel(key) # An older in-flight search must not overwrite this
+            on_loaded(rows)
+            return
+        self.run_db(key, self.search_cache.load, entity, text,
+                    on_success=on_loaded, error_prefix="Search failed")
+
+    def load_customer_combo(self, *_):
+        self.load_search('customer_combo', self.customer_combo, search.CUSTOMERS, 'customer_data')
+
+    def load_shop_warehouse_combo(self, *_):
+        self.load_combobox('shop_warehouse_combo', self.shop_warehouse_combo, 'warehouses', 'shop_warehouse_data',
+                           first={ALL_WAREHOUSES: None})
+
+    def load_inv_product_combo(self, *_):
+        self.load_search('inv_product_combo', self.inv_product_combo, search.PRODUCTS, 'inv_product_data')
+
+    def load_inv_warehouse_combo(self, *_):
+        self.load_combobox('inv_warehouse_combo', self.inv_warehouse_combo, 'warehouses', 'inv_warehouse_data')
+
+    def load_assign_driver_combo(self, *_):
+        self.load_combobox('assign_driver_combo', self.assign_driver_combo, 'available_drivers', 'assign_driver_data')
+
+    def load_assign_vehicle_combo(self, *_):
+        self.load_combobox('assign_vehicle_combo', self.assign_vehicle_combo, 'available_vehicles', 'assign_vehicle_data')
 
-    def refresh_all_tabs(self):
-        """Calls the refresh method for every tab in the application."""
-        self.refresh_customer_tab_data()
-        self.refresh_warehouse_tab_data()
-        self.refresh_fleet_tab_data()
-        self.refresh_admin_tab_data()
-        
     # --- TAB 1: CUSTOMER APP ---
     def create_customer_tab(self):
         # --- Data Storage ---
         self.customer_data = {}
-        # self.warehouse_data = {} # Removed for simplicity
+        self.shop_warehouse_data = {}
+        self.shop_warehouse_id = None  # None = all warehouses, orders are routed
         self.cart_items = {}  # {product_id: {name, price, quantity}}
+        self.cart_token = uuid.uuid4().hex  # Identifies this cart's stock holds
+        self.order_in_flight = False
 
         # --- Main Frames ---
         top_frame = ttk.Frame(self.tab_customer)
@@ -133,23 +431,23 @@ class QuickCommerceApp(tk.Tk):
         main_paned_window.add(shop_frame)
         main_paned_window.add(cart_frame)
 
-        # --- Top Frame: User Selection (Warehouse Removed) ---
+        # --- Top Frame: User & Warehouse Selection ---
         ttk.Label(top_frame, text="Select Customer:").pack(side=tk.LEFT, padx=5)
-        self.customer_combo = ttk.Combobox(top_frame, state="readonly", width=30)
+        self.customer_combo = ttk.Combobox(top_frame, width=30) # Type a name, email or ID to search
         self.customer_combo.pack(side=tk.LEFT, padx=5)
+        self.attach_search('customer_combo', self.customer_combo, search.CUSTOMERS, 'customer_data')
 
-        # --- !! WAREHOUSE SELECTION REMOVED !! ---
-        # ttk.Label(top_frame, text="Select Warehouse:").pack(side=tk.LEFT, padx=5)
-        # self.warehouse_combo = ttk.Combobox(top_frame, state="readonly", width=30)
-        # self.warehouse_combo.pack(side=tk.LEFT, padx=5)
-        # self.warehouse_combo.bind("<<ComboboxSelected>>", self.load_available_products)
+        ttk.Label(top_frame, text="Select Warehouse:").pack(side=tk.LEFT, padx=5)
+        self.shop_warehouse_combo = ttk.Combobox(top_frame, state="readonly", width=30)
+        self.shop_warehouse_combo.pack(side=tk.LEFT, padx=5)
+        self.shop_warehouse_combo.bind("<<ComboboxSelected>>", self.on_shop_warehouse_selected)
 
         # --- !! NEW REFRESH BUTTON !! ---
         ttk.Button(top_frame, text="Refresh Data", command=self.refresh_customer_tab_data).pack(side=tk.RIGHT, padx=10)
 
 
         # --- Shop Frame: Available Products ---
-        ttk.Label(shop_frame, text="Available Products (From Main Warehouse)", font=("Arial", 14, "bold")).pack(pady=5)
+        ttk.Label(shop_frame, text="Available Products", font=("Arial", 14, "bold")).pack(pady=5)
         
         cols = ("Product_ID", "Name", "Price", "Stock")
         self.shop_tree = ttk.Treeview(shop_frame, columns=cols, show="headings", height=20)
@@ -157,6 +455,7 @@ class QuickCommerceApp(tk.Tk):
             self.shop_tree.heading(col, text=col)
             self.shop_tree.column(col, width=100)
         self.shop_tree.pack(fill="both", expand=True)
+        self.shop_sync = TreeSync(self.shop_tree)
 
         ttk.Button(shop_frame, text="Add to Cart", command=self.add_to_cart).pack(pady=10)
 
@@ -169,55 +468,54 @@ class QuickCommerceApp(tk.Tk):
             self.cart_tree.heading(col, text=col)
             self.cart_tree.column(col, width=80)
         self.cart_tree.pack(fill="both", expand=True)
+        self.cart_sync = TreeSync(self.cart_tree)
 
         btn_frame = ttk.Frame(cart_frame)
         btn_frame.pack(fill="x", pady=10)
         ttk.Button(btn_frame, text="Place Order", command=self.place_order).pack(side=tk.LEFT, fill="x", expand=True, padx=5)
         ttk.Button(btn_frame, text="Clear Cart", command=self.clear_cart).pack(side=tk.LEFT, fill="x", expand=True, padx=5)
+
+        self.register_view('shop', self.tab_customer, self.load_shop_view)
         
 
     def refresh_customer_tab_data(self):
-        """Refreshes all dynamic data on the Customer tab."""
-        # Refresh comboboxes
-        self.customer_data = populate_combobox(self.customer_combo, "SELECT * FROM CUSTOMER", "C_Name", "Customer_ID")
-        # self.warehouse_data = populate_combobox(self.warehouse_combo, "SELECT * FROM WAREHOUSE", "Location", "Warehouse_ID") # Removed
-        
-        # Clear selections and product list
+        """Refreshes all dynamic data on the Customer tab (once it has been opened)."""
+        self.search_cache.invalidate_table("CUSTOMER") # An explicit refresh bypasses the caches
+        self.ref_cache.invalidate_table("WAREHOUSE")
+        self.refresh_views('shop')
+        print("Customer Tab Refreshed") # For debugging
+
+    def load_shop_view(self):
+        # Clear selections (the product list is reconciled in place)
         self.customer_combo.set('')
-        # self.warehouse_combo.set('') # Removed
-        clear_treeview(self.shop_tree)
+        self.shop_warehouse_combo.set(ALL_WAREHOUSES)
+
+        # Refresh comboboxes
+        self.load_customer_combo()
+        self.load_shop_warehouse_combo()
+        self.shop_warehouse_id = None
         self.clear_cart()
         
-        # --- !! AUTO-LOAD PRODUCTS FROM WAREHOUSE 1 !! ---
         self.load_available_products()
-        print("Customer Tab Refreshed") # For debugging
+
+    def on_shop_warehouse_selected(self, event=None):
+        """Switches the shop between one warehouse's stock and all warehouses."""
+        warehouse_id = self.shop_warehouse_data.get(self.shop_warehouse_combo.get())
+        if warehouse_id == self.shop_warehouse_id:
+            return
+        self.shop_warehouse_id = warehouse_id
+        self.clear_cart() # Stock limits in the cart were checked against the old view
+        self.load_available_products()
 
     def load_available_products(self):
-        """Loads products into the shop view from the default warehouse (ID 1)."""
-        clear_treeview(self.shop_tree)
-        
-        # --- !! HARDCODED WAREHOUSE ID = 1 !! ---
-        warehouse_id = 1 
+        """Loads in-stock products for the selected warehouse, or summed over all warehouses."""
+        def render(rows):
+            self.shop_sync.apply([shop_row(row) for row in rows])
+            self.startup.mark("Shop products shown")
+            self.startup.report()
 
-        conn = get_db_connection()
-        if not conn:
-            return
-            
-        try:
-            cursor = conn.cursor(dictionary=True)
-            query = """
-                SELECT p.Product_ID, p.P_Name, p.Price, i.Quantity 
-                FROM PRODUCT p
-                JOIN Inventory i ON p.Product_ID = i.Product_ID
-                WHERE i.Warehouse_ID = %s AND i.Quantity > 0
-            """
-            cursor.execute(query, (warehouse_id,))
-            for row in cursor.fetchall():
-                self.shop_tree.insert("", tk.END, values=(row['Product_ID'], row['P_Name'], f"{row['Price']:.2f}", row['Quantity']))
-        except mysql.connector.Error as err:
-            show_error("Database Error", f"Failed to load products: {err}")
-        finally:
-            conn.close()
+        self.run_db('shop_products', fetch_available_products, self.shop_warehouse_id,
+                    on_success=render, error_prefix="Failed to load products")
 
     def add_to_cart(self):
         selected_item = self.shop_tree.focus()
@@ -227,33 +525,52 @@ class QuickCommerceApp(tk.Tk):
 
         item = self.shop_tree.item(selected_item)
         product_id, name, price, stock = item['values']
-        
+        if stock <= 0:
+            show_error("Stock Error", f"{name} is held in other carts or sold out.")
+            return
+
+        # Shown stock already excludes every live hold, this cart's included
         quantity = simpledialog.askinteger("Quantity", f"Enter quantity for {name}:", minvalue=1, maxvalue=stock)
-        
-        if quantity:
+        if not quantity:
+            return
+
+        # The units are held for this cart before they are shown in it
+        token = self.cart_token
+
+        def on_reserved(_):
+            if token != self.cart_token:
+                # The cart was cleared meanwhile
+                self.run_db(None, services.release_stock, token, product_id)
+                return
             if product_id in self.cart_items:
-                # Check stock against combined quantity
-                new_qty = self.cart_items[product_id]['quantity'] + quantity
-                if new_qty > stock:
-                    show_error("Stock Error", f"Not enough stock. You have {self.cart_items[product_id]['quantity']} in cart, and only {stock} available.")
-                    return
-                self.cart_items[product_id]['quantity'] = new_qty
+                self.cart_items[product_id]['quantity'] += quantity
             else:
                 self.cart_items[product_id] = {'name': name, 'price': float(price), 'quantity': quantity}
-            
             self.refresh_cart_tree()
+            self.bus.publish("Stock_Reservation")
 
-    def refresh_cart_tree(self):
-        clear_treeview(self.cart_tree)
-        for pid, item in self.cart_items.items():
-            self.cart_tree.insert("", tk.END, values=(pid, item['name'], item['quantity'], f"{item['price']:.2f}"))
+        self.run_db(None, services.reserve_stock, token, product_id, quantity,
+                    on_success=on_reserved, error_title="Stock Error", error_prefix="Could not add to cart")
 
-    def clear_cart(self):
+    def refresh_cart_tree(self):
+        self.cart_sync.apply([(pid, item['name'], item['quantity'], f"{item['price']:.2f}") for pid, item in self.cart_items.items()])
+
+    def clear_cart(self, release=True):
+        """Empties the cart and starts a new one; release=False when an order used up the holds."""
+        if release and self.cart_items:
+            self.run_db(None, services.release_stock, self.cart_token,
+                        on_success=lambda _: self.bus.publish("Stock_Reservation"),
+                        error_prefix="Could not release the cart's stock")
+        self.cart_token = uuid.uuid4().hex
         self.cart_items = {}
         self.refresh_cart_tree()
 
     def place_order(self):
         # --- Constraint Checks ---
+        if self.order_in_flight:
+            show_error("Order Error", "The previous order is still being placed.")
+            return
+
         if not self.cart_items:
             show_error("Order Error", "Your cart is empty.")
             return
@@ -263,43 +580,38 @@ class QuickCommerceApp(tk.Tk):
             show_error("Order Error", "Please select a customer.")
             return
             
-        # --- !! WAREHOUSE ID IS NOW HARDCODED !! ---
         customer_id = self.customer_data.get(customer_text)
-        warehouse_id = 1 # Default warehouse
-        
-        # Format cart for JSON
-        cart_json_list = []
-        for pid, item in self.cart_items.items():
-            cart_json_list.append({"product_id": pid, "quantity": item['quantity']})
-        
-        cart_json_string = json.dumps(cart_json_list)
-
-        conn = get_db_connection()
-        if not conn:
+        if customer_id is None:
+            show_error("Order Error", "Please pick a customer from the list.")
             return
-            
-        try:
-            cursor = conn.cursor()
-            # Call the new stored procedure
-            cursor.callproc('PlaceNewOrder', (customer_id, warehouse_id, cart_json_string))
-            conn.commit()
-            
-            show_info("Success", "Order placed successfully!")
-            self.clear_cart()
-            self.load_available_products() # Refresh stock
-            
-            # --- !! AUTO-REFRESH OTHER TABS !! ---
-            self.refresh_warehouse_tab_data() # Update inventory counts visible on WH tab
-            
-        except mysql.connector.Error as err:
-            conn.rollback()
+        warehouse_id = self.shop_warehouse_id # None lets the database route the order
+        cart = {pid: item['quantity'] for pid, item in self.cart_items.items()}
+
+        def on_placed(orders):
+            self.order_in_flight = False
+            if len(orders) > 1:
+                names = {wid: name for name, wid in self.shop_warehouse_data.items()}
+                lines = "\n".join(f"Order #{order_id} from {names.get(wid, f'warehouse {wid}')}: {total:.2f}"
+                                  for order_id, wid, total in orders)
+                show_info("Success", f"Order placed, split across {len(orders)} warehouses:\n{lines}")
+            else:
+                show_info("Success", "Order placed successfully!")
+            self.clear_cart(release=False) # PlaceNewOrder released the holds
+            self.bus.publish("ORDER", "PAYMENT", "Inventory") # Stock, inventory counts and reports
+
+        def on_failed(err):
+            self.order_in_flight = False
             # This will show our custom error message from the procedure!
             show_error("Order Failed", f"{err}")
-        finally:
-            conn.close()
+
+        self.order_in_flight = True
+        self.db.submit(None, run_with_connection, services.place_order, customer_id, cart, warehouse_id, self.cart_token,
+                       on_success=on_placed, on_error=on_failed)
 
     # --- TAB 2: WAREHOUSE MANAGER ---
     def create_warehouse_tab(self):
+        self.import_in_flight = False
+
         # --- !! NEW REFRESH BUTTON !! ---
         refresh_btn = ttk.Button(self.tab_warehouse, text="Refresh All Data", command=self.refresh_warehouse_tab_data)
         refresh_btn.pack(anchor="ne", padx=10, pady=5)
@@ -320,17 +632,22 @@ class QuickCommerceApp(tk.Tk):
         # --- Inventory Tab Content ---
         self.create_inventory_crud_ui(inventory_tab)
 
+        self.register_view('products', product_tab, self.refresh_product_tree, wh_notebook)
+        self.register_view('inventory', inventory_tab, self.load_inventory_view, wh_notebook)
+
     def refresh_warehouse_tab_data(self):
-        """Refreshes all dynamic data on the Warehouse tab."""
-        self.refresh_product_tree()
+        """Refreshes the Warehouse sub-tabs that have been opened."""
+        self.search_cache.invalidate_table("PRODUCT")
+        self.refresh_views('products', 'inventory')
+        print("Warehouse Tab Refreshed") # For debugging
+
+    def load_inventory_view(self):
         self.refresh_inventory_tree()
         # Refresh comboboxes in the "Manage Inventory" sub-tab
-        self.inv_product_data = populate_combobox(self.inv_product_combo, "SELECT * FROM PRODUCT", "P_Name", "Product_ID")
-        # --- !! REMOVED WAREHOUSE COMBO REFRESH !! ---
-        # self.inv_warehouse_data = populate_combobox(self.inv_warehouse_combo, "SELECT * FROM WAREHOUSE", "Location", "Warehouse_ID")
         self.inv_product_combo.set('')
-        # self.inv_warehouse_combo.set('')
-        print("Warehouse Tab Refreshed") # For debugging
+        self.inv_warehouse_combo.set('')
+        self.load_inv_product_combo()
+        self.load_inv_warehouse_combo()
 
     def create_product_crud_ui(self, parent_frame):
         # Form
@@ -354,14 +671,16 @@ class QuickCommerceApp(tk.Tk):
         self.p_expiry_entry.grid(row=1, column=3, padx=5, pady=5)
 
         btn = ttk.Button(form, text="Add New Product", command=self.add_product)
-        btn.grid(row=2, column=0, columnspan=4, pady=10)
+        btn.grid(row=2, column=0, columnspan=2, pady=10)
+        ttk.Button(form, text="Import CSV...", command=lambda: self.import_csv('products')).grid(row=2, column=2, columnspan=2, pady=10)
+        self.import_status_labels = {'products': ttk.Label(form, text="", font=("Arial", 9, "italic"))}
+        self.import_status_labels['products'].grid(row=3, column=0, columnspan=4, sticky="w")
 
         # Treeview
         cols = ("Product_ID", "P_Name", "Description", "Price", "Expiry_Date")
-        self.product_tree = ttk.Treeview(parent_frame, columns=cols, show="headings")
-        for col in cols:
-            self.product_tree.heading(col, text=col)
-        self.product_tree.pack(fill="both", expand=True, pady=10)
+        self.product_list = PagedTreeview(parent_frame, self.run_db, "PRODUCT", cols)
+        self.product_list.pack(fill="both", expand=True, pady=10)
+        self.product_tree = self.product_list.tree
         
         # Data loaded by refresh_warehouse_tab_data()
         # self.refresh_product_tree()
@@ -375,43 +694,27 @@ class QuickCommerceApp(tk.Tk):
         if not name or not price:
             show_error("Input Error", "Product Name and Price are required.")
             return
-
-        conn = get_db_connection()
-        if not conn: return
         try:
-            cursor = conn.cursor()
-            query = "INSERT INTO PRODUCT (P_Name, Description, Price, Expiry_Date) VALUES (%s, %s, %s, %s)"
-            cursor.execute(query, (name, desc, float(price), expiry))
-            conn.commit()
+            price = float(price)
+        except ValueError:
+            show_error("Input Error", "Price must be a number.")
+            return
+
+        def on_added(_):
             show_info("Success", "Product added.")
             # Clear entries
             self.p_name_entry.delete(0, tk.END)
             self.p_desc_entry.delete(0, tk.END)
             self.p_price_entry.delete(0, tk.END)
             self.p_expiry_entry.delete(0, tk.END)
-            
-            # --- !! AUTO-REFRESH OTHER TABS !! ---
-            self.refresh_warehouse_tab_data() # Refresh this tab's dropdowns
-            self.refresh_customer_tab_data() # Refresh customer shop
-        except mysql.connector.Error as err:
-            conn.rollback()
-            show_error("Database Error", f"Failed to add product: {err}")
-        finally:
-            conn.close()
+            self.bus.publish("PRODUCT")
+
+        self.run_db(None, services.add_product, name, desc, price, expiry,
+                    on_success=on_added, error_prefix="Failed to add product")
 
     def refresh_product_tree(self):
-        clear_treeview(self.product_tree)
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM PRODUCT")
-            for row in cursor.fetchall():
-                self.product_tree.insert("", tk.END, values=row)
-        except mysql.connector.Error as err:
-            show_error("Database Error", f"Failed to fetch products: {err}")
-        finally:
-            conn.close()
+        # Keyset-paginated; only the rows around the viewport are fetched.
+        self.product_list.refresh()
 
     def create_inventory_crud_ui(self, parent_frame):
         # Form
@@ -419,23 +722,25 @@ class QuickCommerceApp(tk.Tk):
         form.pack(fill="x")
 
         ttk.Label(form, text="Select Product:").grid(row=0, column=0, sticky="w")
-        self.inv_product_combo = ttk.Combobox(form, state="readonly", width=30)
-        self.inv_product_data = populate_combobox(self.inv_product_combo, "SELECT * FROM PRODUCT", "P_Name", "Product_ID")
+        self.inv_product_combo = ttk.Combobox(form, width=30) # Type a name, description word or ID to search
+        self.inv_product_data = {} # Loaded with the sub-tab
         self.inv_product_combo.grid(row=0, column=1, padx=5, pady=5)
+        self.attach_search('inv_product_combo', self.inv_product_combo, search.PRODUCTS, 'inv_product_data')
         
-        # --- !! WAREHOUSE SELECTION REMOVED !! ---
-        # ttk.Label(form, text="Select Warehouse:").grid(row=1, column=0, sticky="w")
-        # self.inv_warehouse_combo = ttk.Combobox(form, state="readonly", width=30)
-        # self.inv_warehouse_data = populate_combobox(self.inv_warehouse_combo, "SELECT * FROM WAREHOUSE", "Location", "Warehouse_ID")
-        # self.inv_warehouse_combo.grid(row=1, column=1, padx=5, pady=5)
+        ttk.Label(form, text="Select Warehouse:").grid(row=1, column=0, sticky="w")
+        self.inv_warehouse_combo = ttk.Combobox(form, state="readonly", width=30)
+        self.inv_warehouse_data = {} # Loaded with the sub-tab
+        self.inv_warehouse_combo.grid(row=1, column=1, padx=5, pady=5)
 
         ttk.Label(form, text="Quantity:").grid(row=0, column=2, sticky="w")
         self.inv_qty_entry = ttk.Entry(form, width=10)
         self.inv_qty_entry.grid(row=0, column=3, padx=5, pady=5)
         
         btn = ttk.Button(form, text="Add/Update Stock", command=self.add_update_inventory)
-        # --- !! ADJUSTED GRID !! ---
-        btn.grid(row=1, column=0, columnspan=4, pady=10)
+        btn.grid(row=2, column=0, columnspan=2, pady=10)
+        ttk.Button(form, text="Import CSV...", command=lambda: self.import_csv('inventory')).grid(row=2, column=2, columnspan=2, pady=10)
+        self.import_status_labels['inventory'] = ttk.Label(form, text="", font=("Arial", 9, "italic"))
+        self.import_status_labels['inventory'].grid(row=3, column=0, columnspan=4, sticky="w")
 
         # Treeview
         cols = ("Inventory_ID", "Product", "Warehouse", "Quantity")
@@ -443,68 +748,83 @@ class QuickCommerceApp(tk.Tk):
         for col in cols:
             self.inventory_tree.heading(col, text=col)
         self.inventory_tree.pack(fill="both", expand=True, pady=10)
+        self.inventory_sync = TreeSync(self.inventory_tree)
         
         # Data loaded by refresh_warehouse_tab_data()
         # self.refresh_inventory_tree()
 
     def add_update_inventory(self):
         product_text = self.inv_product_combo.get()
-        # --- !! REMOVED WAREHOUSE TEXT !! ---
-        # warehouse_text = self.inv_warehouse_combo.get()
+        warehouse_text = self.inv_warehouse_combo.get()
         qty = self.inv_qty_entry.get()
 
-        # --- !! UPDATED VALIDATION !! ---
-        if not product_text or not qty:
-            show_error("Input Error", "Product and Quantity are required.")
+        if not product_text or not warehouse_text or not qty:
+            show_error("Input Error", "Product, Warehouse and Quantity are required.")
             return
 
-        product_id = self.inv_product_data[product_text]
-        # --- !! HARDCODED WAREHOUSE ID = 1 !! ---
-        warehouse_id = 1 
-        
-        conn = get_db_connection()
-        if not conn: return
         try:
-            cursor = conn.cursor()
-            # UPSERT logic: Insert new, or update quantity if it exists
-            query = """
-                INSERT INTO Inventory (Product_ID, Warehouse_ID, Quantity)
-                VALUES (%s, %s, %s)
-                ON DUPLICATE KEY UPDATE Quantity = Quantity + VALUES(Quantity)
-            """
-            cursor.execute(query, (product_id, warehouse_id, int(qty)))
-            conn.commit()
-            show_info("Success", f"Stock updated for {product_text}.")
+            qty = int(qty)
+        except ValueError:
+            show_error("Input Error", "Quantity must be a whole number.")
+            return
+
+        product_id = self.inv_product_data.get(product_text)
+        if product_id is None:
+            show_error("Input Error", "Please pick a product from the list.")
+            return
+        warehouse_id = self.inv_warehouse_data[warehouse_text]
+        
+        def on_updated(_):
+            show_info("Success", f"Stock updated for {product_text} at {warehouse_text}.")
             self.inv_qty_entry.delete(0, tk.END)
-            
-            # --- !! AUTO-REFRESH OTHER TABS !! ---
-            self.refresh_warehouse_tab_data() # Refresh this tab
-            self.refresh_customer_tab_data() # Refresh customer shop stock
-        except mysql.connector.Error as err:
-            conn.rollback()
-            show_error("Database Error", f"Failed to update stock: {err}")
-        finally:
-            conn.close()
+            self.bus.publish("Inventory")
+
+        self.run_db(None, services.upsert_inventory, product_id, qty, warehouse_id,
+                    on_success=on_updated, error_prefix="Failed to update stock")
+
+    def import_csv(self, kind):
+        """Bulk-imports products or stock from a CSV file, then refreshes the views once."""
+        if self.import_in_flight:
+            show_error("Import Error", "An import is already running.")
+            return
+        path = filedialog.askopenfilename(title="Import Products" if kind == 'products' else "Import Stock",
+                                          filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+
+        label = self.import_status_labels[kind]
+        rejects_path = path + ".rejects.csv"
+        if kind == 'products':
+            work, args, table = catalog_import.import_products, (path,), "PRODUCT"
+        else:
+            # Rows without a Warehouse_ID go to the selected warehouse
+            warehouse_id = self.inv_warehouse_data.get(self.inv_warehouse_combo.get(), services.DEFAULT_WAREHOUSE_ID)
+            work, args, table = catalog_import.import_inventory, (path, warehouse_id), "Inventory"
+        args += (catalog_import.DEFAULT_CHUNK_SIZE, None, rejects_path)
+
+        def on_done(result):
+            self.import_in_flight = False
+            text = f"Imported {result.imported:,} of {result.read:,} rows."
+            if result.rejected:
+                text += f" {len(result.rejected):,} rejected (see {rejects_path})."
+            label.config(text=text)
+            self.bus.publish(table) # One refresh for the whole file
+
+        def on_failed(err):
+            self.import_in_flight = False
+            label.config(text="Import failed.")
+            show_error("Import Failed", f"{err}")
+
+        self.import_in_flight = True
+        label.config(text=f"Importing {path}...")
+        self.db.submit(None, run_with_connection, work, *args,
+                       on_success=on_done, on_error=on_failed)
 
     def refresh_inventory_tree(self):
-        clear_treeview(self.inventory_tree)
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor(dictionary=True)
-            query = """
-                SELECT i.Inventory_ID, p.P_Name, w.Location, i.Quantity 
-                FROM Inventory i
-                JOIN PRODUCT p ON i.Product_ID = p.Product_ID
-                JOIN WAREHOUSE w ON i.Warehouse_ID = w.Warehouse_ID
-            """
-            cursor.execute(query)
-            for row in cursor.fetchall():
-                self.inventory_tree.insert("", tk.END, values=(row['Inventory_ID'], row['P_Name'], row['Location'], row['Quantity']))
-        except mysql.connector.Error as err:
-            show_error("Database Error", f"Failed to fetch inventory: {err}")
-        finally:
-            conn.close()
+        def render(rows):
+            self.inventory_sync.apply([inventory_row(row) for row in rows])
+        self.run_db('inventory_tree', fetch_inventory,
+                    on_success=render, error_prefix="Failed to fetch inventory")
 
     # --- TAB 3: FLEET MANAGER ---
     def create_fleet_tab(self):
@@ -528,17 +848,19 @@ class QuickCommerceApp(tk.Tk):
         self.create_fleet_crud_ui(vehicle_tab)
         self.create_assignment_ui(assign_tab)
 
+        self.register_view('drivers', driver_tab, self.refresh_driver_tree, fleet_notebook)
+        self.register_view('fleet', vehicle_tab, self.refresh_fleet_tree, fleet_notebook)
+        self.register_view('assign', assign_tab, self.load_assign_view, fleet_notebook)
+
     def refresh_fleet_tab_data(self):
-        """Refreshes all dynamic data on the Fleet tab."""
-        self.refresh_driver_tree()
-        self.refresh_fleet_tree()
-        # Refresh comboboxes in the "Assign" sub-tab
-        self.assign_driver_data = populate_combobox(self.assign_driver_combo, "SELECT Driver_ID, D_Name FROM DRIVER WHERE Availability = 'Available'", "D_Name", "Driver_ID")
-        self.assign_vehicle_data = populate_combobox(self.assign_vehicle_combo, "SELECT Vehicle_no FROM FLEET WHERE Availability = 'Available'", "Vehicle_no")
-        self.assign_driver_combo.set('')
-        self.assign_vehicle_combo.set('')
-        
-        # Reset selections
+        """Refreshes the Fleet sub-tabs that have been opened."""
+        self.ref_cache.invalidate_table("DRIVER")
+        self.ref_cache.invalidate_table("FLEET")
+        self.refresh_views('drivers', 'fleet', 'assign')
+        self.reset_fleet_selection()
+        print("Fleet Tab Refreshed") # For debugging
+
+    def reset_fleet_selection(self):
         self.selected_driver_id = None
         self.selected_vehicle_id = None
         if hasattr(self, 'selected_driver_label'):
@@ -546,7 +868,12 @@ class QuickCommerceApp(tk.Tk):
         if hasattr(self, 'selected_vehicle_label'):
              self.selected_vehicle_label.config(text="-- Select a vehicle from the list --")
 
-        print("Fleet Tab Refreshed") # For debugging
+    def load_assign_view(self):
+        # Refresh comboboxes in the "Assign" sub-tab
+        self.load_assign_driver_combo()
+        self.load_assign_vehicle_combo()
+        self.assign_driver_combo.set('')
+        self.assign_vehicle_combo.set('')
 
     def create_driver_crud_ui(self, parent_frame):
         # Form
@@ -561,15 +888,18 @@ class QuickCommerceApp(tk.Tk):
         self.d_avail_combo = ttk.Combobox(form, state="readonly", values=['Available', 'On-Trip', 'Unavailable'])
         self.d_avail_combo.grid(row=0, column=3, padx=5, pady=5)
 
+        ttk.Label(form, text="Start Location:").grid(row=1, column=0, sticky="w")
+        self.d_location_entry = ttk.Entry(form, width=30)
+        self.d_location_entry.grid(row=1, column=1, padx=5, pady=5)
+
         btn = ttk.Button(form, text="Add New Driver", command=self.add_driver)
-        btn.grid(row=1, column=0, columnspan=4, pady=10)
+        btn.grid(row=2, column=0, columnspan=4, pady=10)
 
         # Treeview
-        cols = ("Driver_ID", "D_Name", "Availability", "Vehicle_no")
-        self.driver_tree = ttk.Treeview(parent_frame, columns=cols, show="headings")
-        for col in cols:
-            self.driver_tree.heading(col, text=col)
-        self.driver_tree.pack(fill="both", expand=True, pady=10)
+        cols = ("Driver_ID", "D_Name", "Availability", "Vehicle_no", "Location")
+        self.driver_list = PagedTreeview(parent_frame, self.run_db, "DRIVER", cols)
+        self.driver_list.pack(fill="both", expand=True, pady=10)
+        self.driver_tree = self.driver_list.tree
         
         # --- !! BIND CLICK EVENT !! ---
         self.driver_tree.bind('<<TreeviewSelect>>', self.on_driver_select)
@@ -593,42 +923,23 @@ class QuickCommerceApp(tk.Tk):
     def add_driver(self):
         name = self.d_name_entry.get()
         avail = self.d_avail_combo.get()
+        location = self.d_location_entry.get() # Optional
         if not name or not avail:
             show_error("Input Error", "Name and Availability are required.")
             return
 
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            query = "INSERT INTO DRIVER (D_Name, Availability) VALUES (%s, %s)"
-            cursor.execute(query, (name, avail))
-            conn.commit()
+        def on_added(_):
             show_info("Success", "Driver added.")
             self.d_name_entry.delete(0, tk.END)
             self.d_avail_combo.set('')
-            
-            # --- !! AUTO-REFRESH !! ---
-            self.refresh_fleet_tab_data() # Refresh this tab's trees and dropdowns
-        except mysql.connector.Error as err:
-            conn.rollback()
-            show_error("Database Error", f"Failed to add driver: {err}")
-        finally:
-            conn.close()
+            self.d_location_entry.delete(0, tk.END)
+            self.bus.publish("DRIVER")
+
+        self.run_db(None, services.add_driver, name, avail, location,
+                    on_success=on_added, error_prefix="Failed to add driver")
 
     def refresh_driver_tree(self):
-        clear_treeview(self.driver_tree)
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM DRIVER")
-            for row in cursor.fetchall():
-                self.driver_tree.insert("", tk.END, values=row)
-        except mysql.connector.Error as err:
-            show_error("Database Error", f"Failed to fetch drivers: {err}")
-        finally:
-            conn.close()
+        self.driver_list.refresh()
             
     def create_fleet_crud_ui(self, parent_frame):
         # Form
@@ -652,10 +963,9 @@ class QuickCommerceApp(tk.Tk):
 
         # Treeview
         cols = ("Vehicle_no", "Availability", "Location", "Driver_ID")
-        self.fleet_tree = ttk.Treeview(parent_frame, columns=cols, show="headings")
-        for col in cols:
-            self.fleet_tree.heading(col, text=col)
-        self.fleet_tree.pack(fill="both", expand=True, pady=10)
+        self.fleet_list = PagedTreeview(parent_frame, self.run_db, "FLEET", cols)
+        self.fleet_list.pack(fill="both", expand=True, pady=10)
+        self.fleet_tree = self.fleet_list.tree
         
         # --- !! BIND CLICK EVENT !! ---
         self.fleet_tree.bind('<<TreeviewSelect>>', self.on_fleet_select)
@@ -685,39 +995,18 @@ class QuickCommerceApp(tk.Tk):
             show_error("Input Error", "All fields are required.")
             return
 
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            query = "INSERT INTO FLEET (Vehicle_no, Availability, Location) VALUES (%s, %s, %s)"
-            cursor.execute(query, (vehicle_no, avail, location))
-            conn.commit()
+        def on_added(_):
             show_info("Success", "Vehicle added.")
             self.f_vehicle_entry.delete(0, tk.END)
             self.f_avail_combo.set('')
             self.f_location_entry.delete(0, tk.END)
-            
-            # --- !! AUTO-REFRESH !! ---
-            self.refresh_fleet_tab_data() # Refresh this tab's trees and dropdowns
-        except mysql.connector.Error as err:
-            conn.rollback()
-            show_error("Database Error", f"Failed to add vehicle: {err}")
-        finally:
-            conn.close()
+            self.bus.publish("FLEET")
+
+        self.run_db(None, services.add_vehicle, vehicle_no, avail, location,
+                    on_success=on_added, error_prefix="Failed to add vehicle")
 
     def refresh_fleet_tree(self):
-        clear_treeview(self.fleet_tree)
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM FLEET")
-            for row in cursor.fetchall():
-                self.fleet_tree.insert("", tk.END, values=row)
-        except mysql.connector.Error as err:
-            show_error("Database Error", f"Failed to fetch fleet: {err}")
-        finally:
-            conn.close()
+        self.fleet_list.refresh()
             
     def create_assignment_ui(self, parent_frame):
         # Form
@@ -726,16 +1015,24 @@ class QuickCommerceApp(tk.Tk):
         
         ttk.Label(form, text="Select Driver:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
         self.assign_driver_combo = ttk.Combobox(form, state="readonly", width=30)
-        self.assign_driver_data = populate_combobox(self.assign_driver_combo, "SELECT Driver_ID, D_Name FROM DRIVER WHERE Availability = 'Available'", "D_Name", "Driver_ID")
+        self.assign_driver_data = {} # Loaded with the sub-tab
         self.assign_driver_combo.grid(row=0, column=1, padx=5, pady=5)
 
         ttk.Label(form, text="Select Vehicle:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
         self.assign_vehicle_combo = ttk.Combobox(form, state="readonly", width=30)
-        self.assign_vehicle_data = populate_combobox(self.assign_vehicle_combo, "SELECT Vehicle_no FROM FLEET WHERE Availability = 'Available'", "Vehicle_no")
+        self.assign_vehicle_data = {} # Loaded with the sub-tab
         self.assign_vehicle_combo.grid(row=1, column=1, padx=5, pady=5)
         
         btn = ttk.Button(form, text="Assign Driver to Vehicle", command=self.assign_driver_vehicle)
         btn.grid(row=2, column=0, columnspan=2, pady=10)
+
+        # Shift start: pair every available driver in one transaction
+        batch_form = ttk.Frame(parent_frame, padding=10, relief=tk.GROOVE)
+        batch_form.pack(fill="x")
+        self.assign_by_location = tk.BooleanVar(value=True)
+        ttk.Checkbutton(batch_form, text="Prefer vehicles at the driver's start location",
+                        variable=self.assign_by_location).grid(row=0, column=0, sticky="w", padx=5, pady=5)
+        ttk.Button(batch_form, text="Assign All Available Drivers", command=self.assign_all_drivers).grid(row=1, column=0, pady=10)
         
     def assign_driver_vehicle(self):
         driver_text = self.assign_driver_combo.get()
@@ -748,22 +1045,32 @@ class QuickCommerceApp(tk.Tk):
         driver_id = self.assign_driver_data[driver_text]
         vehicle_no = self.assign_vehicle_data[vehicle_text]
 
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            cursor.callproc('AssignDriverToVehicle', (driver_id, vehicle_no))
-            conn.commit()
+        def on_assigned(_):
             show_info("Success", f"Assigned {driver_text} to {vehicle_no}.")
-            
-            # --- !! AUTO-REFRESH !! ---
-            self.refresh_fleet_tab_data()
-
-        except mysql.connector.Error as err:
-            conn.rollback()
-            show_error("Database Error", f"Failed to assign driver: {err}")
-        finally:
-            conn.close()
+            self.reset_fleet_selection()
+            self.bus.publish("DRIVER", "FLEET")
+
+        self.run_db(None, services.assign_driver, driver_id, vehicle_no,
+                    on_success=on_assigned, error_prefix="Failed to assign driver")
+
+    def assign_all_drivers(self):
+        def on_assigned(result):
+            if not result.planned:
+                show_info("Nothing to Assign", "There are no available driver and vehicle pairs.")
+                return
+            text = (f"Assigned {result.drivers_updated} driver(s) to {result.vehicles_updated} vehicle(s); "
+                    f"{result.same_location} of {len(result.planned)} planned pair(s) share a location.")
+            conflicts = result.conflicts
+            if conflicts:
+                lines = "\n".join(f"Driver {d} / {v}: {status}" for d, v, status in conflicts[:10])
+                more = f"\n...and {len(conflicts) - 10} more" if len(conflicts) > 10 else ""
+                text += f"\n\nSkipped {len(conflicts)} pair(s) that changed meanwhile:\n{lines}{more}"
+            show_info("Shift Assignment", text)
+            self.reset_fleet_selection()
+            self.bus.publish("DRIVER", "FLEET")
+
+        self.run_db(None, services.assign_available_drivers, self.assign_by_location.get(),
+                    on_success=on_assigned, error_prefix="Failed to assign drivers")
             
     # --- !! NEW FUNCTIONS FOR UPDATING STATUS !! ---
     
@@ -805,23 +1112,13 @@ class QuickCommerceApp(tk.Tk):
             show_error("Update Error", "Please select a new status from the dropdown.")
             return
             
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            query = "UPDATE DRIVER SET Availability = %s WHERE Driver_ID = %s"
-            cursor.execute(query, (new_status, self.selected_driver_id))
-            conn.commit()
+        def on_updated(_):
             show_info("Success", "Driver status updated.")
-            
-            # Refresh all fleet data
-            self.refresh_fleet_tab_data()
-            
-        except mysql.connector.Error as err:
-            conn.rollback()
-            show_error("Database Error", f"Failed to update driver status: {err}")
-        finally:
-            conn.close()
+            self.reset_fleet_selection()
+            self.bus.publish("DRIVER")
+
+        self.run_db(None, services.set_driver_status, self.selected_driver_id, new_status,
+                    on_success=on_updated, error_prefix="Failed to update driver status")
 
     def update_vehicle_status(self):
         new_status = self.new_vehicle_status_combo.get()
@@ -834,23 +1131,13 @@ class QuickCommerceApp(tk.Tk):
             show_error("Update Error", "Please select a new status from the dropdown.")
             return
             
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            query = "UPDATE FLEET SET Availability = %s WHERE Vehicle_no = %s"
-            cursor.execute(query, (new_status, self.selected_vehicle_id))
-            conn.commit()
+        def on_updated(_):
             show_info("Success", "Vehicle status updated.")
-            
-            # Refresh all fleet data
-            self.refresh_fleet_tab_data()
+            self.reset_fleet_selection()
+            self.bus.publish("FLEET")
 
-        except mysql.connector.Error as err:
-            conn.rollback()
-            show_error("Database Error", f"Failed to update vehicle status: {err}")
-        finally:
-            conn.close()
+        self.run_db(None, services.set_vehicle_status, self.selected_vehicle_id, new_status,
+                    on_success=on_updated, error_prefix="Failed to update vehicle status")
 
     # --- TAB 4: SYSTEM ADMINISTRATOR ---
     def create_admin_tab(self):
@@ -864,17 +1151,23 @@ class QuickCommerceApp(tk.Tk):
 
         customer_tab = ttk.Frame(admin_notebook, padding=10)
         reports_tab = ttk.Frame(admin_notebook, padding=10)
+        query_stats_tab = ttk.Frame(admin_notebook, padding=10)
         
         admin_notebook.add(customer_tab, text="Manage Customers")
         admin_notebook.add(reports_tab, text="Sales Reports")
+        admin_notebook.add(query_stats_tab, text="Query Stats")
         
         self.create_customer_crud_ui(customer_tab)
         self.create_reports_ui(reports_tab)
+        self.create_query_stats_ui(query_stats_tab)
+
+        self.register_view('customers', customer_tab, self.refresh_customer_tree, admin_notebook)
+        self.register_view('reports', reports_tab, self.generate_report, admin_notebook) # Runs with the default dates
+        self.register_view('query_stats', query_stats_tab, self.refresh_query_stats, admin_notebook)
 
     def refresh_admin_tab_data(self):
-        """Refreshes all dynamic data on the Admin tab."""
-        self.refresh_customer_tree()
-        self.generate_report() # Re-run the report with current dates
+        """Refreshes the Admin sub-tabs that have been opened."""
+        self.refresh_views('customers', 'reports', 'query_stats') # Reports re-run with current dates
         print("Admin Tab Refreshed") # For debugging
 
     def create_customer_crud_ui(self, parent_frame):
@@ -895,10 +1188,9 @@ class QuickCommerceApp(tk.Tk):
 
         # Treeview
         cols = ("Customer_ID", "C_Name", "Email_ID", "Payment_ID", "Driver_ID")
-        self.customer_tree = ttk.Treeview(parent_frame, columns=cols, show="headings")
-        for col in cols:
-            self.customer_tree.heading(col, text=col)
-        self.customer_tree.pack(fill="both", expand=True, pady=10)
+        self.customer_list = PagedTreeview(parent_frame, self.run_db, "CUSTOMER", cols)
+        self.customer_list.pack(fill="both", expand=True, pady=10)
+        self.customer_tree = self.customer_list.tree
         
         # Data loaded by refresh_admin_tab_data()
         # self.refresh_customer_tree()
@@ -911,39 +1203,17 @@ class QuickCommerceApp(tk.Tk):
             show_error("Input Error", "Name and Email are required.")
             return
 
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            query = "INSERT INTO CUSTOMER (C_Name, Email_ID) VALUES (%s, %s)"
-            cursor.execute(query, (name, email))
-            conn.commit()
+        def on_added(_):
             show_info("Success", "Customer added.")
             self.c_name_entry.delete(0, tk.END)
             self.c_email_entry.delete(0, tk.END)
-            
-            # --- !! AUTO-REFRESH OTHER TABS !! ---
-            self.refresh_admin_tab_data() # Refresh this tab
-            self.refresh_customer_tab_data() # Refresh customer tab's dropdown
-        except mysql.connector.Error as err:
-            conn.rollback()
-            show_error("Database Error", f"Failed to add customer: {err}")
-        finally:
-            conn.close()
+            self.bus.publish("CUSTOMER")
+
+        self.run_db(None, services.add_customer, name, email,
+                    on_success=on_added, error_prefix="Failed to add customer")
 
     def refresh_customer_tree(self):
-        clear_treeview(self.customer_tree)
-        conn = get_db_connection()
-        if not conn: return
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM CUSTOMER")
-            for row in cursor.fetchall():
-                self.customer_tree.insert("", tk.END, values=row)
-        except mysql.connector.Error as err:
-            show_error("Database Error", f"Failed to fetch customers: {err}")
-        finally:
-            conn.close()
+        self.customer_list.refresh()
             
     def create_reports_ui(self, parent_frame):
         # Form
@@ -963,17 +1233,41 @@ class QuickCommerceApp(tk.Tk):
         self.r_end_date_entry.grid(row=0, column=3, padx=5, pady=5)
         
         btn = ttk.Button(form, text="Generate Sales Report", command=self.generate_report)
-        btn.grid(row=1, column=0, columnspan=4, pady=10)
+        btn.grid(row=1, column=0, columnspan=2, pady=10)
+
+        # Streaming export of every order in the range (CSV, or Parquet with pyarrow)
+        ttk.Button(form, text="Export Orders...", command=self.export_report).grid(row=1, column=2, pady=10)
+        self.export_cancel_btn = ttk.Button(form, text="Cancel Export", command=self.cancel_export, state=tk.DISABLED)
+        self.export_cancel_btn.grid(row=1, column=3, pady=10)
+        self.export_status_label = ttk.Label(form, text="", font=("Arial", 9, "italic"))
+        self.export_status_label.grid(row=2, column=0, columnspan=4, sticky="w")
+        self.export_cancel = None    # threading.Event while an export runs
+        self.export_progress = (0, 0)
+
+        # Daily totals come from the rollup; selecting a day loads its orders.
+        self.report_totals_label = ttk.Label(parent_frame, text="", font=("Arial", 10, "bold"))
+        self.report_totals_label.pack(anchor="w", pady=(10, 0))
+
+        summary_cols = ("Sale_Date", "Orders", "Units", "Revenue")
+        self.summary_tree = ttk.Treeview(parent_frame, columns=summary_cols, show="headings", height=8)
+        for col in summary_cols:
+            self.summary_tree.heading(col, text=col)
+        self.summary_tree.pack(fill="both", expand=True, pady=5)
+        self.summary_sync = TreeSync(self.summary_tree)
+        self.summary_tree.bind("<<TreeviewSelect>>", self.on_report_day_select)
+        self.report_day = None
+
+        ttk.Label(parent_frame, text="Orders on the selected day:").pack(anchor="w")
 
         # Treeview
         cols = ("Order_ID", "Customer_Name", "Order_Total", "Payment_Date", "Warehouse")
         self.report_tree = ttk.Treeview(parent_frame, columns=cols, show="headings")
         for col in cols:
             self.report_tree.heading(col, text=col)
-        self.report_tree.pack(fill="both", expand=True, pady=10)
+        self.report_tree.pack(fill="both", expand=True, pady=5)
+        self.report_sync = TreeSync(self.report_tree)
 
     def generate_report(self):
-        clear_treeview(self.report_tree)
         start_date = self.r_start_date_entry.get()
         end_date = self.r_end_date_entry.get()
         
@@ -981,24 +1275,181 @@ class QuickCommerceApp(tk.Tk):
             show_error("Input Error", "Start Date and End Date are required.")
             return
 
-        conn = get_db_connection()
-        if not conn: return
+        def render(rows):
+            self.summary_sync.apply([(str(day), orders, units, f"{revenue:.2f}") for day, orders, units, revenue in rows])
+            orders = sum(row[1] for row in rows)
+            revenue = sum(row[3] for row in rows)
+            self.report_totals_label.config(text=f"{orders:,} orders, {revenue:,.2f} revenue over {len(rows)} day(s)")
+            if self.report_day is not None and self.summary_tree.exists(self.report_day):
+                self.load_report_day(self.report_day) # Keep the drill-down current
+            else:
+                self.report_day = None
+                self.report_sync.clear()
+
+        self.run_db('sales_report', services.sales_summary, start_date, end_date,
+                    on_success=render, error_prefix="Failed to generate report")
+
+    def on_report_day_select(self, event=None):
+        selected = self.summary_tree.focus()
+        if selected:
+            self.load_report_day(selected)
+
+    def load_report_day(self, day):
+        """Drill-down: fetches the order rows for one day of the summary."""
+        self.report_day = day
+
+        def render(rows):
+            self.report_sync.apply(rows)
+        self.run_db('sales_report_day', services.sales_report, day, day,
+                    on_success=render, error_prefix="Failed to load orders")
+
+    def export_report(self):
+        if self.export_cancel is not None:
+            show_error("Export Error", "An export is already running.")
+            return
+        start_date = self.r_start_date_entry.get()
+        end_date = self.r_end_date_entry.get()
+        if not start_date or not end_date:
+            show_error("Input Error", "Start Date and End Date are required.")
+            return
+
+        filetypes = [("CSV files", "*.csv")]
+        if report_export.parquet_available():
+            filetypes.append(("Parquet files", "*.parquet"))
+        path = filedialog.asksaveasfilename(title="Export Orders", defaultextension=".csv", filetypes=filetypes,
+                                            initialfile=f"sales_{start_date}_{end_date}.csv")
+        if not path:
+            return
+
+        def progress(done, total):
+            self.export_progress = (done, total) # Worker thread: only store it, the Tk loop displays it
+
+        def finish(text):
+            self.export_cancel = None
+            self.export_cancel_btn.config(state=tk.DISABLED)
+            self.export_status_label.config(text=text)
+
+        def on_done(rows):
+            finish(f"Exported {rows:,} orders to {path}")
+
+        def on_failed(err):
+            if isinstance(err, report_export.ExportCancelled):
+                finish(str(err))
+            else:
+                finish("Export failed.")
+                show_error("Export Failed", f"{err}")
+
+        self.export_cancel = threading.Event()
+        self.export_progress = (0, 0)
+        self.export_cancel_btn.config(state=tk.NORMAL)
+        self.db.submit('sales_export', run_with_connection, report_export.export_sales, path, start_date, end_date,
+                       report_export.DEFAULT_CHUNK_SIZE, progress, self.export_cancel,
+                       on_success=on_done, on_error=on_failed, action="sales_export")
+        self.show_export_progress()
+
+    def show_export_progress(self):
+        if self.export_cancel is None:
+            return
+        done, total = self.export_progress
+        percent = f" ({done * 100 // total}%)" if total else ""
+        self.export_status_label.config(text=f"Exporting... {done:,} of ~{total:,} orders{percent}")
+        self.after(200, self.show_export_progress)
+
+    def cancel_export(self):
+        if self.export_cancel is not None:
+            self.export_cancel.set()
+            self.export_status_label.config(text="Cancelling export...")
+
+    def create_query_stats_ui(self, parent_frame):
+        # Controls
+        form = ttk.Frame(parent_frame, padding=10, relief=tk.GROOVE)
+        form.pack(fill="x")
+
+        ttk.Button(form, text="Refresh", command=self.refresh_query_stats).grid(row=0, column=0, padx=5, pady=5)
+        ttk.Button(form, text="Reset", command=self.reset_query_stats).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Button(form, text="Dump to JSON...", command=self.dump_query_stats).grid(row=0, column=2, padx=5, pady=5)
+        ttk.Label(form, text="Slow query threshold (ms):").grid(row=0, column=3, padx=5, sticky="w")
+        self.slow_query_entry = ttk.Entry(form, width=8)
+        self.slow_query_entry.insert(0, str(query_stats.recorder.slow_query_ms))
+        self.slow_query_entry.grid(row=0, column=4, padx=5)
+        ttk.Button(form, text="Set", command=self.set_slow_query_threshold).grid(row=0, column=5, padx=5)
+        self.query_stats_label = ttk.Label(form, text="", font=("Arial", 9, "italic"))
+        self.query_stats_label.grid(row=1, column=0, columnspan=6, sticky="w")
+
+        # Top statements by total time
+        cols = ("Statement", "Calls", "Total_ms", "Avg_ms", "p95_ms", "Max_ms", "Fetch_ms", "Rows", "Top_Action")
+        self.query_stats_tree = ttk.Treeview(parent_frame, columns=cols, show="headings", height=12)
+        for col in cols:
+            self.query_stats_tree.heading(col, text=col)
+            self.query_stats_tree.column(col, width=80, anchor="e")
+        self.query_stats_tree.column("Statement", width=420, anchor="w")
+        self.query_stats_tree.column("Top_Action", width=140, anchor="w")
+        self.query_stats_tree.pack(fill="both", expand=True, pady=5)
+        self.query_stats_sync = TreeSync(self.query_stats_tree)
+
+        ttk.Label(parent_frame, text="Slow queries (most recent first):").pack(anchor="w")
+
+        slow_cols = ("Time", "ms", "Phase", "Action", "Statement")
+        self.slow_query_tree = ttk.Treeview(parent_frame, columns=slow_cols, show="headings", height=8)
+        for col in slow_cols:
+            self.slow_query_tree.heading(col, text=col)
+            self.slow_query_tree.column(col, width=90)
+        self.slow_query_tree.column("Action", width=140)
+        self.slow_query_tree.column("Statement", width=520)
+        self.slow_query_tree.pack(fill="both", expand=True, pady=5)
+
+    def refresh_query_stats(self):
+        """Shows the in-memory statement stats (no database call)."""
+        rows = []
+        for stats in query_stats.recorder.top(QUERY_STATS_TOP_N):
+            execute = stats.execute
+            rows.append((stats.statement, stats.calls, f"{stats.total_ms:.1f}",
+                         f"{stats.total_ms / max(stats.calls, 1):.2f}", f"{execute.percentile(0.95):.0f}",
+                         f"{execute.max_ms:.1f}", f"{stats.fetch.total_ms:.1f}", stats.rows, stats.top_action()))
+        self.query_stats_sync.apply(rows)
+
+        self.slow_query_tree.delete(*self.slow_query_tree.get_children())
+        for at, ms, phase, action, statement in reversed(query_stats.recorder.slow_queries):
+            self.slow_query_tree.insert("", tk.END, values=(time.strftime("%H:%M:%S", time.localtime(at)),
+                                                            f"{ms:.0f}", phase, action, statement))
+
+        pool = db_pool.pool_stats()
+        since = time.strftime("%H:%M:%S", time.localtime(query_stats.recorder.started))
+        self.query_stats_label.config(text=f"Since {since}; pool: {pool.get('connects', 0)} connect(s), "
+                                           f"{pool.get('waits', 0)} wait(s), {pool.get('open', 0)} open")
+
+    def reset_query_stats(self):
+        query_stats.recorder.reset()
+        self.refresh_query_stats()
+
+    def set_slow_query_threshold(self):
         try:
-            cursor = conn.cursor()
-            # Call the stored procedure
-            cursor.callproc('GenerateSalesReport', (start_date, end_date))
-            
-            # Fetch results from the procedure
-            for result in cursor.stored_results():
-                for row in result.fetchall():
-                    self.report_tree.insert("", tk.END, values=row)
-            
-        except mysql.connector.Error as err:
-            show_error("Database Error", f"Failed to generate report: {err}")
-        finally:
-            conn.close()
+            threshold = float(self.slow_query_entry.get())
+        except ValueError:
+            show_error("Input Error", "The threshold must be a number of milliseconds.")
+            return
+        query_stats.recorder.slow_query_ms = threshold
+
+    def dump_query_stats(self):
+        path = filedialog.asksaveasfilename(title="Dump Query Stats", defaultextension=".json",
+                                            filetypes=[("JSON files", "*.json")], initialfile="query_stats.json")
+        if not path:
+            return
+        try:
+            query_stats.recorder.dump_json(path)
+        except OSError as e:
+            show_error("Dump Failed", f"{e}")
+            return
+        show_info("Success", f"Query stats written to {path}")
 
 # --- RUN THE APPLICATION ---
 if __name__ == "__main__":
     app = QuickCommerceApp()
     app.mainloop()
+    app.db.shutdown()
+    print(f"Connection pool stats: {db_pool.pool_stats()}") # For debugging
+    print(f"Reference cache stats: {app.ref_cache.stats()}") # For debugging
+    print(f"Search cache stats: {app.search_cache.stats()}") # For debugging
+    for stats in query_stats.recorder.top(10): # For debugging
+        print(f"{stats.total_ms:10.1f} ms {stats.calls:6} call(s)  {stats.statement[:100]}")
+    db_pool.get_pool(db_config).close_all()
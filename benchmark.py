@@ -0,0 +1,380 @@
+"""Load generator and latency benchmark for the order path.
+
+    python benchmark.py seed --products 1000000 --customers 100000
+    python benchmark.py run --clients 50 --duration 60 --mix order=70,restock=10,read=15,assign=5 --output run.json
+    python benchmark.py run --clients 100 --hot-products 5 --shards 1 --output single.json
+    python benchmark.py run --clients 100 --hot-products 5 --shards 16 --output sharded.json
+
+`seed` fills PRODUCT, Inventory, CUSTOMER, DRIVER and FLEET with synthetic rows
+at the requested scale. `run` drives the operations in services.py from a
+thread or process pool against the database and reports throughput,
+p50/p95/p99 latency per operation, deadlocks, lock wait timeouts and oversold
+stock rows as JSON, so runs can be diffed between releases. --shards puts
+the hot products into sharded-counter mode (or back into single-row mode
+with 1) before the run, to compare the two under the same load. The
+`checkout` operation shops like the GUI does: it holds every line with
+ReserveStock first and then places the order against its holds. The
+`search` operation runs the product and customer picker searches.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import mysql.connector
+
+import db_pool
+import search
+import services
+
+DEADLOCK = 1213
+LOCK_WAIT_TIMEOUT = 1205
+SEED_CHUNK = 5000             # Rows per multi-row INSERT while seeding
+DEFAULT_MIX = "order=70,restock=10,read=15,assign=5"
+
+
+def connection_config(args):
+    return {
+        'host': args.host,
+        'user': args.user,
+        'password': args.password,
+        'database': args.database,
+    }
+
+
+# --- SEEDING ---
+
+def insert_rows(conn, query, rows):
+    """Inserts an iterable of rows in SEED_CHUNK-sized multi-row statements, one commit per chunk."""
+    cursor = conn.cursor()
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, SEED_CHUNK))
+        if not chunk:
+            break
+        cursor.executemany(query, chunk)
+        conn.commit()
+
+def seed(args):
+    rng = random.Random(args.seed)
+    tag = args.tag or datetime.now().strftime("%Y%m%d%H%M%S")
+    conn = mysql.connector.connect(**connection_config(args))
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(Warehouse_ID), 0) FROM WAREHOUSE")
+        for warehouse_id in range(cursor.fetchone()[0] + 1, args.warehouses + 1):
+            cursor.execute("INSERT INTO WAREHOUSE (Warehouse_ID, Location, Capacity) VALUES (%s, %s, %s)",
+                           (warehouse_id, f"Bench Warehouse {warehouse_id}", 99999))
+        conn.commit()
+
+        started = time.perf_counter()
+        cursor.execute("SELECT COALESCE(MAX(Product_ID), 0) FROM PRODUCT")
+        first_product = cursor.fetchone()[0] + 1
+        insert_rows(conn, "INSERT INTO PRODUCT (Product_ID, P_Name, Description, Price, Expiry_Date) VALUES (%s, %s, %s, %s, %s)",
+                    ((first_product + n, f"Bench Product {tag}-{n}", "Synthetic benchmark product",
+                      round(rng.uniform(10, 500), 2), None) for n in range(args.products)))
+        print(f"Seeded {args.products:,} products") # Progress
+
+        for warehouse_id in range(1, args.warehouses + 1):
+            insert_rows(conn, "INSERT INTO Inventory (Product_ID, Warehouse_ID, Quantity) VALUES (%s, %s, %s)",
+                        ((first_product + n, warehouse_id, rng.randint(0, args.max_stock)) for n in range(args.products)))
+        print(f"Seeded inventory for {args.warehouses} warehouse(s)") # Progress
+
+        insert_rows(conn, "INSERT INTO CUSTOMER (C_Name, Email_ID) VALUES (%s, %s)",
+                    ((f"Bench Customer {n}", f"bench-{tag}-{n}@example.com") for n in range(args.customers)))
+        insert_rows(conn, "INSERT INTO DRIVER (D_Name, Availability) VALUES (%s, 'Available')",
+                    [(f"Bench Driver {tag}-{n}",) for n in range(args.drivers)])
+        insert_rows(conn, "INSERT INTO FLEET (Vehicle_no, Availability, Location) VALUES (%s, 'Available', %s)",
+                    [(f"B{tag[-6:]}-{n}", f"Zone {n % 20}") for n in range(args.drivers)])
+        print(f"Seeded {args.customers:,} customers and {args.drivers:,} drivers/vehicles "
+              f"in {time.perf_counter() - started:.1f}s") # Progress
+    finally:
+        conn.close()
+
+
+# --- WORKLOAD ---
+
+def parse_mix(text):
+    """'order=70,read=30' -> {'order': 70, 'read': 30}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}'. Choose from {', '.join(OPERATIONS)}.")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def load_keys(conn, warehouse_id):
+    """Ids the clients draw from, loaded once per run."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT Product_ID FROM Inventory WHERE Warehouse_ID = %s ORDER BY Product_ID", (warehouse_id,))
+    products = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT Customer_ID FROM CUSTOMER ORDER BY Customer_ID")
+    customers = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT Driver_ID FROM DRIVER WHERE Availability = 'Available' ORDER BY Driver_ID")
+    drivers = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT Vehicle_no FROM FLEET WHERE Availability = 'Available' ORDER BY Vehicle_no")
+    vehicles = [row[0] for row in cursor.fetchall()]
+    return {'products': products, 'customers': customers, 'drivers': drivers, 'vehicles': vehicles}
+
+def release_pair(conn, driver_id, vehicle_no):
+    """Undoes AssignDriverToVehicle so the pair can be assigned again."""
+    services.execute_write(conn, "UPDATE FLEET SET Availability = 'Available', Driver_ID = NULL WHERE Vehicle_no = %s",
+                           (vehicle_no,))
+    services.execute_write(conn, "UPDATE DRIVER SET Availability = 'Available', Vehicle_no = NULL WHERE Driver_ID = %s",
+                           (driver_id,))
+
+def op_order(client, conn):
+    products = client.hot_products
+    size = client.rng.randint(1, min(client.cart_size, len(products)))
+    cart = {pid: client.rng.randint(1, 3) for pid in client.rng.sample(products, size)}
+    services.place_order(conn, client.rng.choice(client.keys['customers']), cart, client.warehouse_id)
+
+def op_checkout(client, conn):
+    products = client.hot_products
+    size = client.rng.randint(1, min(client.cart_size, len(products)))
+    cart = {pid: client.rng.randint(1, 3) for pid in client.rng.sample(products, size)}
+    token = uuid.uuid4().hex
+    try:
+        for pid, qty in cart.items():
+            services.reserve_stock(conn, token, pid, qty)
+    except mysql.connector.Error:
+        services.release_stock(conn, token) # Abandoned cart
+        raise
+    services.place_order(conn, client.rng.choice(client.keys['customers']), cart, client.warehouse_id, token)
+
+def op_restock(client, conn):
+    product_id = client.rng.choice(client.hot_products)
+    quantity = client.rng.randint(1, 20)
+    services.upsert_inventory(conn, product_id, quantity, client.warehouse_id)
+    client.restocked[product_id] = client.restocked.get(product_id, 0) + quantity
+
+def op_read(client, conn):
+    keys = client.rng.sample(client.keys['products'], min(20, len(client.keys['products'])))
+    services.fetch_available_products(conn, client.warehouse_id, "p.Product_ID", keys)
+
+def op_assign(client, conn):
+    if not client.drivers or not client.vehicles:
+        return
+    driver_id = client.rng.choice(client.drivers)
+    vehicle_no = client.rng.choice(client.vehicles)
+    services.assign_driver(conn, driver_id, vehicle_no)
+    release_pair(conn, driver_id, vehicle_no)
+
+def op_search(client, conn):
+    # A picker keystroke: name prefix for customers, word prefixes for products
+    search.search(conn, search.CUSTOMERS, f"Bench Customer {client.rng.randint(1, 999)}")
+    search.search(conn, search.PRODUCTS, f"bench prod{client.rng.choice('uc')}")
+
+OPERATIONS = {'order': op_order, 'checkout': op_checkout, 'restock': op_restock, 'read': op_read, 'assign': op_assign,
+              'search': op_search}
+
+
+class Client:
+    """State for one simulated client; runs in a worker thread or process."""
+
+    def __init__(self, index, settings, keys):
+        self.index = index
+        self.rng = random.Random(settings['seed'] + index)
+        self.warehouse_id = settings['warehouse_id']
+        self.cart_size = settings['cart_size']
+        self.keys = keys
+        self.hot_products = keys['products'][:settings['hot_products']] if settings['hot_products'] else keys['products']
+        # Drivers and vehicles are split between clients so assignments only contend on locks, not on rows.
+        self.drivers = keys['drivers'][index::settings['clients']]
+        self.vehicles = keys['vehicles'][index::settings['clients']]
+        self.restocked = {}
+
+def run_client(index, settings, keys):
+    """Runs one client until the deadline or its op budget; returns its raw measurements."""
+    client = Client(index, settings, keys)
+    names = list(settings['mix'])
+    weights = [settings['mix'][name] for name in names]
+    pool = db_pool.ConnectionPool(settings['config'], size=1)
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    counters = {'deadlocks': 0, 'lock_timeouts': 0, 'stock_rejections': 0}
+    deadline = time.monotonic() + settings['duration']
+    done = 0
+    try:
+        while time.monotonic() < deadline and (not settings['ops'] or done < settings['ops']):
+            name = client.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                with pool.connection() as conn:
+                    OPERATIONS[name](client, conn)
+            except mysql.connector.Error as err:
+                errors[name] += 1
+                if err.errno == DEADLOCK:
+                    counters['deadlocks'] += 1
+                elif err.errno == LOCK_WAIT_TIMEOUT:
+                    counters['lock_timeouts'] += 1
+                elif err.sqlstate == '45000':
+                    counters['stock_rejections'] += 1
+            else:
+                latencies[name].append((time.perf_counter() - started) * 1000)
+            done += 1
+    finally:
+        pool.close_all()
+    return {'latencies': latencies, 'errors': errors, 'counters': counters, 'restocked': client.restocked}
+
+
+# --- MEASUREMENT ---
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return round(sorted_values[index], 3)
+
+def stock_snapshot(conn, warehouse_id, product_ids):
+    """Stock per product (shards summed) in one warehouse."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT Product_ID, Quantity FROM Inventory_Available WHERE Warehouse_ID = %s", (warehouse_id,))
+    wanted = set(product_ids)
+    return {pid: qty for pid, qty in cursor.fetchall() if pid in wanted}
+
+def negative_shards(conn, warehouse_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Inventory_Shard WHERE Warehouse_ID = %s AND Quantity < 0", (warehouse_id,))
+    return cursor.fetchone()[0]
+
+def oversell_check(conn, warehouse_id, before, restocked, first_order_id):
+    """Stock must equal before + restocked - sold for every product; none may go negative."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT oi.Product_ID, SUM(oi.Quantity)
+        FROM ORDER_ITEMS oi
+        JOIN `ORDER` o ON o.Order_ID = oi.Order_ID
+        WHERE o.Order_ID > %s AND o.Warehouse_ID = %s
+        GROUP BY oi.Product_ID
+    """, (first_order_id, warehouse_id))
+    sold = dict(cursor.fetchall())
+    after = stock_snapshot(conn, warehouse_id, before)
+    negative = sum(1 for qty in after.values() if qty < 0) + negative_shards(conn, warehouse_id)
+    mismatched = sum(1 for pid, qty in before.items()
+                     if after.get(pid, 0) != qty + restocked.get(pid, 0) - sold.get(pid, 0))
+    return {'negative_rows': negative, 'mismatched_rows': mismatched, 'units_sold': int(sum(sold.values()))}
+
+def run(args):
+    config = connection_config(args)
+    conn = mysql.connector.connect(**config)
+    try:
+        keys = load_keys(conn, args.warehouse)
+        if not keys['products'] or not keys['customers']:
+            raise SystemExit("No products or customers found; run `benchmark.py seed` first.")
+        settings = {
+            'config': config, 'clients': args.clients, 'duration': args.duration, 'ops': args.ops,
+            'mix': args.mix, 'warehouse_id': args.warehouse, 'cart_size': args.cart_size,
+            'hot_products': args.hot_products, 'seed': args.seed,
+        }
+        tracked = keys['products'][:args.hot_products] if args.hot_products else keys['products']
+        if args.shards:
+            for product_id in tracked:
+                services.shard_inventory(conn, product_id, args.shards)
+            print(f"Set {len(tracked):,} hot product(s) to {args.shards} shard(s)") # Progress
+        settings['shards'] = args.shards
+        before = stock_snapshot(conn, args.warehouse, tracked)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(Order_ID), 0) FROM `ORDER`")
+        first_order_id = cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+    executor_class = ProcessPoolExecutor if args.mode == "process" else ThreadPoolExecutor
+    started = time.perf_counter()
+    with executor_class(max_workers=args.clients) as executor:
+        futures = [executor.submit(run_client, index, settings, keys) for index in range(args.clients)]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    report = {
+        'started_at': datetime.now().isoformat(timespec="seconds"),
+        'settings': {key: value for key, value in settings.items() if key != 'config'},
+        'mode': args.mode,
+        'elapsed_s': round(elapsed, 3),
+        'operations': {},
+    }
+    total_ok = 0
+    restocked = {}
+    for name in args.mix:
+        values = sorted(v for result in results for v in result['latencies'][name])
+        failed = sum(result['errors'][name] for result in results)
+        total_ok += len(values)
+        report['operations'][name] = {
+            'ok': len(values),
+            'errors': failed,
+            'ops_per_s': round(len(values) / elapsed, 2),
+            'mean_ms': round(sum(values) / len(values), 3) if values else None,
+            'p50_ms': percentile(values, 0.50),
+            'p95_ms': percentile(values, 0.95),
+            'p99_ms': percentile(values, 0.99),
+            'max_ms': round(values[-1], 3) if values else None,
+        }
+    for result in results:
+        for pid, qty in result['restocked'].items():
+            restocked[pid] = restocked.get(pid, 0) + qty
+    report['throughput_ops_s'] = round(total_ok / elapsed, 2)
+    for counter in ('deadlocks', 'lock_timeouts', 'stock_rejections'):
+        report[counter] = sum(result['counters'][counter] for result in results)
+
+    conn = mysql.connector.connect(**config)
+    try:
+        report['oversell'] = oversell_check(conn, args.warehouse, before, restocked, first_order_id)
+    finally:
+        conn.close()
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed synthetic data and benchmark the QuickCommerce order path.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("QC_DB_PASSWORD", ""),
+                        help="Defaults to $QC_DB_PASSWORD")
+    parser.add_argument("--database", default="QuickCommerceDB")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_cmd = commands.add_parser("seed", help="Insert synthetic reference data")
+    seed_cmd.add_argument("--products", type=int, default=10000)
+    seed_cmd.add_argument("--customers", type=int, default=1000)
+    seed_cmd.add_argument("--drivers", type=int, default=200, help="Drivers (and as many vehicles)")
+    seed_cmd.add_argument("--warehouses", type=int, default=1)
+    seed_cmd.add_argument("--max-stock", type=int, default=500)
+    seed_cmd.add_argument("--tag", help="Suffix that keeps names and emails unique between seeds")
+    seed_cmd.set_defaults(func=seed)
+
+    run_cmd = commands.add_parser("run", help="Run a workload and report latencies")
+    run_cmd.add_argument("--clients", type=int, default=50)
+    run_cmd.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    run_cmd.add_argument("--ops", type=int, default=0, help="Max operations per client (0 = no limit)")
+    run_cmd.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    run_cmd.add_argument("--mode", choices=("thread", "process"), default="thread")
+    run_cmd.add_argument("--warehouse", type=int, default=services.DEFAULT_WAREHOUSE_ID)
+    run_cmd.add_argument("--cart-size", type=int, default=5, help="Max distinct products per order")
+    run_cmd.add_argument("--hot-products", type=int, default=1000,
+                         help="Orders and restocks use only the first N products (0 = all) to create contention")
+    run_cmd.add_argument("--shards", type=int, default=0,
+                         help="Put the hot products in N-shard mode before the run (1 = single-row, 0 = leave as is)")
+    run_cmd.add_argument("--output", help="Also write the JSON report to this file")
+    run_cmd.set_defaults(func=run)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Bulk order ingestion.
+
+place_orders() takes many carts for many customers (flash sales, marketplace
+feeds) and places them through the PlaceOrderBatch procedure: one round trip
+and one commit per group instead of one per order. Every order gets its own
+accept/reject result, so a single out-of-stock cart does not sink the batch.
+"""
+import json
+
+import mysql.connector
+
+DEFAULT_GROUP_SIZE = 200  # Orders per PlaceOrderBatch call (and per commit)
+
+
+def order_payload(customer_id, items, warehouse_id=None):
+    """Builds one order for place_orders(). items is [(product_id, quantity), ...] or a {product_id: quantity} dict."""
+    if isinstance(items, dict):
+        items = items.items()
+    order = {"customer_id": customer_id,
+             "items": [{"product_id": pid, "quantity": qty} for pid, qty in items]}
+    if warehouse_id is not None:
+        order["warehouse_id"] = warehouse_id
+    return order
+
+
+def place_order_group(conn, orders):
+    """Places up to one group of orders in a single PlaceOrderBatch call; returns its result rows."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.callproc('PlaceOrderBatch', (json.dumps(orders),))
+        rows = []
+        for result in cursor.stored_results():
+            rows.extend(result.fetchall())
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    return rows
+
+
+def place_orders(conn, orders, group_size=DEFAULT_GROUP_SIZE):
+    """Places `orders` (see order_payload) in groups and returns one result per order, in input order.
+
+    Each result is a dict with index, customer_id, status ('Accepted' or
+    'Rejected'), order_id, order_total and message. If a whole group fails
+    (e.g. a deadlock), its orders are reported as rejected with the error and
+    the remaining groups still run.
+    """
+    orders = list(orders)
+    results = []
+    for start in range(0, len(orders), group_size):
+        group = orders[start:start + group_size]
+        try:
+            rows = place_order_group(conn, group)
+        except mysql.connector.Error as err:
+            print(f"Order group starting at {start} failed: {err}") # Log error
+            rows = [{'Order_No': n, 'Customer_ID': order.get("customer_id"), 'Status': 'Rejected',
+                     'Order_ID': None, 'Order_Total': None, 'Message': str(err)}
+                    for n, order in enumerate(group, 1)]
+        for row in rows:
+            results.append({
+                'index': start + row['Order_No'] - 1,
+                'customer_id': row['Customer_ID'],
+                'status': row['Status'],
+                'order_id': row['Order_ID'],
+                'order_total': row['Order_Total'],
+                'message': row['Message'],
+            })
+    return results
+
+
+def summarize(results):
+    """Counts accepted and rejected orders in place_orders() results."""
+    accepted = sum(1 for result in results if result['status'] == 'Accepted')
+    return {'accepted': accepted, 'rejected': len(results) - accepted}
@@ -0,0 +1,180 @@
+"""Bulk CSV import for products and stock.
+
+The file is streamed with csv.DictReader and validated row by row. Valid rows
+are written to a session staging table in chunks with executemany (one
+multi-row INSERT per chunk), then a stored procedure merges the whole file
+into PRODUCT or Inventory in one transaction. Rows that fail validation, or
+that the merge rejects, are reported with their line numbers.
+
+Product files:   P_Name, Price [, Description, Expiry_Date, Product_ID]
+    A row with a Product_ID updates that product (an unknown one is rejected);
+    the others are added.
+Inventory files: Product_ID, Quantity [, Warehouse_ID]
+    The quantity is added to the stock, as "Add/Update Stock" does.
+"""
+import csv
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import mysql.connector
+
+from services import DEFAULT_WAREHOUSE_ID
+
+DEFAULT_CHUNK_SIZE = 5000  # Rows per staging INSERT
+
+
+class ImportResult:
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.rejected = []  # [(line_no, reason)]
+
+
+# --- ROW PARSING ---
+
+def _optional_int(row, column):
+    text = (row.get(column) or "").strip()
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"{column} must be a whole number")
+
+def parse_product(row):
+    """CSV row -> (Product_ID, P_Name, Description, Price, Expiry_Date); raises ValueError."""
+    name = (row.get("P_Name") or "").strip()
+    if not name:
+        raise ValueError("P_Name is required")
+    if len(name) > 255:
+        raise ValueError("P_Name is longer than 255 characters")
+    try:
+        price = Decimal((row.get("Price") or "").strip())
+    except InvalidOperation:
+        raise ValueError("Price must be a number")
+    if not price.is_finite() or price < 0:
+        raise ValueError("Price cannot be negative")
+    if price >= Decimal("100000000"):
+        raise ValueError("Price is too large")
+    expiry = (row.get("Expiry_Date") or "").strip()
+    try:
+        expiry = date.fromisoformat(expiry) if expiry else None
+    except ValueError:
+        raise ValueError("Expiry_Date must be YYYY-MM-DD")
+    description = (row.get("Description") or "").strip() or None
+    return (_optional_int(row, "Product_ID"), name, description, price, expiry)
+
+def parse_inventory(row, default_warehouse_id=DEFAULT_WAREHOUSE_ID):
+    """CSV row -> (Product_ID, Warehouse_ID, Quantity); raises ValueError."""
+    product_id = _optional_int(row, "Product_ID")
+    if product_id is None:
+        raise ValueError("Product_ID is required")
+    quantity = _optional_int(row, "Quantity")
+    if quantity is None:
+        raise ValueError("Quantity is required")
+    if quantity < 0:
+        raise ValueError("Quantity cannot be negative")
+    warehouse_id = _optional_int(row, "Warehouse_ID")
+    return (product_id, default_warehouse_id if warehouse_id is None else warehouse_id, quantity)
+
+
+# --- IMPORT ---
+
+class ImportKind:
+    def __init__(self, required, staging, create_sql, insert_sql, merge_proc):
+        self.required = required
+        self.staging = staging
+        self.create_sql = create_sql
+        self.insert_sql = insert_sql
+        self.merge_proc = merge_proc
+
+
+PRODUCTS = ImportKind(
+    ("P_Name", "Price"), "tmp_product_import",
+    """CREATE TEMPORARY TABLE tmp_product_import (
+           Line_No INT PRIMARY KEY,
+           Product_ID INT NULL,
+           P_Name VARCHAR(255) NOT NULL,
+           Description TEXT,
+           Price DECIMAL(10, 2) NOT NULL,
+           Expiry_Date DATE NULL,
+           Reason VARCHAR(255) NULL -- Set by MergeProductImport for rejected lines
+       )""",
+    "INSERT INTO tmp_product_import (Line_No, Product_ID, P_Name, Description, Price, Expiry_Date) "
+    "VALUES (%s, %s, %s, %s, %s, %s)",
+    "MergeProductImport")
+
+INVENTORY = ImportKind(
+    ("Product_ID", "Quantity"), "tmp_inventory_import",
+    """CREATE TEMPORARY TABLE tmp_inventory_import (
+           Line_No INT PRIMARY KEY,
+           Product_ID INT NOT NULL,
+           Warehouse_ID INT NOT NULL,
+           Quantity INT NOT NULL
+       )""",
+    "INSERT INTO tmp_inventory_import (Line_No, Product_ID, Warehouse_ID, Quantity) VALUES (%s, %s, %s, %s)",
+    "MergeInventoryImport")
+
+
+def run_import(conn, kind, path, parse, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, rejects_path=None):
+    """Stages every valid row of the CSV at `path`, merges them and returns an ImportResult.
+
+    progress(rows_read) is called after every chunk. With rejects_path, the
+    rejected lines (if any) are written there as CSV.
+    """
+    result = ImportResult()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {kind.staging}")
+        cursor.execute(kind.create_sql)
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            missing = [col for col in kind.required if col not in (reader.fieldnames or ())]
+            if missing:
+                raise ValueError(f"The file has no {', '.join(missing)} column(s).")
+            batch = []
+            for row in reader:
+                result.read += 1
+                try:
+                    batch.append((reader.line_num,) + parse(row))
+                except ValueError as err:
+                    result.rejected.append((reader.line_num, str(err)))
+                if len(batch) >= chunk_size:
+                    cursor.executemany(kind.insert_sql, batch)
+                    batch = []
+                    if progress is not None:
+                        progress(result.read)
+            if batch:
+                cursor.executemany(kind.insert_sql, batch)
+
+        cursor.callproc(kind.merge_proc)
+        for merge_result in cursor.stored_results():
+            result.rejected.extend((line_no, reason) for line_no, reason in merge_result.fetchall())
+        conn.commit()
+        # A failed import leaves the table to the next DROP ... IF EXISTS on this connection
+        cursor.execute(f"DROP TEMPORARY TABLE {kind.staging}")
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+
+    result.rejected.sort()
+    result.imported = result.read - len(result.rejected)
+    if rejects_path and result.rejected:
+        write_rejects(rejects_path, result.rejected)
+    return result
+
+def import_products(conn, path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, rejects_path=None):
+    """Adds or updates products from a CSV file; see the module docstring for the columns."""
+    return run_import(conn, PRODUCTS, path, parse_product, chunk_size, progress, rejects_path)
+
+def import_inventory(conn, path, warehouse_id=DEFAULT_WAREHOUSE_ID, chunk_size=DEFAULT_CHUNK_SIZE,
+                     progress=None, rejects_path=None):
+    """Adds stock from a CSV file; rows without a Warehouse_ID go to `warehouse_id`."""
+    return run_import(conn, INVENTORY, path, lambda row: parse_inventory(row, warehouse_id),
+                      chunk_size, progress, rejects_path)
+
+def write_rejects(path, rejected):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(("Line_No", "Reason"))
+        writer.writerows(rejected)
@@ -0,0 +1,265 @@
+"""Shared, size-bounded MySQL connection pool.
+
+Every database call in the application borrows a connection from here instead
+of opening a fresh one, so the TCP handshake and authentication are paid once
+per pooled connection rather than once per button click.
+"""
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import errors
+
+# --- DEFAULTS ---
+DEFAULT_POOL_SIZE = 5            # Max open connections (idle + borrowed)
+DEFAULT_MAX_IDLE = 300           # Seconds an idle connection may live before eviction
+DEFAULT_HEALTH_CHECK = 30        # Ping connections that sat idle longer than this
+DEFAULT_ACQUIRE_TIMEOUT = 10     # Seconds to wait for a free connection
+
+
+class PooledConnection:
+    """Thin proxy around a raw connection; close() hands it back to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise errors.OperationalError("Connection has already been returned to the pool.")
+        return getattr(raw, name)
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw)
+
+    def discard(self):
+        """Closes the underlying connection instead of returning it to the pool."""
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw, broken=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """A bounded pool with health checks, idle eviction and reconnect-on-failure."""
+
+    def __init__(self, config, size=DEFAULT_POOL_SIZE, max_idle=DEFAULT_MAX_IDLE,
+                 health_check_interval=DEFAULT_HEALTH_CHECK, acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.config = dict(config)
+        self.size = size
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._cond = threading.Condition()
+        self._idle = deque()     # (raw_connection, last_used) - most recently used on the right
+        self._open = 0           # Idle + borrowed connections
+        self._closed = False
+        self._stats = {
+            'acquires': 0,
+            'hits': 0,           # Served from an idle connection
+            'connects': 0,       # New physical connections opened
+            'connect_time': 0.0,
+            'waits': 0,          # Acquires that had to wait for a free slot
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'health_checks': 0,
+            'reconnects': 0,     # Dead connections replaced
+            'evictions': 0,      # Idle connections closed for age
+            'discards': 0,       # Broken connections dropped on release
+        }
+
+    # --- Borrow / Return ---
+
+    def acquire(self, timeout=None):
+        """Returns a PooledConnection, opening or waiting for one as needed."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        wait_start = None
+
+        while True:
+            raw = None
+            last_used = None
+            must_connect = False
+            with self._cond:
+                if self._closed:
+                    raise errors.PoolError("Connection pool is closed.")
+                self._evict_idle_locked()
+                if self._idle:
+                    raw, last_used = self._idle.pop()
+                elif self._open < self.size:
+                    self._open += 1
+                    must_connect = True
+                else:
+                    if not waited:
+                        waited = True
+                        wait_start = time.monotonic()
+                        self._stats['waits'] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        self._stats['wait_time'] += time.monotonic() - wait_start
+                        raise errors.PoolError(
+                            f"No free database connection after {timeout:.1f}s "
+                            f"(pool size {self.size}).")
+                    self._cond.wait(remaining)
+                    continue
+
+            # Network work happens outside the lock.
+            if must_connect:
+                raw = self._connect_slot()
+            elif not self._is_healthy(raw, last_used):
+                self._drop(raw, 'reconnects')
+                continue
+            else:
+                self._count('hits')
+
+            with self._cond:
+                self._stats['acquires'] += 1
+                if waited:
+                    self._stats['wait_time'] += time.monotonic() - wait_start
+            return PooledConnection(self, raw)
+
+    def release(self, raw, broken=False):
+        """Puts a connection back, ending any open transaction first."""
+        if not broken:
+            try:
+                # A long-lived connection must not keep an old read snapshot around.
+                if raw.in_transaction:
+                    raw.rollback()
+            except mysql.connector.Error:
+                broken = True
+        if broken:
+            self._drop(raw, 'discards')
+            return
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                self._close_quietly(raw)
+            else:
+                self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def connection(self, timeout=None):
+        """Context-manager form: `with pool.connection() as conn: ...`."""
+        return self.acquire(timeout)
+
+    # --- Maintenance ---
+
+    def stats(self):
+        """Returns a snapshot of the pool counters."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot['open'] = self._open
+            snapshot['idle'] = len(self._idle)
+            snapshot['size'] = self.size
+        return snapshot
+
+    def close_all(self):
+        """Closes idle connections and stops handing out new ones."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for raw, _ in idle:
+            self._close_quietly(raw)
+
+    # --- Internals ---
+
+    def _connect_slot(self):
+        """Opens a physical connection for a slot already reserved in _open."""
+        start = time.perf_counter()
+        try:
+            raw = mysql.connector.connect(**self.config)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['connects'] += 1
+            self._stats['connect_time'] += time.perf_counter() - start
+        return raw
+
+    def _is_healthy(self, raw, last_used):
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        self._count('health_checks')
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def _evict_idle_locked(self):
+        # Oldest connections sit on the left of the deque.
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            raw, _ = self._idle.popleft()
+            self._open -= 1
+            self._stats['evictions'] += 1
+            self._close_quietly(raw)
+
+    def _drop(self, raw, counter):
+        self._close_quietly(raw)
+        with self._cond:
+            self._open -= 1
+            self._stats[counter] += 1
+            self._cond.notify()
+
+    def _count(self, counter):
+        with self._cond:
+            self._stats[counter] += 1
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+# --- SHARED POOL ---
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(config, **options):
+    """Replaces the shared pool (e.g. with new credentials or a larger size)."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, ConnectionPool(config, **options)
+    if old is not None:
+        old.close_all()
+    return _pool
+
+
+def get_pool(config=None):
+    """Returns the shared pool, creating it from `config` on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if config is None:
+                raise errors.PoolError("Connection pool has not been configured.")
+            _pool = ConnectionPool(config)
+        return _pool
+
+
+def pool_stats():
+    """Counters for the shared pool, or an empty dict before first use."""
+    return _pool.stats() if _pool is not None else {}
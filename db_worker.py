@@ -0,0 +1,105 @@
+"""Background database executor for the Tkinter GUI.
+
+Queries run on a small thread pool so a slow statement or lock wait never
+freezes the window. Results are queued and picked up by a polling callback
+scheduled with Tk's after(), so widgets are only ever touched from the Tk
+thread.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 4
+POLL_INTERVAL_MS = 20
+
+
+class Ticket:
+    """Handle for one submitted job. A cancelled ticket never calls back."""
+
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()  # Only succeeds if the job has not started yet
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class DBWorker:
+    """Runs callables off the UI thread and delivers their results via after()."""
+
+    def __init__(self, root, max_workers=DEFAULT_WORKERS, poll_interval=POLL_INTERVAL_MS):
+        self._root = root
+        self._poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._results = queue.SimpleQueue()
+        self._latest = {}  # key -> most recent Ticket for that key
+        self._closed = False
+        self._root.after(self._poll_interval, self._drain)
+
+    def submit(self, key, fn, *args, on_success=None, on_error=None, **kwargs):
+        """Schedules fn(*args, **kwargs) on a worker thread.
+
+        Jobs sharing a non-None key supersede each other: submitting a new one
+        cancels the previous job (or drops its result if it is already running).
+        Callbacks run on the Tk thread.
+        """
+        if self._closed:
+            raise RuntimeError("DBWorker has been shut down.")
+        ticket = Ticket(key)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._latest[key] = ticket
+        ticket.future = self._executor.submit(self._run, ticket, fn, args, kwargs, on_success, on_error)
+        return ticket
+
+    def cancel(self, key):
+        """Cancels the pending job for key, if any."""
+        ticket = self._latest.pop(key, None)
+        if ticket is not None:
+            ticket.cancel()
+
+    def shutdown(self):
+        self._closed = True
+        for ticket in self._latest.values():
+            ticket.cancel()
+        self._latest.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Internals ---
+
+    def _run(self, ticket, fn, args, kwargs, on_success, on_error):
+        if ticket.cancelled:
+            return
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as err:
+            self._results.put((ticket, on_error, err))
+        else:
+            self._results.put((ticket, on_success, result))
+
+    def _drain(self):
+        """Runs on the Tk thread: hands finished results to their callbacks."""
+        while True:
+            try:
+                ticket, callback, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if ticket.key is not None and self._latest.get(ticket.key) is ticket:
+                del self._latest[ticket.key]
+            if ticket.cancelled or callback is None:
+                continue
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"Error in DB callback for {ticket.key}: {e}") # Log error
+        if not self._closed:
+            self._root.after(self._poll_interval, self._drain)
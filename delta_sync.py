@@ -0,0 +1,119 @@
+"""Change-tracking delta sync.
+
+Triggers in QuickCommerceDB_CompleteSetup.sql append one Change_Log row per
+insert, update or delete on the tracked tables. DeltaSync polls that log for
+"what changed since version N", re-reads only the changed rows and hands them
+to the views that subscribed to each table, so consoles stay current without
+re-reading whole tables.
+"""
+import threading
+
+# Tracked tables and the Python type of their primary key (Row_Key is stored as text).
+TRACKED_TABLES = {
+    'PRODUCT': int,
+    'Inventory': int,
+    'DRIVER': int,
+    'FLEET': str,
+    'CUSTOMER': int,
+    'Stock_Reservation': int,  # Keyed by Product_ID
+}
+
+DEFAULT_BATCH_LIMIT = 5000   # More pending changes than this triggers a full resync
+DEFAULT_OVERLAP = 200        # Re-read this many ids behind the version (late commits)
+
+
+class Subscriber:
+    def __init__(self, table, fetch_rows, apply, resync):
+        self.table = table
+        self.fetch_rows = fetch_rows
+        self.apply = apply
+        self.resync = resync
+
+
+class DeltaSync:
+    """Polls Change_Log and routes row-level deltas to subscribers.
+
+    poll() runs on a DB worker thread and returns a list of (callback, args)
+    pairs; deliver() runs them on the Tk thread. Only one poll may run at a
+    time, so callers should chain polls rather than overlap them.
+    """
+
+    def __init__(self, batch_limit=DEFAULT_BATCH_LIMIT, overlap=DEFAULT_OVERLAP):
+        self.batch_limit = batch_limit
+        self.overlap = overlap
+        self.version = None          # Highest Change_ID applied
+        self._seen = set()           # Change_IDs applied inside the overlap window
+        self._subscribers = {}       # table -> [Subscriber]
+        self._lock = threading.Lock()
+
+    def subscribe(self, table, fetch_rows, apply, resync):
+        """Registers a view for deltas on `table`.
+
+        fetch_rows(conn, keys) re-reads the changed rows (worker thread).
+        apply(rows, deleted_keys) patches the view (Tk thread).
+        resync() reloads the view from scratch when the log cannot be trusted.
+        """
+        if table not in TRACKED_TABLES:
+            raise ValueError(f"{table} is not change-tracked.")
+        with self._lock:
+            self._subscribers.setdefault(table, []).append(Subscriber(table, fetch_rows, apply, resync))
+
+    def poll(self, conn):
+        """Reads new Change_Log rows and fetches the changed rows for subscribers."""
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(Change_ID), MAX(Change_ID) FROM Change_Log")
+        low, high = cursor.fetchone()
+
+        if self.version is None:
+            # First poll just sets the baseline. The overlap window on the next
+            # poll replays recent changes that raced with the initial loads.
+            self.version = high or 0
+            return []
+        if high is None:
+            return []
+        if (low is not None and low > self.version + 1) or high - self.version > self.batch_limit:
+            # Log was pruned past us, or too far behind: cheaper to reload.
+            return self._resync_all(high)
+
+        low_water = max(self.version - self.overlap, 0)
+        cursor.execute(
+            "SELECT Change_ID, Table_Name, Row_Key, Operation FROM Change_Log "
+            "WHERE Change_ID > %s ORDER BY Change_ID",
+            (low_water,))
+
+        # Collapse to the last operation per row.
+        latest = {}
+        for change_id, table, row_key, operation in cursor.fetchall():
+            if change_id in self._seen or table not in TRACKED_TABLES:
+                continue
+            self._seen.add(change_id)
+            latest[(table, TRACKED_TABLES[table](row_key))] = operation
+            self.version = max(self.version, change_id)
+        self._seen = {cid for cid in self._seen if cid > self.version - self.overlap}
+
+        by_table = {}
+        for (table, key), operation in latest.items():
+            upserts, deletes = by_table.setdefault(table, (set(), set()))
+            (deletes if operation == 'D' else upserts).add(key)
+
+        results = []
+        with self._lock:
+            subscribers = {table: list(subs) for table, subs in self._subscribers.items()}
+        for table, (upserts, deletes) in by_table.items():
+            for sub in subscribers.get(table, []):
+                rows = sub.fetch_rows(conn, sorted(upserts)) if upserts else []
+                results.append((sub.apply, (rows, deletes)))
+        return results
+
+    @staticmethod
+    def deliver(results):
+        """Applies poll() results; call on the Tk thread."""
+        for callback, args in results:
+            callback(*args)
+
+    def _resync_all(self, high):
+        self.version = high
+        self._seen.clear()
+        with self._lock:
+            callbacks = {sub.resync for subs in self._subscribers.values() for sub in subs}
+        return [(callback, ()) for callback in callbacks]
@@ -0,0 +1,166 @@
+"""Pending-order dispatch scheduler.
+
+DispatchScheduler keeps the pending orders in a priority queue (oldest sale
+first) and, on every tick, pairs up to batch_size of them with the free
+driver/vehicle pairs planned by driver_matching, preferring a vehicle at the
+order's warehouse. The batch is applied by DispatchOrders in one
+transaction; an order whose pair was taken meanwhile goes back in the queue
+for the next tick.
+
+    scheduler = DispatchScheduler()
+    while True:
+        service.run(scheduler.tick)
+        print(scheduler.stats.summary())
+        time.sleep(DEFAULT_INTERVAL_S)
+
+`python manage.py dispatch` runs this loop.
+"""
+import heapq
+import json
+import time
+from collections import deque
+
+import mysql.connector
+
+import driver_matching
+
+DEFAULT_BATCH_SIZE = 100   # Orders per DispatchOrders call
+DEFAULT_INTERVAL_S = 2.0   # Pause between ticks
+RESCAN_TICKS = 30          # Full pending-order rescans catch orders set back to 'Pending'
+WAIT_SAMPLES = 10000       # Queue waits kept for the percentiles (most recent dispatches)
+
+# DispatchOrders statuses that will not change by retrying the same driver or vehicle
+DRIVER_REJECTS = ('Unknown driver', 'Driver is linked to another vehicle')
+VEHICLE_REJECTS = ('Unknown vehicle',)
+
+
+class DispatchStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.dispatched = 0
+        self.conflicts = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)  # Seconds from sale to dispatch
+
+    def rate(self):
+        """Dispatches per second since the scheduler started."""
+        return self.dispatched / max(time.monotonic() - self.started, 1e-9)
+
+    def wait_percentile(self, fraction):
+        if not self.waits:
+            return None
+        waits = sorted(self.waits)
+        return waits[min(int(round(fraction * (len(waits) - 1))), len(waits) - 1)]
+
+    def summary(self, queued=0):
+        waits = ", ".join(f"p{int(f * 100)} {self.wait_percentile(f)}s" for f in (0.5, 0.95, 0.99)) if self.waits else "n/a"
+        return (f"{self.dispatched:,} dispatched ({self.rate():.1f}/s), {queued:,} queued, "
+                f"{self.conflicts:,} conflict(s), queue wait {waits}")
+
+
+class DispatchScheduler:
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, by_location=True):
+        self.batch_size = batch_size
+        self.by_location = by_location
+        self.stats = DispatchStats()
+        self._queue = []        # Heap of (sale_time, order_id, warehouse place)
+        self._queued = set()    # Order_IDs in the heap
+        self._last_order_id = 0
+        self._ticks = 0
+        self._skip_drivers = set()   # Rejected for good; cleared on each full rescan
+        self._skip_vehicles = set()
+
+    @property
+    def queued(self):
+        return len(self._queued)
+
+    def load_orders(self, conn, rescan=False):
+        """Queues pending orders placed since the last load (or all of them on a rescan)."""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT o.Order_ID, COALESCE(p.Trans_date, NOW()), w.Location
+            FROM `ORDER` o
+            LEFT JOIN PAYMENT p ON p.Order_ID = o.Order_ID
+            LEFT JOIN WAREHOUSE w ON w.Warehouse_ID = o.Warehouse_ID
+            WHERE o.Status = 'Pending' AND o.Order_ID > %s AND o.Driver_ID IS NULL
+            ORDER BY o.Order_ID
+        """, (0 if rescan else self._last_order_id,))
+        for order_id, sale_time, location in cursor.fetchall():
+            self._last_order_id = max(self._last_order_id, order_id)
+            if order_id not in self._queued:
+                self._queued.add(order_id)
+                heapq.heappush(self._queue, (sale_time, order_id, driver_matching.place_key(location)))
+
+    def plan_batch(self, conn):
+        """Pops up to batch_size orders and gives each a free driver/vehicle pair.
+
+        Returns [(queue entry, driver_id, vehicle_no)]; orders left without a
+        pair stay queued.
+        """
+        drivers, vehicles = driver_matching.fetch_candidates(conn)
+        drivers = [d for d in drivers if d[0] not in self._skip_drivers]
+        vehicles = [v for v in vehicles if v[0] not in self._skip_vehicles]
+        pairs, _ = driver_matching.plan_assignments(drivers, vehicles, self.by_location)
+        parked_at = {vehicle_no: driver_matching.place_key(location) for vehicle_no, location in vehicles}
+        free = {}  # place -> [(driver_id, vehicle_no)]
+        for driver_id, vehicle_no in pairs:
+            free.setdefault(parked_at[vehicle_no], []).append((driver_id, vehicle_no))
+
+        batch = []
+        left = len(pairs)
+        while self._queue and left and len(batch) < self.batch_size:
+            entry = heapq.heappop(self._queue)
+            here = free.get(entry[2]) if self.by_location else None
+            if not here:
+                here = next(bucket for bucket in free.values() if bucket)
+            driver_id, vehicle_no = here.pop(0)
+            left -= 1
+            batch.append((entry, driver_id, vehicle_no))
+        return batch
+
+    def dispatch(self, conn, batch):
+        """Applies a planned batch through DispatchOrders; returns its result rows."""
+        payload = [{"order_id": entry[1], "driver_id": driver_id, "vehicle_no": vehicle_no}
+                   for entry, driver_id, vehicle_no in batch]
+        cursor = conn.cursor()
+        try:
+            cursor.callproc('DispatchOrders', (json.dumps(payload),))
+            rows = []
+            for result in cursor.stored_results():
+                rows.extend(result.fetchall())
+            conn.commit()
+        except mysql.connector.Error:
+            conn.rollback()
+            for entry, _, _ in batch:
+                heapq.heappush(self._queue, entry) # Retried on the next tick
+            raise
+
+        entries = {entry[1]: entry for entry, _, _ in batch}
+        for order_id, driver_id, vehicle_no, status, wait_s in rows:
+            if status == 'Dispatched':
+                self._queued.discard(order_id)
+                self.stats.dispatched += 1
+                if wait_s is not None:
+                    self.stats.waits.append(wait_s)
+            elif status.startswith('Order'):
+                self._queued.discard(order_id) # No longer pending: drop it
+            else:
+                self.stats.conflicts += 1
+                heapq.heappush(self._queue, entries[order_id])
+                if status in DRIVER_REJECTS:
+                    self._skip_drivers.add(driver_id) # Do not plan the same dead pair every tick
+                elif status in VEHICLE_REJECTS:
+                    self._skip_vehicles.add(vehicle_no)
+        return rows
+
+    def tick(self, conn):
+        """One scheduling round: load new orders, plan a batch and dispatch it."""
+        self._ticks += 1
+        rescan = self._ticks % RESCAN_TICKS == 1
+        if rescan:
+            self._skip_drivers.clear() # Links may have been fixed since
+            self._skip_vehicles.clear()
+        self.load_orders(conn, rescan=rescan)
+        if not self._queue:
+            return []
+        batch = self.plan_batch(conn)
+        return self.dispatch(conn, batch) if batch else []
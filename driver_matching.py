@@ -0,0 +1,104 @@
+"""Shift-start matching of available drivers to available vehicles.
+
+plan_assignments() pairs as many available drivers with available vehicles
+as possible, preferring a vehicle parked where the driver starts
+(DRIVER.Location against FLEET.Location, compared case-insensitively).
+Locations are place names, not coordinates, so a pair costs 0 (same place)
+or 1 (anywhere else); for such costs, pairing within each location first and
+then pairing whoever is left is already a minimum-cost maximum matching, so
+no solver is needed. assign_available() applies the plan through
+AssignDriversBatch: one call, one transaction.
+"""
+import json
+
+
+class MatchResult:
+    def __init__(self, planned, same_location):
+        self.planned = planned              # [(driver_id, vehicle_no)] sent to the database
+        self.same_location = same_location  # Planned pairs at the same location
+        self.statuses = []                  # [(driver_id, vehicle_no, status)] from AssignDriversBatch
+        self.drivers_updated = 0
+        self.vehicles_updated = 0
+
+    @property
+    def conflicts(self):
+        return [row for row in self.statuses if row[2] != 'Assigned']
+
+
+def place_key(location):
+    """Locations compare case- and whitespace-insensitively."""
+    return (location or "").strip().casefold()
+
+def plan_assignments(drivers, vehicles, by_location=True):
+    """Pairs drivers [(driver_id, location)] with vehicles [(vehicle_no, location)].
+
+    Returns ([(driver_id, vehicle_no)], same_location_count). Ties go to the
+    lowest Driver_ID and Vehicle_no, so the same input gives the same plan.
+    """
+    drivers = sorted(drivers)
+    free = sorted(vehicles)
+    pairs = {}
+    if by_location:
+        parked = {}
+        for vehicle_no, location in free:
+            if place_key(location):
+                parked.setdefault(place_key(location), []).append(vehicle_no)
+        for driver_id, location in drivers:
+            here = parked.get(place_key(location))
+            if here:
+                pairs[driver_id] = here.pop(0)
+    same_location = len(pairs)
+
+    taken = set(pairs.values())
+    rest = iter(vehicle_no for vehicle_no, _ in free if vehicle_no not in taken)
+    for driver_id, _ in drivers:
+        if driver_id not in pairs:
+            vehicle_no = next(rest, None)
+            if vehicle_no is None:
+                break
+            pairs[driver_id] = vehicle_no
+    return sorted(pairs.items()), same_location
+
+
+# --- DATABASE ---
+
+def fetch_candidates(conn):
+    """Available drivers and vehicles: ([(Driver_ID, Location)], [(Vehicle_no, Location)]).
+
+    A driver still linked to a FLEET row is left out: AssignDriversBatch and
+    DispatchOrders would reject them as linked to another vehicle.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT Driver_ID, Location FROM DRIVER
+        WHERE Availability = 'Available'
+          AND NOT EXISTS (SELECT 1 FROM FLEET f WHERE f.Driver_ID = DRIVER.Driver_ID)
+    """)
+    drivers = cursor.fetchall()
+    cursor.execute("SELECT Vehicle_no, Location FROM FLEET WHERE Availability = 'Available' AND Driver_ID IS NULL")
+    vehicles = cursor.fetchall()
+    return drivers, vehicles
+
+def apply_assignments(conn, pairs, result):
+    """Runs AssignDriversBatch for the pairs and fills in the result's statuses and row counts."""
+    import mysql.connector  # Here so plan_assignments() can be used without the connector
+    cursor = conn.cursor()
+    try:
+        cursor.callproc('AssignDriversBatch', (json.dumps([{"driver_id": d, "vehicle_no": v} for d, v in pairs]),))
+        results = [r.fetchall() for r in cursor.stored_results()]
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    result.statuses = results[0]
+    result.drivers_updated, result.vehicles_updated = results[1][0]
+    return result
+
+def assign_available(conn, by_location=True, dry_run=False):
+    """Pairs every available driver with an available vehicle in one transaction; returns a MatchResult."""
+    drivers, vehicles = fetch_candidates(conn)
+    pairs, same_location = plan_assignments(drivers, vehicles, by_location)
+    result = MatchResult(pairs, same_location)
+    if pairs and not dry_run:
+        apply_assignments(conn, pairs, result)
+    return result
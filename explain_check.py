@@ -0,0 +1,151 @@
+"""EXPLAIN regression check for the hot queries.
+
+    python explain_check.py --password ...
+
+Runs EXPLAIN on every query in HOT_QUERIES and exits with status 1 if any of
+them reads a table with a full scan (access type ALL) or a full index scan
+(index) that it is not allowed to. Run it against a seeded database
+(benchmark.py seed): on near-empty tables the optimizer may prefer a scan.
+"""
+import argparse
+import os
+import sys
+
+import mysql.connector
+
+SCAN_TYPES = ('ALL', 'index')
+
+
+class HotQuery:
+    def __init__(self, name, sql, params=(), may_scan=()):
+        self.name = name
+        self.sql = sql
+        self.params = params
+        self.may_scan = set(may_scan)  # Table aliases a scan is expected on (e.g. tiny lookup tables)
+
+
+HOT_QUERIES = [
+    # Body of GenerateSalesReport (a CALL cannot be EXPLAINed).
+    HotQuery("sales_report", """
+        SELECT p.Order_ID, c.C_Name AS Customer_Name, o.Order_Total, p.Trans_date AS Payment_Date, w.Location AS Warehouse
+        FROM PAYMENT p
+        JOIN `ORDER` o ON p.Order_ID = o.Order_ID
+        JOIN CUST_ORDER co ON o.Order_ID = co.Order_ID
+        JOIN CUSTOMER c ON co.Customer_ID = c.Customer_ID
+        JOIN WAREHOUSE w ON o.Warehouse_ID = w.Warehouse_ID
+        WHERE p.Trans_date >= %s AND p.Trans_date < %s + INTERVAL 1 DAY
+        ORDER BY p.Trans_date DESC
+    """, ('2024-01-01', '2024-01-31')),
+    HotQuery("sales_summary", """
+        SELECT s.Sale_Date, SUM(s.Orders), SUM(s.Units), SUM(s.Revenue)
+        FROM Daily_Sales_Summary s
+        WHERE s.Sale_Date BETWEEN %s AND %s
+        GROUP BY s.Sale_Date
+    """, ('2024-01-01', '2024-12-31')),
+    HotQuery("customer_orders", """
+        SELECT co.Order_ID FROM CUST_ORDER co WHERE co.Customer_ID = %s
+    """, (1,)),
+    HotQuery("shop_products", """
+        SELECT p.Product_ID, p.P_Name, p.Price,
+               GREATEST(a.Total_Quantity + IFNULL((SELECT SUM(s.Quantity) FROM Inventory_Shard s
+                                                   WHERE s.Product_ID = a.Product_ID), 0)
+                        - IFNULL((SELECT SUM(r.Quantity) FROM Stock_Reservation r
+                                  WHERE r.Product_ID = p.Product_ID AND r.Expires_At > NOW()), 0), 0) AS Quantity
+        FROM Product_Availability a
+        JOIN PRODUCT p ON p.Product_ID = a.Product_ID
+        WHERE a.Listed = 1
+        HAVING Quantity > 0
+        ORDER BY p.Product_ID
+    """),
+    HotQuery("shop_warehouse", """
+        SELECT p.Product_ID, p.P_Name, p.Price,
+               GREATEST(i.Quantity + IFNULL((SELECT SUM(s.Quantity) FROM Inventory_Shard s
+                                             WHERE s.Product_ID = i.Product_ID AND s.Warehouse_ID = i.Warehouse_ID), 0)
+                        - IFNULL((SELECT SUM(r.Quantity) FROM Stock_Reservation r
+                                  WHERE r.Product_ID = p.Product_ID AND r.Expires_At > NOW()), 0), 0) AS Quantity
+        FROM PRODUCT p
+        JOIN Inventory i ON p.Product_ID = i.Product_ID
+        WHERE i.Warehouse_ID = %s
+        HAVING Quantity > 0
+        ORDER BY p.Product_ID
+    """, (1,)),
+    HotQuery("product_page", """
+        SELECT Product_ID, P_Name, Description, Price, Expiry_Date FROM PRODUCT
+        WHERE Product_ID > %s ORDER BY Product_ID ASC LIMIT 100
+    """, (0,)),
+    HotQuery("customer_page", """
+        SELECT Customer_ID, C_Name, Email_ID, Payment_ID, Driver_ID FROM CUSTOMER
+        WHERE Customer_ID > %s ORDER BY Customer_ID ASC LIMIT 100
+    """, (0,)),
+    # search.py picker queries: prefix (B-tree range) and word-prefix (FULLTEXT)
+    HotQuery("product_search_prefix", """
+        SELECT Product_ID, P_Name, Description FROM PRODUCT WHERE P_Name LIKE %s ORDER BY P_Name LIMIT 20
+    """, ('mil%',)),
+    HotQuery("product_search_words", """
+        SELECT Product_ID, P_Name, Description FROM PRODUCT
+        WHERE MATCH(P_Name, Description) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY MATCH(P_Name, Description) AGAINST (%s IN BOOLEAN MODE) DESC LIMIT 20
+    """, ('+fresh* +mil*', '+fresh* +mil*')),
+    HotQuery("customer_search_prefix", """
+        SELECT Customer_ID, C_Name, Email_ID FROM CUSTOMER WHERE C_Name LIKE %s ORDER BY C_Name LIMIT 20
+    """, ('jo%',)),
+    HotQuery("customer_search_email", """
+        SELECT Customer_ID, C_Name, Email_ID FROM CUSTOMER WHERE Email_ID LIKE %s ORDER BY Email_ID LIMIT 20
+    """, ('jo%',)),
+    HotQuery("change_log_poll", """
+        SELECT Change_ID, Table_Name, Row_Key, Operation FROM Change_Log
+        WHERE Change_ID > %s ORDER BY Change_ID
+    """, (0,)),
+]
+
+
+def explain(conn, query):
+    """Returns the EXPLAIN rows of a query as dicts."""
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("EXPLAIN " + query.sql, query.params)
+    return cursor.fetchall()
+
+def find_scans(query, plan):
+    """Plan rows that scan a table the query is not allowed to scan."""
+    return [row for row in plan
+            if row['type'] in SCAN_TYPES and row['table'] not in query.may_scan]
+
+def check(conn, queries=HOT_QUERIES):
+    """EXPLAINs every query; returns {name: offending plan rows} for the ones that regressed."""
+    failures = {}
+    for query in queries:
+        plan = explain(conn, query)
+        scans = find_scans(query, plan)
+        status = "FULL SCAN" if scans else "ok"
+        print(f"{query.name:<18} {status}")
+        for row in plan:
+            print(f"    {row['table']:<12} type={row['type']:<8} key={row['key']} rows={row['rows']} {row['Extra'] or ''}")
+        if scans:
+            failures[query.name] = scans
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when a hot query's plan regresses to a full scan.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("QC_DB_PASSWORD", ""),
+                        help="Defaults to $QC_DB_PASSWORD")
+    parser.add_argument("--database", default="QuickCommerceDB")
+    parser.add_argument("--only", nargs="*", help="Names of the queries to check (default: all)")
+    args = parser.parse_args(argv)
+
+    queries = [query for query in HOT_QUERIES if not args.only or query.name in args.only]
+    conn = mysql.connector.connect(host=args.host, user=args.user, password=args.password, database=args.database)
+    try:
+        failures = check(conn, queries)
+    finally:
+        conn.close()
+    if failures:
+        print(f"{len(failures)} query plan(s) regressed: {', '.join(failures)}")
+        return 1
+    print("All query plans use indexes.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
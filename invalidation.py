@@ -0,0 +1,62 @@
+"""Cross-tab invalidation bus.
+
+Writes publish the tables they changed. Views subscribe to the tables they
+display and are marked dirty; dirty views are refreshed together on the next
+flush, so however many writes or tables touch a view within one frame, its
+query runs once.
+"""
+from collections import defaultdict
+
+FRAME_MS = 16  # Flush delay: roughly one UI frame
+
+
+class InvalidationBus:
+    """Debounces "table changed" notices into one refresh per dirty view."""
+
+    def __init__(self, root, delay_ms=FRAME_MS):
+        self._root = root
+        self._delay_ms = delay_ms
+        self._subscribers = defaultdict(list)  # table -> [view name]
+        self._refreshers = {}                  # view name -> refresh callable
+        self._dirty = {}                       # view name -> refresh callable (insertion-ordered)
+        self._listeners = []                   # Called at once with each published table
+        self._scheduled = None
+        self.stats = {'published': 0, 'flushes': 0, 'refreshes': 0, 'coalesced': 0}
+
+    def subscribe(self, table, view, refresh):
+        """Refreshes `view` with refresh() whenever `table` is published."""
+        if view not in self._subscribers[table]:
+            self._subscribers[table].append(view)
+        self._refreshers[view] = refresh
+
+    def add_listener(self, callback):
+        """Calls callback(table) on every publish, before any view refreshes (e.g. cache invalidation)."""
+        self._listeners.append(callback)
+
+    def publish(self, *tables):
+        """Marks every view that displays one of `tables` dirty and schedules a flush."""
+        for table in tables:
+            self.stats['published'] += 1
+            for callback in self._listeners:
+                callback(table)
+            for view in self._subscribers.get(table, ()):
+                if view in self._dirty:
+                    self.stats['coalesced'] += 1
+                else:
+                    self._dirty[view] = self._refreshers[view]
+        if self._dirty and self._scheduled is None:
+            self._scheduled = self._root.after(self._delay_ms, self.flush)
+
+    def flush(self):
+        """Refreshes each dirty view once. Runs on the Tk thread."""
+        self._scheduled = None
+        dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+        self.stats['flushes'] += 1
+        for view, refresh in dirty.items():
+            self.stats['refreshes'] += 1
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Error refreshing {view}: {e}") # Log error
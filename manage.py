@@ -0,0 +1,222 @@
+"""Maintenance commands for the QuickCommerce database.
+
+    python manage.py rebuild-sales-summary --start 2024-01-01 --end 2024-12-31
+    python manage.py prune-change-log --hours 24
+    python manage.py export-sales --start 2024-01-01 --end 2024-12-31 --output sales.csv
+    python manage.py shard-inventory --product 42 --shards 16
+    python manage.py sweep-reservations --every 60
+    python manage.py import-products --file catalog.csv
+    python manage.py import-inventory --file stock.csv --warehouse 2
+    python manage.py assign-drivers
+    python manage.py dispatch --interval 2 --batch-size 100
+    python manage.py set-order-status --from-status Dispatched --status Delivered
+    python manage.py archive-orders --days 90 --pause 0.1
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import catalog_import
+import db_pool
+import dispatch
+import report_export
+import services
+
+
+def parse_date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a YYYY-MM-DD date.")
+
+
+# --- COMMANDS ---
+
+def rebuild_sales_summary(service, args):
+    """Backfills or repairs the daily sales rollups, one month per transaction."""
+    start, end = args.start, args.end
+    while start <= end:
+        next_month = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        chunk_end = min(end, date.fromordinal(next_month.toordinal() - 1))
+        started = time.perf_counter()
+        service.rebuild_sales_summary(start, chunk_end)
+        print(f"Rebuilt {start} to {chunk_end} in {time.perf_counter() - started:.2f}s") # Progress
+        start = next_month
+
+def prune_change_log(service, args):
+    service.run(services.call_write_proc, 'PruneChangeLog', (args.hours,))
+    print(f"Pruned Change_Log rows older than {args.hours} hour(s)")
+
+def export_sales(service, args):
+    """Streams every order in the range to a CSV or Parquet file."""
+    def progress(done, total):
+        print(f"\r{done:,} of ~{total:,} orders", end="", flush=True)
+
+    started = time.perf_counter()
+    rows = service.run(report_export.export_sales, args.output, args.start, args.end, args.chunk_size, progress)
+    print(f"\nExported {rows:,} orders to {args.output} in {time.perf_counter() - started:.1f}s")
+
+def shard_inventory(service, args):
+    """Puts hot SKUs in sharded-counter mode (or back to single-row mode with --shards 1)."""
+    for product_id in args.product:
+        service.shard_inventory(product_id, args.shards)
+        print(f"Product {product_id}: {args.shards} shard(s) per warehouse")
+
+def sweep_reservations(service, args):
+    """Releases expired cart holds; with --every, keeps sweeping until interrupted."""
+    while True:
+        released = service.sweep_reservations(args.batch_size)
+        print(f"Released {released} expired reservation(s)") # Progress
+        if not args.every:
+            return
+        time.sleep(args.every)
+
+def import_csv(service, args):
+    """Bulk-loads products or stock from a CSV file; rejected lines go to <file>.rejects.csv."""
+    def progress(done):
+        print(f"\r{done:,} rows read", end="", flush=True)
+
+    rejects_path = args.file + ".rejects.csv"
+    started = time.perf_counter()
+    if args.command == "import-products":
+        result = service.run(catalog_import.import_products, args.file, args.chunk_size, progress, rejects_path)
+    else:
+        result = service.run(catalog_import.import_inventory, args.file, args.warehouse, args.chunk_size,
+                             progress, rejects_path)
+    elapsed = time.perf_counter() - started
+    print(f"\nImported {result.imported:,} of {result.read:,} rows in {elapsed:.1f}s "
+          f"({result.read / max(elapsed, 1e-9):,.0f} rows/s)")
+    if result.rejected:
+        print(f"{len(result.rejected):,} rejected rows written to {rejects_path}")
+
+def assign_drivers(service, args):
+    """Shift start: pairs every available driver with an available vehicle in one transaction."""
+    result = service.assign_available_drivers(not args.any_location, args.dry_run)
+    print(f"Planned {len(result.planned)} pair(s), {result.same_location} at the same location")
+    if args.dry_run:
+        for driver_id, vehicle_no in result.planned:
+            print(f"  driver {driver_id} -> {vehicle_no}")
+        return
+    print(f"Updated {result.drivers_updated} driver row(s) and {result.vehicles_updated} vehicle row(s)")
+    for driver_id, vehicle_no, status in result.conflicts:
+        print(f"  skipped driver {driver_id} -> {vehicle_no}: {status}")
+
+def dispatch_orders(service, args):
+    """Runs the dispatch scheduler until interrupted (or for one tick with --once)."""
+    scheduler = dispatch.DispatchScheduler(args.batch_size, not args.any_location)
+    try:
+        while True:
+            rows = service.run(scheduler.tick)
+            if rows or args.once:
+                print(scheduler.stats.summary(scheduler.queued)) # Progress
+            if args.once:
+                return
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print(scheduler.stats.summary(scheduler.queued))
+
+def set_order_status(service, args):
+    """Bulk status transition for the listed orders, or for every order in --from-status."""
+    order_ids = args.orders or service.run(services.fetch_order_ids, args.from_status)
+    started = time.perf_counter()
+    changed = service.set_order_status(order_ids, args.status, args.batch_size)
+    print(f"Set {changed:,} of {len(order_ids):,} order(s) to '{args.status}' in {time.perf_counter() - started:.2f}s")
+
+def archive_orders(service, args):
+    """Moves closed orders older than --days to the archive tables, one short transaction per batch."""
+    def progress(done):
+        print(f"\r{done:,} orders archived", end="", flush=True)
+
+    started = time.perf_counter()
+    archived = service.archive_orders(args.days, args.batch_size, args.pause, progress)
+    print(f"\nArchived {archived:,} order(s) in {time.perf_counter() - started:.1f}s")
+
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="QuickCommerce maintenance commands.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("QC_DB_PASSWORD", ""),
+                        help="Defaults to $QC_DB_PASSWORD")
+    parser.add_argument("--database", default="QuickCommerceDB")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-sales-summary", help="Recompute the daily sales rollups for a date range")
+    rebuild.add_argument("--start", type=parse_date, required=True)
+    rebuild.add_argument("--end", type=parse_date, default=date.today())
+    rebuild.set_defaults(func=rebuild_sales_summary)
+
+    prune = commands.add_parser("prune-change-log", help="Delete old delta-sync Change_Log rows")
+    prune.add_argument("--hours", type=int, default=24)
+    prune.set_defaults(func=prune_change_log)
+
+    export = commands.add_parser("export-sales", help="Stream the sales report for a date range to CSV/Parquet")
+    export.add_argument("--start", type=parse_date, required=True)
+    export.add_argument("--end", type=parse_date, default=date.today())
+    export.add_argument("--output", required=True, help="File name; .parquet writes Parquet (needs pyarrow)")
+    export.add_argument("--chunk-size", type=int, default=report_export.DEFAULT_CHUNK_SIZE)
+    export.set_defaults(func=export_sales)
+
+    shard = commands.add_parser("shard-inventory", help="Split hot SKUs' stock over several rows per warehouse")
+    shard.add_argument("--product", type=int, nargs="+", required=True, help="Product_ID(s) to change")
+    shard.add_argument("--shards", type=int, required=True, help="Rows per warehouse (1 = single-row mode)")
+    shard.set_defaults(func=shard_inventory)
+
+    sweep = commands.add_parser("sweep-reservations", help="Delete expired cart stock holds in batches")
+    sweep.add_argument("--batch-size", type=int, default=services.SWEEP_BATCH_SIZE)
+    sweep.add_argument("--every", type=int, default=0, help="Seconds between sweeps (default: sweep once)")
+    sweep.set_defaults(func=sweep_reservations)
+
+    for name, help_text in (("import-products", "Add or update products from a CSV file"),
+                            ("import-inventory", "Add stock from a CSV file")):
+        load = commands.add_parser(name, help=help_text)
+        load.add_argument("--file", required=True)
+        load.add_argument("--chunk-size", type=int, default=catalog_import.DEFAULT_CHUNK_SIZE)
+        if name == "import-inventory":
+            load.add_argument("--warehouse", type=int, default=services.DEFAULT_WAREHOUSE_ID,
+                              help="Warehouse for rows without a Warehouse_ID")
+        load.set_defaults(func=import_csv)
+
+    assign = commands.add_parser("assign-drivers", help="Pair all available drivers with available vehicles")
+    assign.add_argument("--any-location", action="store_true", help="Ignore locations when pairing")
+    assign.add_argument("--dry-run", action="store_true", help="Print the plan without applying it")
+    assign.set_defaults(func=assign_drivers)
+
+    run_dispatch = commands.add_parser("dispatch", help="Assign pending orders to free drivers and vehicles continuously")
+    run_dispatch.add_argument("--interval", type=float, default=dispatch.DEFAULT_INTERVAL_S, help="Seconds between ticks")
+    run_dispatch.add_argument("--batch-size", type=int, default=dispatch.DEFAULT_BATCH_SIZE)
+    run_dispatch.add_argument("--any-location", action="store_true", help="Ignore locations when pairing")
+    run_dispatch.add_argument("--once", action="store_true", help="Run a single tick and exit")
+    run_dispatch.set_defaults(func=dispatch_orders)
+
+    status = commands.add_parser("set-order-status", help="Move many orders to a new status in batches")
+    status.add_argument("--status", required=True)
+    which = status.add_mutually_exclusive_group(required=True)
+    which.add_argument("--orders", type=int, nargs="+", help="Order_ID(s) to change")
+    which.add_argument("--from-status", help="Change every order currently in this status")
+    status.add_argument("--batch-size", type=int, default=services.STATUS_BATCH_SIZE)
+    status.set_defaults(func=set_order_status)
+
+    archive = commands.add_parser("archive-orders", help="Move old closed orders out of the hot order tables")
+    archive.add_argument("--days", type=int, default=services.ARCHIVE_AFTER_DAYS,
+                         help="Archive 'Delivered' / 'Cancelled' orders sold more than this many days ago")
+    archive.add_argument("--batch-size", type=int, default=services.ARCHIVE_BATCH_SIZE)
+    archive.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between batches")
+    archive.set_defaults(func=archive_orders)
+
+    args = parser.parse_args(argv)
+    config = {'host': args.host, 'user': args.user, 'password': args.password, 'database': args.database}
+    pool = db_pool.ConnectionPool(config, size=1)
+    try:
+        args.func(services.QuickCommerceService(pool=pool), args)
+    finally:
+        pool.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
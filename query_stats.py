@@ -0,0 +1,229 @@
+"""Per-statement latency statistics for the GUI's database calls.
+
+run_with_connection() hands every job an InstrumentedConnection, whose
+cursors time each execute / callproc and each fetch and record them in the
+shared QueryRecorder under the statement's fingerprint (literals replaced by
+?, IN lists collapsed) and the UI action that issued it. Time spent waiting
+for a pooled connection is recorded under "(connect)". Everything is kept in
+memory as fixed-bucket histograms, so recording costs a dictionary lookup
+and a few additions per statement.
+
+    recorder.top(20)                   # Statements by total time
+    recorder.slow_queries              # Recent statements over the threshold
+    recorder.dump_json("stats.json")
+
+The admin "Query Stats" tab shows the same data.
+"""
+import json
+import re
+import threading
+import time
+from collections import deque
+
+# Histogram bucket upper bounds in milliseconds; slower calls go to the last (overflow) bucket
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+SLOW_QUERY_MS = 200      # Statements slower than this are logged
+SLOW_LOG_SIZE = 200      # Slow statements kept for the admin tab
+CONNECT = "(connect)"    # Pseudo-statement for pool acquire time
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMS = re.compile(r"%\(\w+\)s|%s")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalises a statement so calls differing only in values share one entry."""
+    sql = _COMMENTS.sub(" ", sql)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PARAMS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _LISTS.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+def work_name(work):
+    """Default action label for a DB job: the function's (qualified) name."""
+    return getattr(work, "__qualname__", None) or getattr(work, "__name__", None) or repr(work)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        bucket = 0
+        while bucket < len(BUCKET_BOUNDS_MS) and ms > BUCKET_BOUNDS_MS[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        wanted = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted and count:
+                return min(BUCKET_BOUNDS_MS[bucket], self.max_ms) if bucket < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def as_dict(self):
+        return {"count": self.count, "total_ms": round(self.total_ms, 3), "max_ms": round(self.max_ms, 3),
+                "p50_ms": self.percentile(0.5), "p95_ms": self.percentile(0.95), "p99_ms": self.percentile(0.99),
+                "buckets": dict(zip([f"<={b}" for b in BUCKET_BOUNDS_MS] + ["more"], self.counts))}
+
+
+class StatementStats:
+    def __init__(self, statement):
+        self.statement = statement
+        self.execute = LatencyHistogram()  # execute / callproc, one entry per call
+        self.fetch = LatencyHistogram()    # Each fetch call
+        self.rows = 0                      # Rows fetched, or affected by writes
+        self.actions = {}                  # action -> total ms
+
+    @property
+    def calls(self):
+        return self.execute.count
+
+    @property
+    def total_ms(self):
+        return self.execute.total_ms + self.fetch.total_ms
+
+    def top_action(self):
+        return max(self.actions, key=self.actions.get) if self.actions else ""
+
+    def as_dict(self):
+        return {"statement": self.statement, "calls": self.calls, "total_ms": round(self.total_ms, 3),
+                "rows": self.rows, "execute": self.execute.as_dict(), "fetch": self.fetch.as_dict(),
+                "actions": {action: round(ms, 3) for action, ms in self.actions.items()}}
+
+
+class QueryRecorder:
+    """Thread-safe store of StatementStats keyed by fingerprint."""
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.slow_queries = deque(maxlen=SLOW_LOG_SIZE)  # (wall time, ms, phase, action, statement)
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.started = time.time()
+
+    def record(self, statement, action, phase, seconds, rows=0):
+        """Adds one timed call; phase is 'execute', 'fetch' or 'connect'."""
+        ms = seconds * 1000
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is None:
+                stats = self._stats[statement] = StatementStats(statement)
+            (stats.fetch if phase == "fetch" else stats.execute).add(ms)
+            stats.rows += rows
+            stats.actions[action] = stats.actions.get(action, 0.0) + ms
+            slow = ms >= self.slow_query_ms
+            if slow:
+                self.slow_queries.append((time.time(), ms, phase, action, statement))
+        if slow:
+            print(f"Slow query ({ms:.0f} ms {phase}, {action}): {statement[:200]}") # Log slow query
+
+    def top(self, n=20, key="total_ms"):
+        """The n statements with the most total time (or another StatementStats attribute)."""
+        with self._lock:
+            stats = list(self._stats.values())
+        return sorted(stats, key=lambda s: getattr(s, key), reverse=True)[:n]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow_queries.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            return {"started": self.started, "slow_query_ms": self.slow_query_ms,
+                    "statements": sorted((s.as_dict() for s in self._stats.values()),
+                                         key=lambda s: s["total_ms"], reverse=True),
+                    "slow_queries": [{"at": at, "ms": round(ms, 3), "phase": phase, "action": action,
+                                      "statement": statement}
+                                     for at, ms, phase, action, statement in self.slow_queries]}
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+recorder = QueryRecorder()
+
+
+# --- INSTRUMENTED CONNECTION ---
+
+class InstrumentedCursor:
+    """Cursor proxy that times execute / callproc and fetches for the recorder."""
+
+    def __init__(self, cursor, action, statement=None):
+        self._cursor = cursor
+        self._action = action
+        self._statement = statement
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, phase, call, *args):
+        started = time.perf_counter()
+        result = call(*args)
+        elapsed = time.perf_counter() - started
+        if phase == "fetch":
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+        else:
+            rows = max(self._cursor.rowcount, 0) if not getattr(self._cursor, "with_rows", False) else 0
+        recorder.record(self._statement, self._action, phase, elapsed, rows)
+        return result
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._statement = fingerprint(operation)
+        return self._timed("execute", lambda: self._cursor.execute(operation, params, *args, **kwargs))
+
+    def executemany(self, operation, seq_params):
+        self._statement = fingerprint(operation)
+        return self._timed("execute", self._cursor.executemany, operation, seq_params)
+
+    def callproc(self, procname, args=()):
+        self._statement = f"CALL {procname}"
+        return self._timed("execute", self._cursor.callproc, procname, args)
+
+    def stored_results(self):
+        for result in self._cursor.stored_results():
+            yield InstrumentedCursor(result, self._action, self._statement)
+
+    def fetchone(self):
+        return self._timed("fetch", self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed("fetch", lambda: self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany())
+
+    def fetchall(self):
+        return self._timed("fetch", self._cursor.fetchall)
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors report to the recorder under `action`."""
+
+    def __init__(self, conn, action):
+        self._conn = conn
+        self._action = action
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._action)
@@ -0,0 +1,130 @@
+"""In-process cache for dropdown reference data.
+
+Warehouses and the available drivers and vehicles change far less often
+than the dropdowns showing them are refreshed (the customer and product
+pickers search instead, see search.py). Each entity is fetched
+with only the columns it displays, kept for a per-entity TTL and dropped as
+soon as the app's own writes (or delta sync) report a change to its table, so
+filling a ComboBox is normally a dictionary lookup.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 64
+
+
+class RefEntity:
+    def __init__(self, query, display_col, id_col, ttl, table):
+        self.query = query
+        self.display_col = display_col
+        self.id_col = id_col
+        self.ttl = ttl        # Seconds before a cached copy is re-fetched
+        self.table = table    # Writes to this table invalidate the entity
+
+
+ENTITIES = {
+    'warehouses': RefEntity("SELECT Warehouse_ID, Location FROM WAREHOUSE ORDER BY Warehouse_ID",
+                            "Location", "Warehouse_ID", ttl=300, table="WAREHOUSE"),
+    'available_drivers': RefEntity("SELECT Driver_ID, D_Name FROM DRIVER WHERE Availability = 'Available' ORDER BY Driver_ID",
+                                   "D_Name", "Driver_ID", ttl=30, table="DRIVER"),
+    'available_vehicles': RefEntity("SELECT Vehicle_no FROM FLEET WHERE Availability = 'Available' ORDER BY Vehicle_no",
+                                    "Vehicle_no", None, ttl=30, table="FLEET"),
+}
+
+
+def fetch_combobox_data(conn, query, display_col, id_col=None, params=()):
+    """Runs a query and returns {display_text: key} for a ComboBox."""
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+
+    # Look the columns up once, not once per row.
+    display_index = cursor.column_names.index(display_col)
+    key_index = cursor.column_names.index(id_col or display_col)
+
+    # Format display text (e.g., "John Doe (ID: 1)")
+    return {f"{row[display_index]} (ID: {row[key_index]})": row[key_index] for row in rows}
+
+
+class RefCache:
+    """Thread-safe TTL + LRU cache of {display_text: key} mappings.
+
+    get() is called on the Tk thread and never touches the database; load()
+    runs on a DB worker and stores what it fetched. A load that raced with an
+    invalidation of its table is returned but not cached.
+    """
+
+    def __init__(self, entities=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.entities = entities or ENTITIES
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (name, params) -> (expires_at, data)
+        self._generations = {}         # table -> invalidation counter
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'loads': 0,
+                       'load_time': 0.0, 'invalidations': 0, 'evictions': 0, 'stale_loads': 0}
+
+    def get(self, name, params=()):
+        """Returns the cached mapping for entity `name`, or None if it must be loaded."""
+        key = (name, tuple(params))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            expires_at, data = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return data
+
+    def load(self, conn, name, params=()):
+        """Fetches entity `name` and caches it. Runs on a DB worker thread."""
+        entity = self.entities[name]
+        with self._lock:
+            generation = self._generations.get(entity.table, 0)
+
+        start = time.perf_counter()
+        data = fetch_combobox_data(conn, entity.query, entity.display_col, entity.id_col, tuple(params))
+        elapsed = time.perf_counter() - start
+
+        key = (name, tuple(params))
+        with self._lock:
+            self._stats['loads'] += 1
+            self._stats['load_time'] += elapsed
+            if self._generations.get(entity.table, 0) != generation:
+                self._stats['stale_loads'] += 1
+                return data
+            self._entries[key] = (time.monotonic() + entity.ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return data
+
+    def invalidate_table(self, table):
+        """Drops every entity built from `table`."""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key in self._entries if self.entities[key[0]].table == table]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            for table in {entity.table for entity in self.entities.values()}:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
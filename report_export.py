@@ -0,0 +1,172 @@
+"""Streaming sales report export.
+
+Rows are read with an unbuffered cursor in fixed-size chunks and written out
+as they arrive, so memory stays flat however many orders the range covers.
+Writes CSV, or Parquet when the file name ends in .parquet and pyarrow is
+installed. The file is written to a temporary name and only renamed into
+place once the export completes.
+"""
+import csv
+import os
+import threading
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+DEFAULT_CHUNK_SIZE = 5000
+
+COLUMNS = ("Order_ID", "Customer_Name", "Order_Total", "Payment_Date", "Warehouse")
+
+# Same rows as GenerateSalesReport, oldest first; read directly because
+# procedure result sets are always fully buffered by the connector.
+SALES_EXPORT_QUERY = """
+    SELECT p.Order_ID, c.C_Name, o.Order_Total, p.Trans_date, w.Location
+    FROM PAYMENT p
+    JOIN `ORDER` o ON p.Order_ID = o.Order_ID
+    JOIN CUST_ORDER co ON o.Order_ID = co.Order_ID
+    JOIN CUSTOMER c ON co.Customer_ID = c.Customer_ID
+    JOIN WAREHOUSE w ON o.Warehouse_ID = w.Warehouse_ID
+    WHERE p.Trans_date >= %s AND p.Trans_date < %s + INTERVAL 1 DAY
+    ORDER BY p.Trans_date
+"""
+
+# Used instead when the range reaches back into the archive tables.
+SALES_EXPORT_WITH_ARCHIVE_QUERY = """
+    SELECT p.Order_ID, c.C_Name, o.Order_Total, p.Trans_date, w.Location
+    FROM PAYMENT p
+    JOIN `ORDER` o ON p.Order_ID = o.Order_ID
+    JOIN CUST_ORDER co ON o.Order_ID = co.Order_ID
+    JOIN CUSTOMER c ON co.Customer_ID = c.Customer_ID
+    JOIN WAREHOUSE w ON o.Warehouse_ID = w.Warehouse_ID
+    WHERE p.Trans_date >= %s AND p.Trans_date < %s + INTERVAL 1 DAY
+    UNION ALL
+    SELECT p.Order_ID, c.C_Name, o.Order_Total, p.Trans_date, w.Location
+    FROM Archive_Payment p
+    JOIN Archive_Order o ON p.Order_ID = o.Order_ID
+    JOIN Archive_Cust_Order co ON o.Order_ID = co.Order_ID
+    JOIN CUSTOMER c ON co.Customer_ID = c.Customer_ID
+    JOIN WAREHOUSE w ON o.Warehouse_ID = w.Warehouse_ID
+    WHERE p.Trans_date >= %s AND p.Trans_date < %s + INTERVAL 1 DAY
+    ORDER BY Trans_date
+"""
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def parquet_available():
+    return pa is not None
+
+
+# --- WRITERS ---
+
+class CsvWriter:
+    def __init__(self, f):
+        self._writer = csv.writer(f)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """Writes each chunk as one row group."""
+
+    def __init__(self, path):
+        self._schema = pa.schema([
+            ("Order_ID", pa.int64()),
+            ("Customer_Name", pa.string()),
+            ("Order_Total", pa.decimal128(10, 2)),
+            ("Payment_Date", pa.timestamp("s")),
+            ("Warehouse", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self._writer.write_table(pa.table(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self._schema)],
+            schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+# --- EXPORT ---
+
+def estimate_rows(conn, start_date, end_date):
+    """Order count for the range from the daily rollup (cheap; used for progress)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(SUM(Orders), 0) FROM Daily_Sales_Summary WHERE Sale_Date BETWEEN %s AND %s",
+                   (start_date, end_date))
+    return int(cursor.fetchone()[0])
+
+def reads_archive(conn, start_date):
+    """True when the range starts at or before the newest archived sale (see ArchiveClosedOrders)."""
+    # Compared in SQL so date objects (CLI) and YYYY-MM-DD text (GUI) both work
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(Archived_Until) >= CAST(%s AS DATE) FROM Archive_Watermark", (start_date,))
+    return bool(cursor.fetchone()[0])
+
+def export_sales(conn, path, start_date, end_date, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, cancel=None):
+    """Streams the sales report for a date range to `path`; returns the number of rows written.
+
+    progress(rows_written, estimated_total) is called after every chunk (on the
+    calling thread). Setting the `cancel` Event stops the export, removes the
+    partial file and raises ExportCancelled; the connection is then discarded
+    because its result set was abandoned mid-stream.
+    """
+    parquet = path.lower().endswith(".parquet")
+    if parquet and not parquet_available():
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); choose a .csv file instead.")
+    cancel = cancel or threading.Event()
+    total = estimate_rows(conn, start_date, end_date)
+    temp_path = path + ".part"
+
+    f = None
+    if parquet:
+        writer = ParquetWriter(temp_path)
+    else:
+        f = open(temp_path, "w", newline="", encoding="utf-8")
+        writer = CsvWriter(f)
+
+    written = 0
+    completed = False
+    try:
+        cursor = conn.cursor(buffered=False)
+        if reads_archive(conn, start_date):
+            cursor.execute(SALES_EXPORT_WITH_ARCHIVE_QUERY, (start_date, end_date) * 2)
+        else:
+            cursor.execute(SALES_EXPORT_QUERY, (start_date, end_date))
+        while True:
+            if cancel.is_set():
+                raise ExportCancelled(f"Export cancelled after {written:,} rows.")
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.write(rows)
+            written += len(rows)
+            if progress is not None:
+                progress(written, max(total, written))
+        cursor.close()
+        completed = True
+    finally:
+        writer.close()
+        if f is not None:
+            f.close()
+        if completed:
+            os.replace(temp_path, path)
+        else:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if hasattr(conn, "discard"):
+                conn.discard() # Unread rows are still on the wire
+    return written
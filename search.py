@@ -0,0 +1,208 @@
+"""Type-ahead search for the product and customer pickers.
+
+search() returns only the top `limit` matches for what has been typed:
+an exact ID, then names (or emails) starting with the text, read in index
+order from the B-tree indexes, then rows whose words start with every typed
+word, from the FULLTEXT index in boolean mode. Each step is an index range
+read capped by LIMIT, so the cost does not grow with the catalog.
+
+SearchCache keeps recent results per (entity, text). A result that came back
+short of the limit holds every match, so a longer text typed after it is
+answered by filtering that result in memory; most keystrokes after the
+first few never reach the database.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+SEARCH_LIMIT = 20        # Matches shown in a picker
+MIN_WORD_LEN = 3         # innodb_ft_min_token_size: shorter words are not in the FULLTEXT index
+DEFAULT_TTL = 60         # Seconds a cached result is trusted without an invalidation
+DEFAULT_MAX_ENTRIES = 256
+
+_WORDS = re.compile(r"\w+")
+
+
+class SearchEntity:
+    def __init__(self, name, table, columns, prefix_cols, fulltext_cols):
+        self.name = name
+        self.table = table                  # Writes to this table invalidate cached results
+        self.columns = columns              # (id, display name, other searchable columns...)
+        self.prefix_cols = prefix_cols      # Each has a B-tree index for LIKE 'text%'
+        self.fulltext_cols = fulltext_cols  # Columns of the table's FULLTEXT index
+        select = f"SELECT {', '.join(columns)} FROM {table}"
+        match = f"MATCH({', '.join(fulltext_cols)}) AGAINST (%s IN BOOLEAN MODE)"
+        self.by_id_sql = f"{select} WHERE {columns[0]} = %s"
+        self.prefix_sqls = [f"{select} WHERE {col} LIKE %s ORDER BY {col} LIMIT %s" for col in prefix_cols]
+        self.fulltext_sql = f"{select} WHERE {match} ORDER BY {match} DESC LIMIT %s"
+
+
+PRODUCTS = SearchEntity("products", "PRODUCT", ("Product_ID", "P_Name", "Description"),
+                        ("P_Name",), ("P_Name", "Description"))
+CUSTOMERS = SearchEntity("customers", "CUSTOMER", ("Customer_ID", "C_Name", "Email_ID"),
+                         ("C_Name", "Email_ID"), ("C_Name", "Email_ID"))
+
+ENTITIES = {entity.name: entity for entity in (PRODUCTS, CUSTOMERS)}
+
+
+# --- MATCHING ---
+
+def normalise(text):
+    return " ".join((text or "").split())
+
+def search_words(text):
+    """Lower-cased words long enough for the FULLTEXT index."""
+    return [word for word in _WORDS.findall(text.casefold()) if len(word) >= MIN_WORD_LEN]
+
+def boolean_query(text):
+    """'fresh milk' -> '+fresh* +milk*' (every word, as a word prefix); '' if no word qualifies."""
+    return " ".join(f"+{word}*" for word in search_words(text))
+
+def like_prefix(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def matches(entity, text, row):
+    """Whether search(entity, text) would return `row` (apart from the limit)."""
+    if text.isdigit() and str(row[0]) == text:
+        return True
+    folded = text.casefold()
+    values = dict(zip(entity.columns, row))
+    if any(str(values[col] or "").casefold().startswith(folded) for col in entity.prefix_cols):
+        return True
+    wanted = search_words(text)
+    if not wanted:
+        return False
+    words = _WORDS.findall(" ".join(str(values[col] or "") for col in entity.fulltext_cols).casefold())
+    return all(any(word.startswith(w) for word in words) for w in wanted)
+
+def narrows(shorter, text):
+    """True when every match for `text` is also a match for `shorter` (a prefix of it)."""
+    if shorter == "":
+        return True   # The empty search lists every row
+    if not text.startswith(shorter) or text.isdigit():
+        return False  # An exact ID match is not implied by a shorter ID
+    wanted = search_words(text)
+    if not wanted:
+        return True   # Prefix matches only
+    had = search_words(shorter)
+    return bool(had) and all(any(w.startswith(h) for w in wanted) for h in had)
+
+
+# --- DATABASE ---
+
+def search(conn, entity, text, limit=SEARCH_LIMIT):
+    """Top `limit` matches for the typed text, best first: [(id, name, other columns...)]."""
+    text = normalise(text)
+    found = OrderedDict()
+    cursor = conn.cursor()
+
+    def add(rows):
+        for row in rows:
+            if len(found) < limit:
+                found.setdefault(row[0], row)
+
+    if text.isdigit():
+        cursor.execute(entity.by_id_sql, (int(text),))
+        add(cursor.fetchall())
+    for sql in entity.prefix_sqls:
+        if len(found) < limit:
+            cursor.execute(sql, (like_prefix(text), limit))
+            add(cursor.fetchall())
+    expression = boolean_query(text)
+    if expression and len(found) < limit:
+        cursor.execute(entity.fulltext_sql, (expression, expression, limit))
+        add(cursor.fetchall())
+    return list(found.values())
+
+def combobox_data(rows):
+    """{display_text: id} in the reference-data format, e.g. "Milk (ID: 7)"."""
+    return {f"{row[1]} (ID: {row[0]})": row[0] for row in rows}
+
+
+# --- CACHE ---
+
+class SearchCache:
+    """Thread-safe LRU of search results, with prefix narrowing.
+
+    get() runs on the Tk thread and never touches the database; load() runs
+    on a DB worker. Like RefCache, a load that raced with an invalidation of
+    its table is returned but not cached.
+    """
+
+    def __init__(self, limit=SEARCH_LIMIT, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.limit = limit
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (entity name, text) -> (expires_at, rows, complete)
+        self._generations = {}         # table -> invalidation counter
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'narrowed': 0, 'misses': 0, 'loads': 0, 'load_time': 0.0,
+                       'invalidations': 0, 'stale_loads': 0}
+
+    def get(self, entity, text):
+        """Cached rows for the text, or None if it must be loaded."""
+        text = normalise(text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((entity.name, text))
+            if entry is not None and now < entry[0]:
+                self._entries.move_to_end((entity.name, text))
+                self._stats['hits'] += 1
+                return entry[1]
+            # A complete result for a shorter text holds every match for this one
+            for end in range(len(text) - 1, -1, -1):
+                shorter = text[:end]
+                entry = self._entries.get((entity.name, shorter))
+                if entry is None or now >= entry[0] or not entry[2] or not narrows(shorter, text):
+                    continue
+                rows = [row for row in entry[1] if matches(entity, text, row)]
+                self._store(entity, text, entry[0], rows, True)
+                self._stats['narrowed'] += 1
+                return rows
+            self._stats['misses'] += 1
+            return None
+
+    def load(self, conn, entity, text):
+        """Searches the database and caches the result. Runs on a DB worker thread."""
+        text = normalise(text)
+        with self._lock:
+            generation = self._generations.get(entity.table, 0)
+
+        start = time.perf_counter()
+        rows = search(conn, entity, text, self.limit)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._stats['loads'] += 1
+            self._stats['load_time'] += elapsed
+            if self._generations.get(entity.table, 0) != generation:
+                self._stats['stale_loads'] += 1
+                return rows
+            self._store(entity, text, time.monotonic() + self.ttl, rows, len(rows) < self.limit)
+        return rows
+
+    def invalidate_table(self, table):
+        """Drops every result read from `table`."""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key in self._entries if ENTITIES[key[0]].table == table]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += len(stale)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['narrowed'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['narrowed']) / lookups if lookups else 0.0
+        return stats
+
+    # --- Internals ---
+
+    def _store(self, entity, text, expires_at, rows, complete):
+        self._entries[(entity.name, text)] = (expires_at, rows, complete)
+        self._entries.move_to_end((entity.name, text))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,459 @@
+"""QuickCommerce business operations, independent of the GUI.
+
+Every operation is a plain function taking a DB connection first, so the
+Tkinter app can run it on its background worker and scripts, benchmarks or
+worker processes can call it directly. QuickCommerceService wraps the same
+functions with pooled connection management: each call borrows its own
+connection, so one instance can be shared by many threads. In a
+multi-process setup, create one service per process.
+"""
+import json
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import mysql.connector
+
+import bulk_orders
+import db_pool
+import driver_matching
+from sql_util import in_clause
+
+DEFAULT_WAREHOUSE_ID = 1  # Used where a single warehouse must be named (batch orders)
+MAX_SHARDS = 64  # ShardInventory's limit
+RESERVATION_TTL_S = 600  # How long a cart holds its stock without activity
+SWEEP_BATCH_SIZE = 1000  # Expired holds deleted per ReleaseExpiredReservations call
+STATUS_BATCH_SIZE = 5000  # Orders per BulkSetOrderStatus call (and per commit)
+ARCHIVE_AFTER_DAYS = 90  # Closed orders older than this move to the Archive_ tables
+ARCHIVE_BATCH_SIZE = 500  # Orders per ArchiveClosedOrders call (and per commit)
+DRIVER_STATUSES = ('Available', 'On-Trip', 'Unavailable')
+VEHICLE_STATUSES = ('Available', 'In-Use', 'Maintenance')
+
+Cart = Mapping[int, int]  # product_id -> quantity
+
+
+class ValidationError(ValueError):
+    """Raised for bad input before anything is sent to the database."""
+
+
+# --- LOW-LEVEL HELPERS ---
+
+def execute_write(conn, query: str, params: Sequence[Any]) -> int:
+    """Executes a single write statement, commits it and returns the new row id (if any)."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    return cursor.lastrowid
+
+def call_write_proc(conn, proc_name: str, args: Sequence[Any]) -> List[Tuple]:
+    """Calls a stored procedure that writes data, commits it and returns any result rows."""
+    try:
+        cursor = conn.cursor()
+        cursor.callproc(proc_name, args)
+        rows = []
+        for result in cursor.stored_results():
+            rows.extend(result.fetchall())
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    return rows
+
+def _require(condition: bool, message: str) -> None:
+    if not condition:
+        raise ValidationError(message)
+
+
+# --- READS ---
+
+# Stock of an Inventory row `i`, including its shards when the SKU is sharded
+# (the Inventory_Available view, inlined so lookups by key use the indexes).
+ROW_STOCK = """i.Quantity + IFNULL((SELECT SUM(s.Quantity) FROM Inventory_Shard s
+                WHERE s.Product_ID = i.Product_ID AND s.Warehouse_ID = i.Warehouse_ID), 0)"""
+LIVE_HOLDS = """IFNULL((SELECT SUM(r.Quantity) FROM Stock_Reservation r
+                 WHERE r.Product_ID = p.Product_ID AND r.Expires_At > NOW()), 0)"""
+
+def fetch_available_products(conn, warehouse_id: Optional[int] = None, key_col: Optional[str] = None,
+                             keys: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+    """In-stock products for the shop. With keys, re-reads just those rows (sold-out included).
+
+    Without a warehouse, Quantity is the stock summed over all warehouses, read
+    from the Product_Availability index (key_col then refers to p.Product_ID),
+    less the units held in shoppers' carts. Holds are not tied to a warehouse,
+    so a single warehouse's stock is reduced by every live hold on the product:
+    what it shows can always be held and shipped from there. Quantity is
+    never below 0, and sharded SKUs are summed over their shards either way.
+    """
+    cursor = conn.cursor(dictionary=True)
+    if warehouse_id is None:
+        query = f"""
+            SELECT p.Product_ID, p.P_Name, p.Price,
+                   GREATEST(a.Total_Quantity + IFNULL((SELECT SUM(s.Quantity) FROM Inventory_Shard s
+                                                       WHERE s.Product_ID = a.Product_ID), 0)
+                            - {LIVE_HOLDS}, 0) AS Quantity
+            FROM Product_Availability a
+            JOIN PRODUCT p ON p.Product_ID = a.Product_ID
+        """
+        params = []
+        condition = "a.Listed = 1"
+    else:
+        query = f"""
+            SELECT p.Product_ID, p.P_Name, p.Price, GREATEST({ROW_STOCK} - {LIVE_HOLDS}, 0) AS Quantity
+            FROM PRODUCT p
+            JOIN Inventory i ON p.Product_ID = i.Product_ID
+            WHERE i.Warehouse_ID = %s
+        """
+        params = [warehouse_id]
+        condition = None
+    if keys:
+        condition = f"{key_col} IN ({in_clause(keys)})"
+        params.extend(keys)
+    if condition:
+        query += (" WHERE " if warehouse_id is None else " AND ") + condition
+    if not keys:
+        query += " HAVING Quantity > 0" # Sharded stock is only known after summing
+    cursor.execute(query + " ORDER BY p.Product_ID", tuple(params))
+    return cursor.fetchall()
+
+def fetch_inventory_products(conn, inventory_ids: Sequence[Any]) -> List[int]:
+    """Product_IDs of the given Inventory rows (maps inventory changes onto shop rows)."""
+    if not inventory_ids:
+        return []
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT DISTINCT Product_ID FROM Inventory WHERE Inventory_ID IN ({in_clause(inventory_ids)})",
+                   tuple(inventory_ids))
+    return [row[0] for row in cursor.fetchall()]
+
+def fetch_inventory(conn, key_col: Optional[str] = None,
+                    keys: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+    """Inventory rows with product and warehouse names, optionally only for the given keys."""
+    cursor = conn.cursor(dictionary=True)
+    query = f"""
+        SELECT i.Inventory_ID, p.P_Name, w.Location, {ROW_STOCK} AS Quantity
+        FROM Inventory i
+        JOIN PRODUCT p ON i.Product_ID = p.Product_ID
+        JOIN WAREHOUSE w ON i.Warehouse_ID = w.Warehouse_ID
+    """
+    params = []
+    if keys:
+        query += f" WHERE {key_col} IN ({in_clause(keys)})"
+        params.extend(keys)
+    cursor.execute(query + " ORDER BY i.Inventory_ID", tuple(params))
+    return cursor.fetchall()
+
+def fetch_proc_rows(conn, proc_name: str, args: Sequence[Any]) -> List[Tuple]:
+    """Calls a read-only stored procedure and returns the rows of its result sets."""
+    cursor = conn.cursor()
+    # Call the stored procedure
+    cursor.callproc(proc_name, args)
+
+    # Fetch results from the procedure
+    rows = []
+    for result in cursor.stored_results():
+        rows.extend(result.fetchall())
+    return rows
+
+def fetch_sales_report(conn, start_date, end_date) -> List[Tuple]:
+    """Rows of GenerateSalesReport: (Order_ID, Customer_Name, Order_Total, Payment_Date, Warehouse)."""
+    return fetch_proc_rows(conn, 'GenerateSalesReport', (start_date, end_date))
+
+
+# --- ORDERS ---
+
+def place_order(conn, customer_id: int, cart: Cart, warehouse_id: Optional[int] = None,
+                cart_token: Optional[str] = None) -> List[Tuple]:
+    """Places one order through PlaceNewOrder. Raises the procedure's error if stock runs out.
+
+    With no warehouse the order is routed to a warehouse that can fill the
+    cart, or split across several. Stock held by the cart_token's reservations
+    is the customer's own and is released by the order. Returns
+    (Order_ID, Warehouse_ID, Order_Total) for each order created.
+    """
+    _require(customer_id is not None, "A customer is required.")
+    _require(bool(cart), "The cart is empty.")
+    _require(all(qty > 0 for qty in cart.values()), "Quantities must be positive.")
+    cart_json = json.dumps([{"product_id": pid, "quantity": qty} for pid, qty in cart.items()])
+    return call_write_proc(conn, 'PlaceNewOrder', (customer_id, warehouse_id, cart_json, cart_token))
+
+def place_orders(conn, orders: Iterable[Tuple[int, Cart]], warehouse_id: Optional[int] = None,
+                 group_size: int = bulk_orders.DEFAULT_GROUP_SIZE) -> List[Dict[str, Any]]:
+    """Places many (customer_id, cart) orders in batches; returns one accept/reject result per order."""
+    payloads = [bulk_orders.order_payload(customer_id, cart, warehouse_id) for customer_id, cart in orders]
+    return bulk_orders.place_orders(conn, payloads, group_size)
+
+def set_order_status(conn, order_ids: Sequence[int], status: str, batch_size: int = STATUS_BATCH_SIZE) -> int:
+    """Moves orders to `status` in batches, history written set-wise; returns how many changed."""
+    _require(bool(status), "A status is required.")
+    _require(batch_size > 0, "Batch size must be positive.")
+    changed = 0
+    for start in range(0, len(order_ids), batch_size):
+        rows = call_write_proc(conn, 'BulkSetOrderStatus', (json.dumps(list(order_ids[start:start + batch_size])), status))
+        changed += int(rows[0][0]) if rows else 0
+    return changed
+
+def fetch_order_ids(conn, status: str) -> List[int]:
+    """Order_IDs currently in a status (idx_order_status)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT Order_ID FROM `ORDER` WHERE Status = %s ORDER BY Order_ID", (status,))
+    return [row[0] for row in cursor.fetchall()]
+
+def fetch_order_history(conn, order_id: int) -> List[Tuple]:
+    """(Status, Log_Time) transitions of one order, oldest first, archived or not."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT Status, Log_Time FROM (
+            SELECT History_ID, Status, Log_Time FROM Order_History WHERE Order_ID = %s
+            UNION ALL
+            SELECT History_ID, Status, Log_Time FROM Archive_Order_History WHERE Order_ID = %s
+        ) h
+        ORDER BY Log_Time, History_ID
+    """, (order_id, order_id))
+    return cursor.fetchall()
+
+def archive_orders(conn, older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                   pause_s: float = 0.0, progress=None) -> int:
+    """Moves closed orders older than `older_than_days` to the archive tables; returns the count.
+
+    Runs ArchiveClosedOrders until it scans fewer than batch_size candidates
+    (orders reopened meanwhile are skipped, so fewer may be moved). Each batch
+    is its own transaction; pause_s between batches leaves room for other writers.
+    progress(archived_so_far) is called after every batch.
+    """
+    _require(older_than_days >= 1, "Only orders at least a day old can be archived.")
+    _require(batch_size > 0, "Batch size must be positive.")
+    archived = 0
+    while True:
+        rows = call_write_proc(conn, 'ArchiveClosedOrders', (older_than_days, batch_size))
+        count, scanned = (int(rows[0][0]), int(rows[0][1])) if rows else (0, 0)
+        archived += count
+        if progress is not None:
+            progress(archived)
+        if scanned < batch_size:
+            return archived
+        if pause_s:
+            time.sleep(pause_s)
+
+
+# --- CART RESERVATIONS ---
+
+def reserve_stock(conn, cart_token: str, product_id: int, quantity: int, ttl_s: int = RESERVATION_TTL_S) -> None:
+    """Holds `quantity` more of a product for a cart and renews the cart's other holds.
+
+    Raises the procedure's error when that many units are not free.
+    """
+    _require(bool(cart_token), "A cart token is required.")
+    _require(product_id is not None, "A product is required.")
+    _require(quantity > 0, "Quantity must be positive.")
+    call_write_proc(conn, 'ReserveStock', (cart_token, product_id, quantity, ttl_s))
+
+def release_stock(conn, cart_token: str, product_id: Optional[int] = None) -> None:
+    """Drops a cart's hold on one product, or all of its holds."""
+    _require(bool(cart_token), "A cart token is required.")
+    call_write_proc(conn, 'ReleaseStock', (cart_token, product_id))
+
+def sweep_reservations(conn, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+    """Deletes expired holds in batches (one commit each) until none are left; returns the count."""
+    _require(batch_size > 0, "Batch size must be positive.")
+    released = 0
+    while True:
+        rows = call_write_proc(conn, 'ReleaseExpiredReservations', (batch_size,))
+        count = int(rows[0][0]) if rows else 0
+        released += count
+        if count < batch_size:
+            return released
+
+
+# --- CATALOG & INVENTORY ---
+
+def add_product(conn, name: str, description: str, price: float, expiry_date: Optional[str] = None) -> int:
+    """Adds a product and returns its Product_ID."""
+    _require(bool(name), "Product Name is required.")
+    _require(price >= 0, "Price cannot be negative.")
+    query = "INSERT INTO PRODUCT (P_Name, Description, Price, Expiry_Date) VALUES (%s, %s, %s, %s)"
+    return execute_write(conn, query, (name, description, price, expiry_date or None))
+
+def upsert_inventory(conn, product_id: int, quantity: int, warehouse_id: int = DEFAULT_WAREHOUSE_ID) -> None:
+    """Adds `quantity` to a product's stock in a warehouse, creating the row if needed."""
+    _require(product_id is not None, "A product is required.")
+    # UPSERT logic (and shard rebalancing) lives in RestockInventory
+    call_write_proc(conn, 'RestockInventory', (product_id, warehouse_id, quantity))
+
+def shard_inventory(conn, product_id: int, shards: int) -> None:
+    """Splits a hot SKU's stock over `shards` rows per warehouse (1 returns it to a single row)."""
+    _require(product_id is not None, "A product is required.")
+    _require(1 <= shards <= MAX_SHARDS, f"Shards must be between 1 and {MAX_SHARDS}.")
+    call_write_proc(conn, 'ShardInventory', (product_id, shards))
+
+
+# --- FLEET ---
+
+def add_driver(conn, name: str, availability: str, location: Optional[str] = None) -> int:
+    """Adds a driver and returns its Driver_ID."""
+    _require(bool(name), "Name is required.")
+    _require(availability in DRIVER_STATUSES, f"Availability must be one of {', '.join(DRIVER_STATUSES)}.")
+    return execute_write(conn, "INSERT INTO DRIVER (D_Name, Availability, Location) VALUES (%s, %s, %s)",
+                         (name, availability, location or None))
+
+def add_vehicle(conn, vehicle_no: str, availability: str, location: str) -> None:
+    _require(bool(vehicle_no) and bool(location), "Vehicle No and Location are required.")
+    _require(availability in VEHICLE_STATUSES, f"Availability must be one of {', '.join(VEHICLE_STATUSES)}.")
+    execute_write(conn, "INSERT INTO FLEET (Vehicle_no, Availability, Location) VALUES (%s, %s, %s)",
+                  (vehicle_no, availability, location))
+
+def set_driver_status(conn, driver_id: int, status: str) -> None:
+    _require(status in DRIVER_STATUSES, f"Status must be one of {', '.join(DRIVER_STATUSES)}.")
+    execute_write(conn, "UPDATE DRIVER SET Availability = %s WHERE Driver_ID = %s", (status, driver_id))
+
+def set_vehicle_status(conn, vehicle_no: str, status: str) -> None:
+    _require(status in VEHICLE_STATUSES, f"Status must be one of {', '.join(VEHICLE_STATUSES)}.")
+    execute_write(conn, "UPDATE FLEET SET Availability = %s WHERE Vehicle_no = %s", (status, vehicle_no))
+
+def assign_driver(conn, driver_id: int, vehicle_no: str) -> None:
+    """Pairs a driver with a vehicle through AssignDriverToVehicle."""
+    _require(driver_id is not None and bool(vehicle_no), "Must select one driver and one vehicle.")
+    call_write_proc(conn, 'AssignDriverToVehicle', (driver_id, vehicle_no))
+
+def assign_available_drivers(conn, by_location: bool = True, dry_run: bool = False) -> driver_matching.MatchResult:
+    """Pairs every available driver with an available vehicle (same location first) in one transaction."""
+    return driver_matching.assign_available(conn, by_location, dry_run)
+
+
+# --- CUSTOMERS & REPORTS ---
+
+def add_customer(conn, name: str, email: str) -> int:
+    """Adds a customer and returns its Customer_ID."""
+    _require(bool(name) and bool(email), "Name and Email are required.")
+    return execute_write(conn, "INSERT INTO CUSTOMER (C_Name, Email_ID) VALUES (%s, %s)", (name, email))
+
+def sales_report(conn, start_date: date, end_date: date) -> List[Tuple]:
+    """Order-level detail rows for a date range (use for drill-down on short ranges)."""
+    _require(start_date is not None and end_date is not None, "Start Date and End Date are required.")
+    return fetch_sales_report(conn, start_date, end_date)
+
+def sales_summary(conn, start_date: date, end_date: date) -> List[Tuple]:
+    """(Sale_Date, Orders, Units, Revenue) per day from the Daily_Sales_Summary rollup, newest first."""
+    _require(start_date is not None and end_date is not None, "Start Date and End Date are required.")
+    return fetch_proc_rows(conn, 'GenerateSalesSummary', (start_date, end_date))
+
+def sales_breakdown(conn, start_date: date, end_date: date, by: str = 'product', limit: int = 50) -> List[Tuple]:
+    """Top products or customers by revenue over a date range: (ID, Name, Units, Revenue)."""
+    _require(by in ('product', 'customer'), "Breakdown must be by 'product' or 'customer'.")
+    if by == 'product':
+        key, join = "b.Product_ID", "JOIN PRODUCT n ON n.Product_ID = b.Product_ID"
+        name = "n.P_Name"
+    else:
+        key, join = "b.Customer_ID", "LEFT JOIN CUSTOMER n ON n.Customer_ID = b.Customer_ID"
+        name = "n.C_Name"
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {key}, MAX({name}), SUM(b.Units), SUM(b.Revenue) AS Revenue
+        FROM Daily_Sales_Breakdown b
+        {join}
+        WHERE b.Sale_Date BETWEEN %s AND %s
+        GROUP BY {key}
+        ORDER BY Revenue DESC
+        LIMIT %s
+    """, (start_date, end_date, limit))
+    return cursor.fetchall()
+
+def rebuild_sales_summary(conn, start_date: date, end_date: date) -> None:
+    """Recomputes the daily sales rollups for a date range from the order tables."""
+    _require(start_date is not None and end_date is not None, "Start Date and End Date are required.")
+    call_write_proc(conn, 'RebuildDailySalesSummary', (start_date, end_date))
+
+
+# --- CONNECTION-MANAGED FACADE ---
+
+class QuickCommerceService:
+    """The operations above, each run on its own pooled connection.
+
+    Thread-safe: calls never share a connection. Pass a config to use the
+    shared pool (creating it if needed) or an explicit ConnectionPool.
+    """
+
+    def __init__(self, config: Optional[Mapping[str, Any]] = None, pool: Optional[db_pool.ConnectionPool] = None):
+        self.pool = pool or db_pool.get_pool(dict(config) if config is not None else None)
+
+    def run(self, work, *args, **kwargs):
+        """Runs work(conn, *args, **kwargs) on a borrowed connection."""
+        with self.pool.connection() as conn:
+            return work(conn, *args, **kwargs)
+
+    def place_order(self, customer_id: int, cart: Cart, warehouse_id: Optional[int] = None,
+                    cart_token: Optional[str] = None) -> List[Tuple]:
+        return self.run(place_order, customer_id, cart, warehouse_id, cart_token)
+
+    def place_orders(self, orders: Iterable[Tuple[int, Cart]], warehouse_id: Optional[int] = None,
+                     group_size: int = bulk_orders.DEFAULT_GROUP_SIZE) -> List[Dict[str, Any]]:
+        return self.run(place_orders, orders, warehouse_id, group_size)
+
+    def set_order_status(self, order_ids: Sequence[int], status: str, batch_size: int = STATUS_BATCH_SIZE) -> int:
+        return self.run(set_order_status, order_ids, status, batch_size)
+
+    def order_history(self, order_id: int) -> List[Tuple]:
+        return self.run(fetch_order_history, order_id)
+
+    def archive_orders(self, older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                       pause_s: float = 0.0, progress=None) -> int:
+        return self.run(archive_orders, older_than_days, batch_size, pause_s, progress)
+
+    def reserve_stock(self, cart_token: str, product_id: int, quantity: int, ttl_s: int = RESERVATION_TTL_S) -> None:
+        return self.run(reserve_stock, cart_token, product_id, quantity, ttl_s)
+
+    def release_stock(self, cart_token: str, product_id: Optional[int] = None) -> None:
+        return self.run(release_stock, cart_token, product_id)
+
+    def sweep_reservations(self, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+        return self.run(sweep_reservations, batch_size)
+
+    def available_products(self, warehouse_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.run(fetch_available_products, warehouse_id)
+
+    def inventory(self) -> List[Dict[str, Any]]:
+        return self.run(fetch_inventory)
+
+    def add_product(self, name: str, description: str, price: float, expiry_date: Optional[str] = None) -> int:
+        return self.run(add_product, name, description, price, expiry_date)
+
+    def upsert_inventory(self, product_id: int, quantity: int, warehouse_id: int = DEFAULT_WAREHOUSE_ID) -> None:
+        return self.run(upsert_inventory, product_id, quantity, warehouse_id)
+
+    def shard_inventory(self, product_id: int, shards: int) -> None:
+        return self.run(shard_inventory, product_id, shards)
+
+    def add_driver(self, name: str, availability: str, location: Optional[str] = None) -> int:
+        return self.run(add_driver, name, availability, location)
+
+    def add_vehicle(self, vehicle_no: str, availability: str, location: str) -> None:
+        return self.run(add_vehicle, vehicle_no, availability, location)
+
+    def set_driver_status(self, driver_id: int, status: str) -> None:
+        return self.run(set_driver_status, driver_id, status)
+
+    def set_vehicle_status(self, vehicle_no: str, status: str) -> None:
+        return self.run(set_vehicle_status, vehicle_no, status)
+
+    def assign_driver(self, driver_id: int, vehicle_no: str) -> None:
+        return self.run(assign_driver, driver_id, vehicle_no)
+
+    def assign_available_drivers(self, by_location: bool = True, dry_run: bool = False) -> driver_matching.MatchResult:
+        return self.run(assign_available_drivers, by_location, dry_run)
+
+    def add_customer(self, name: str, email: str) -> int:
+        return self.run(add_customer, name, email)
+
+    def sales_report(self, start_date: date, end_date: date) -> List[Tuple]:
+        return self.run(sales_report, start_date, end_date)
+
+    def sales_summary(self, start_date: date, end_date: date) -> List[Tuple]:
+        return self.run(sales_summary, start_date, end_date)
+
+    def sales_breakdown(self, start_date: date, end_date: date, by: str = 'product', limit: int = 50) -> List[Tuple]:
+        return self.run(sales_breakdown, start_date, end_date, by, limit)
+
+    def rebuild_sales_summary(self, start_date: date, end_date: date) -> None:
+        return self.run(rebuild_sales_summary, start_date, end_date)
@@ -0,0 +1,10 @@
+"""Small SQL-building helpers shared by the service layer and the views.
+
+No database imports, so anything can use them (and test them) without a
+connector installed.
+"""
+
+
+def in_clause(keys):
+    """Placeholder list for an IN (...) filter over `keys`."""
+    return ", ".join(["%s"] * len(keys))
@@ -0,0 +1,124 @@
+"""Tests for db_pool.ConnectionPool borrowing, waiting, health checks and eviction."""
+import threading
+import time
+
+import mysql.connector
+import pytest
+from mysql.connector import errors
+
+import db_pool
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.in_transaction = False
+        self.closed = False
+        self.rollbacks = 0
+        self.ping_error = None
+        self.rollback_error = None
+
+    def rollback(self):
+        if self.rollback_error:
+            raise self.rollback_error
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def ping(self, reconnect=False):
+        if self.ping_error:
+            raise self.ping_error
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Replaces the physical connect with FakeConnections; yields the list of them."""
+    connections = []
+
+    def connect(**config):
+        connections.append(FakeConnection(len(connections) + 1))
+        return connections[-1]
+
+    monkeypatch.setattr(mysql.connector, "connect", connect)
+    return connections
+
+
+def test_returned_connection_is_reused(opened):
+    pool = db_pool.ConnectionPool({}, size=2)
+    with pool.connection() as conn:
+        first = conn._raw
+    with pool.connection() as conn:
+        assert conn._raw is first
+    stats = pool.stats()
+    assert (stats['connects'], stats['hits'], stats['open'], stats['idle']) == (1, 1, 1, 1)
+
+def test_exhausted_pool_times_out(opened):
+    pool = db_pool.ConnectionPool({}, size=1)
+    held = pool.acquire()
+    with pytest.raises(errors.PoolError):
+        pool.acquire(timeout=0.05)
+    stats = pool.stats()
+    assert (stats['waits'], stats['timeouts'], stats['open']) == (1, 1, 1)
+    held.close()
+
+def test_waiter_gets_the_returned_connection(opened):
+    pool = db_pool.ConnectionPool({}, size=1)
+    held = pool.acquire()
+    threading.Timer(0.05, held.close).start()
+    conn = pool.acquire(timeout=5)
+    assert conn._raw is opened[0]
+    assert len(opened) == 1
+    assert pool.stats()['waits'] == 1
+
+def test_returned_connection_is_unusable(opened):
+    pool = db_pool.ConnectionPool({}, size=1)
+    conn = pool.acquire()
+    conn.close()
+    with pytest.raises(errors.OperationalError):
+        conn.cursor()
+
+def test_release_rolls_back_an_open_transaction(opened):
+    pool = db_pool.ConnectionPool({}, size=1)
+    conn = pool.acquire()
+    conn._raw.in_transaction = True
+    conn.close()
+    assert opened[0].rollbacks == 1
+    assert pool.stats()['idle'] == 1
+
+def test_broken_connection_is_dropped_and_its_slot_freed(opened):
+    pool = db_pool.ConnectionPool({}, size=1)
+    conn = pool.acquire()
+    conn._raw.in_transaction = True
+    conn._raw.rollback_error = mysql.connector.Error("lost connection")
+    conn.close()
+    assert opened[0].closed
+    assert pool.stats()['discards'] == 1
+    assert pool.acquire()._raw is opened[1]
+
+def test_failed_health_check_reconnects(opened):
+    pool = db_pool.ConnectionPool({}, size=1, health_check_interval=0)
+    pool.acquire().close()
+    opened[0].ping_error = mysql.connector.Error("gone away")
+    conn = pool.acquire()
+    assert conn._raw is opened[1]
+    assert opened[0].closed
+    stats = pool.stats()
+    assert (stats['health_checks'], stats['reconnects'], stats['connects']) == (1, 1, 2)
+
+def test_idle_connections_are_evicted(opened):
+    pool = db_pool.ConnectionPool({}, size=1, max_idle=0.01)
+    pool.acquire().close()
+    time.sleep(0.02)
+    assert pool.acquire()._raw is opened[1]
+    assert opened[0].closed
+    assert pool.stats()['evictions'] == 1
+
+def test_closed_pool_refuses_connections(opened):
+    pool = db_pool.ConnectionPool({}, size=1)
+    pool.acquire().close()
+    pool.close_all()
+    assert opened[0].closed
+    with pytest.raises(errors.PoolError):
+        pool.acquire()
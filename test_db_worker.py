@@ -0,0 +1,112 @@
+"""Tests for db_worker.DBWorker delivery, superseding and cancellation."""
+import threading
+
+import pytest
+
+from db_worker import DBWorker
+
+
+class FakeRoot:
+    """Stands in for Tk: after() callbacks run when the test calls run_pending()."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+        for callback in pending:
+            callback()
+
+
+@pytest.fixture
+def worker():
+    root = FakeRoot()
+    worker = DBWorker(root, max_workers=2)
+    worker.root = root
+    yield worker
+    worker.shutdown()
+
+def finish(worker, *tickets):
+    """Waits for the jobs to run, then drains their results as the Tk poll would."""
+    for ticket in tickets:
+        if not ticket.future.cancelled():
+            ticket.future.result(timeout=5)
+    worker.root.run_pending()
+
+
+def test_result_is_delivered_on_the_poll(worker):
+    results = []
+    ticket = worker.submit("k", lambda a, b=0: a + b, 2, b=3, on_success=results.append)
+    ticket.future.result(timeout=5)
+    assert results == []  # Nothing runs until the Tk poll drains the queue
+    finish(worker)
+    assert results == [5]
+
+def test_errors_go_to_on_error(worker):
+    errors = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    finish(worker, worker.submit(None, fail, on_error=errors.append))
+    assert [str(err) for err in errors] == ["boom"]
+
+def test_superseded_result_is_dropped(worker):
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "old"
+
+    old = worker.submit("page", slow, on_success=results.append)
+    started.wait(5)
+    new = worker.submit("page", lambda: "new", on_success=results.append)
+    release.set()
+    finish(worker, old, new)
+    assert old.cancelled
+    assert results == ["new"]
+
+def test_different_keys_do_not_supersede(worker):
+    results = []
+    first = worker.submit("a", lambda: 1, on_success=results.append)
+    second = worker.submit("b", lambda: 2, on_success=results.append)
+    finish(worker, first, second)
+    assert sorted(results) == [1, 2]
+
+def test_cancel_drops_the_pending_result(worker):
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "late"
+
+    ticket = worker.submit("k", slow, on_success=results.append)
+    started.wait(5)
+    worker.cancel("k")
+    release.set()
+    finish(worker, ticket)
+    assert results == []
+
+def test_failing_callback_does_not_stop_the_poll(worker):
+    results = []
+
+    def bad_callback(value):
+        raise ValueError("bad callback")
+
+    first = worker.submit(None, lambda: 1, on_success=bad_callback)
+    second = worker.submit(None, lambda: 2, on_success=results.append)
+    finish(worker, first, second)
+    assert results == [2]
+    assert worker.root.pending  # The poll was rescheduled
+
+def test_submit_after_shutdown_fails(worker):
+    worker.shutdown()
+    with pytest.raises(RuntimeError):
+        worker.submit(None, lambda: 1)
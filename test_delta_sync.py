@@ -0,0 +1,144 @@
+"""Tests for delta_sync.DeltaSync change collapsing, overlap and resync."""
+import pytest
+
+from delta_sync import DeltaSync
+
+
+class FakeChangeLog:
+    """A connection whose only table is Change_Log (Change_ID, Table_Name, Row_Key, Operation)."""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, table, key, operation):
+        change_id = self.rows[-1][0] + 1 if self.rows else 1
+        self.rows.append((change_id, table, str(key), operation))
+
+    def prune(self, through):
+        self.rows = [row for row in self.rows if row[0] > through]
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+        self.result = []
+
+    def execute(self, sql, params=()):
+        ids = [row[0] for row in self.log.rows]
+        if sql.startswith("SELECT MIN"):
+            self.result = [(min(ids), max(ids)) if ids else (None, None)]
+        else:
+            self.result = [row for row in self.log.rows if row[0] > params[0]]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+class View:
+    """Records what DeltaSync asks a subscribed view to fetch, apply and resync."""
+
+    def __init__(self):
+        self.fetched = []
+        self.applied = []
+        self.resyncs = 0
+
+    def fetch_rows(self, conn, keys):
+        self.fetched.append(keys)
+        return [(key, f"row {key}") for key in keys]
+
+    def apply(self, rows, deleted_keys):
+        self.applied.append((rows, deleted_keys))
+
+    def resync(self):
+        self.resyncs += 1
+
+
+@pytest.fixture
+def setup():
+    log = FakeChangeLog()
+    sync = DeltaSync(batch_limit=100, overlap=10)
+    view = View()
+    sync.subscribe('PRODUCT', view.fetch_rows, view.apply, view.resync)
+    assert sync.poll(log) == []  # Baseline
+    return log, sync, view
+
+def poll(log, sync):
+    sync.deliver(sync.poll(log))
+
+
+def test_first_poll_only_sets_the_baseline():
+    log = FakeChangeLog()
+    log.add('PRODUCT', 1, 'I')
+    sync = DeltaSync()
+    assert sync.poll(log) == []
+    assert sync.version == 1
+
+def test_repeated_changes_to_a_row_are_fetched_once(setup):
+    log, sync, view = setup
+    log.add('PRODUCT', 7, 'I')
+    log.add('PRODUCT', 7, 'U')
+    log.add('PRODUCT', 3, 'U')
+    log.add('PRODUCT', 7, 'U')
+    poll(log, sync)
+    assert view.fetched == [[3, 7]]  # Keys converted from Row_Key text, sorted
+    assert view.applied == [([(3, "row 3"), (7, "row 7")], set())]
+
+def test_last_operation_wins(setup):
+    log, sync, view = setup
+    log.add('PRODUCT', 5, 'I')
+    log.add('PRODUCT', 5, 'D')
+    log.add('PRODUCT', 6, 'D')
+    log.add('PRODUCT', 6, 'I')
+    poll(log, sync)
+    assert view.fetched == [[6]]
+    assert view.applied == [([(6, "row 6")], {5})]
+
+def test_only_deletes_fetch_nothing(setup):
+    log, sync, view = setup
+    log.add('PRODUCT', 2, 'D')
+    poll(log, sync)
+    assert view.fetched == []
+    assert view.applied == [([], {2})]
+
+def test_changes_in_the_overlap_window_are_applied_once(setup):
+    log, sync, view = setup
+    log.add('PRODUCT', 1, 'U')
+    poll(log, sync)
+    poll(log, sync)  # Re-reads change 1 inside the overlap, but it was seen
+    assert len(view.applied) == 1
+    log.add('PRODUCT', 2, 'U')
+    poll(log, sync)
+    assert view.fetched == [[1], [2]]
+
+def test_unsubscribed_and_untracked_tables_are_ignored(setup):
+    log, sync, view = setup
+    log.add('DRIVER', 4, 'U')
+    log.add('ORDER', 9, 'U')
+    poll(log, sync)
+    assert view.applied == []
+
+def test_pruned_log_triggers_a_resync(setup):
+    log, sync, view = setup
+    for key in range(5):
+        log.add('PRODUCT', key, 'U')
+    log.prune(through=3)
+    poll(log, sync)
+    assert view.resyncs == 1 and view.applied == []
+    assert sync.version == 5
+
+def test_falling_too_far_behind_triggers_a_resync(setup):
+    log, sync, view = setup
+    for key in range(101):
+        log.add('PRODUCT', key, 'U')
+    poll(log, sync)
+    assert view.resyncs == 1 and view.applied == []
+
+def test_subscribing_an_untracked_table_fails():
+    with pytest.raises(ValueError):
+        DeltaSync().subscribe('ORDER', None, None, None)
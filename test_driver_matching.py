@@ -0,0 +1,32 @@
+"""Tests for driver_matching.plan_assignments."""
+from driver_matching import plan_assignments
+
+
+def test_prefers_vehicles_at_the_driver_location():
+    drivers = [(1, "Pune"), (2, "Mumbai")]
+    vehicles = [("MH01", "Mumbai"), ("MH12", "pune ")]
+    assert plan_assignments(drivers, vehicles) == ([(1, "MH12"), (2, "MH01")], 2)
+
+def test_without_location_pairs_in_id_order():
+    drivers = [(2, "Pune"), (1, "Mumbai")]
+    vehicles = [("MH12", "Pune"), ("MH01", "Mumbai")]
+    assert plan_assignments(drivers, vehicles, by_location=False) == ([(1, "MH01"), (2, "MH12")], 0)
+
+def test_leftover_drivers_take_vehicles_elsewhere():
+    drivers = [(1, "Pune"), (2, "Nagpur")]
+    vehicles = [("MH01", "Mumbai"), ("MH12", "Pune")]
+    assert plan_assignments(drivers, vehicles) == ([(1, "MH12"), (2, "MH01")], 1)
+
+def test_no_vehicles():
+    assert plan_assignments([(1, "Pune"), (2, "Mumbai")], []) == ([], 0)
+
+def test_more_drivers_than_vehicles():
+    drivers = [(3, "Pune"), (1, "Mumbai"), (2, "Pune")]
+    vehicles = [("MH12", "Pune")]
+    # The lowest Driver_ID at the vehicle's location gets it; the rest wait
+    assert plan_assignments(drivers, vehicles) == ([(2, "MH12")], 1)
+
+def test_blank_locations_never_count_as_the_same_place():
+    drivers = [(1, None)]
+    vehicles = [("MH01", "")]
+    assert plan_assignments(drivers, vehicles) == ([(1, "MH01")], 0)
@@ -0,0 +1,56 @@
+"""Tests for query_stats.fingerprint and LatencyHistogram.percentile."""
+from query_stats import BUCKET_BOUNDS_MS, LatencyHistogram, fingerprint
+
+
+# --- fingerprint ---
+
+def test_fingerprint_replaces_parameters_and_literals():
+    sql = "SELECT * FROM t WHERE a = %s AND b = %(name)s AND c = 'x' AND d = 42 LIMIT 100"
+    assert fingerprint(sql) == "SELECT * FROM t WHERE a = ? AND b = ? AND c = ? AND d = ? LIMIT ?"
+
+def test_fingerprint_collapses_single_value_list():
+    assert fingerprint("SELECT * FROM t WHERE id IN (%s)") == "SELECT * FROM t WHERE id IN (...)"
+
+def test_fingerprint_collapses_lists_of_any_length():
+    two = fingerprint("SELECT * FROM t WHERE id IN (?, ?)")
+    five = fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3, 4, 5)")
+    assert two == five == "SELECT * FROM t WHERE id IN (...)"
+
+def test_fingerprint_strips_comments_and_whitespace():
+    sql = "SELECT a -- trailing note\n  FROM t /* block\n comment */ WHERE b = 1"
+    assert fingerprint(sql) == "SELECT a FROM t WHERE b = ?"
+
+def test_fingerprint_keeps_numbers_inside_names():
+    assert fingerprint("SELECT col1 FROM t2") == "SELECT col1 FROM t2"
+
+
+# --- LatencyHistogram.percentile ---
+
+def histogram(*values):
+    hist = LatencyHistogram()
+    for ms in values:
+        hist.add(ms)
+    return hist
+
+def test_empty_histogram_percentile_is_zero():
+    hist = LatencyHistogram()
+    assert hist.percentile(0.5) == 0.0
+    assert hist.percentile(0.99) == 0.0
+
+def test_percentile_is_bucket_upper_bound():
+    hist = histogram(0.5, 3, 3, 40, 900, 7000)
+    assert hist.percentile(0.5) == 5
+
+def test_percentile_is_capped_at_the_slowest_call():
+    hist = histogram(3, 3, 3)
+    assert hist.percentile(0.5) == 3
+
+def test_overflow_bucket_percentile_is_max():
+    slowest = BUCKET_BOUNDS_MS[-1] * 3
+    hist = histogram(1, 2, BUCKET_BOUNDS_MS[-1] + 1, slowest)
+    assert hist.percentile(0.95) == slowest
+    assert hist.percentile(1.0) == slowest
+
+def test_all_calls_in_overflow_bucket():
+    hist = histogram(6000, 9000)
+    assert hist.percentile(0.5) == 9000
@@ -0,0 +1,110 @@
+"""Tests for ref_cache.RefCache TTL, LRU and invalidation (directly and through the bus)."""
+from invalidation import InvalidationBus
+from ref_cache import RefCache, RefEntity
+
+
+class FakeConnection:
+    """Answers every query with the same (id, name) rows and counts the queries."""
+
+    def __init__(self, rows, on_query=None):
+        self.rows = rows
+        self.queries = 0
+        self.on_query = on_query  # Called mid-load, e.g. to race an invalidation
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    column_names = ("Driver_ID", "D_Name")
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=()):
+        self.conn.queries += 1
+        if self.conn.on_query:
+            self.conn.on_query()
+
+    def fetchall(self):
+        return self.conn.rows
+
+
+class FakeRoot:
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+        return len(self.pending)
+
+
+def entities(ttl=300):
+    return {'drivers': RefEntity("SELECT Driver_ID, D_Name FROM DRIVER", "D_Name", "Driver_ID", ttl, "DRIVER"),
+            'warehouses': RefEntity("SELECT ...", "D_Name", "Driver_ID", ttl, "WAREHOUSE")}
+
+ROWS = [(1, "Asha"), (2, "Ravi")]
+DATA = {"Asha (ID: 1)": 1, "Ravi (ID: 2)": 2}
+
+
+def test_load_then_hit():
+    cache = RefCache(entities())
+    assert cache.get('drivers') is None
+    assert cache.load(FakeConnection(ROWS), 'drivers') == DATA
+    assert cache.get('drivers') == DATA
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['loads']) == (1, 1, 1)
+
+def test_expired_entry_is_a_miss():
+    cache = RefCache(entities(ttl=0))
+    cache.load(FakeConnection(ROWS), 'drivers')
+    assert cache.get('drivers') is None
+    assert cache.stats()['expired'] == 1
+
+def test_invalidation_drops_only_that_table():
+    cache = RefCache(entities())
+    conn = FakeConnection(ROWS)
+    cache.load(conn, 'drivers')
+    cache.load(conn, 'warehouses')
+    cache.invalidate_table("DRIVER")
+    assert cache.get('drivers') is None
+    assert cache.get('warehouses') == DATA
+
+def test_bus_publish_invalidates_before_views_refresh():
+    cache = RefCache(entities())
+    cache.load(FakeConnection(ROWS), 'drivers')
+    root = FakeRoot()
+    bus = InvalidationBus(root)
+    bus.add_listener(cache.invalidate_table)
+    seen = []
+    bus.subscribe("DRIVER", "assign", lambda: seen.append(cache.get('drivers')))
+    bus.publish("DRIVER")
+    assert cache.get('drivers') is None  # At once, not on the next frame
+    bus.publish("DRIVER")
+    for callback in root.pending:
+        callback()
+    assert seen == [None]  # Two publishes, one refresh
+
+def test_load_racing_an_invalidation_is_not_cached():
+    cache = RefCache(entities())
+    conn = FakeConnection(ROWS, on_query=lambda: cache.invalidate_table("DRIVER"))
+    assert cache.load(conn, 'drivers') == DATA
+    assert cache.get('drivers') is None
+    assert cache.stats()['stale_loads'] == 1
+
+def test_params_are_cached_separately():
+    cache = RefCache(entities())
+    cache.load(FakeConnection(ROWS), 'drivers', (1,))
+    assert cache.get('drivers', (1,)) == DATA
+    assert cache.get('drivers', (2,)) is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RefCache(entities(), max_entries=2)
+    conn = FakeConnection(ROWS)
+    cache.load(conn, 'drivers', (1,))
+    cache.load(conn, 'drivers', (2,))
+    cache.get('drivers', (1,))
+    cache.load(conn, 'drivers', (3,))
+    assert cache.get('drivers', (2,)) is None
+    assert cache.get('drivers', (1,)) == DATA
+    assert cache.stats()['evictions'] == 1
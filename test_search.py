@@ -0,0 +1,48 @@
+"""Tests for search.narrows and search.matches."""
+from search import CUSTOMERS, PRODUCTS, matches, narrows
+
+
+# --- narrows ---
+
+def test_empty_text_narrows_everything():
+    assert narrows("", "milk")
+    assert narrows("", "42")
+
+def test_text_that_does_not_extend_the_shorter_never_narrows():
+    assert not narrows("milk", "bread")
+
+def test_digits_never_narrow():
+    # "12" matches ID 12 exactly; "1" does not, so its result is not a superset
+    assert not narrows("1", "12")
+
+def test_short_words_narrow_on_prefix_only():
+    assert narrows("m", "mi")
+
+def test_longer_words_narrow_when_every_word_is_extended():
+    assert narrows("fre", "fresh")
+    assert narrows("fresh mil", "fresh milk")
+
+def test_new_word_alone_does_not_narrow():
+    # "mi" had no FULLTEXT words, so its result holds prefix matches only
+    assert not narrows("mi", "mil")
+
+
+# --- matches ---
+
+MILK = (7, "Fresh Milk", "Full cream, 1 litre")
+ALICE = (3, "Alice Smith", "alice@example.com")
+
+def test_matches_exact_id():
+    assert matches(PRODUCTS, "7", MILK)
+    assert not matches(PRODUCTS, "8", MILK)
+
+def test_matches_name_prefix_case_insensitively():
+    assert matches(PRODUCTS, "fresh m", MILK)
+    assert matches(CUSTOMERS, "ALICE@", ALICE)
+
+def test_matches_word_prefixes_in_any_fulltext_column():
+    assert matches(PRODUCTS, "cream lit", MILK)
+    assert not matches(PRODUCTS, "cream bread", MILK)
+
+def test_short_text_matches_prefix_only():
+    assert not matches(PRODUCTS, "mi", MILK)
@@ -0,0 +1,105 @@
+"""Tests that shop stock subtracts live cart holds and never goes below 0.
+
+fetch_available_products runs against an in-memory SQLite copy of the tables
+it reads. The keyed form (the delta-sync re-read) is used: it has no
+HAVING Quantity > 0 filter, so the floor is what keeps stock from going
+negative there.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import fetch_available_products
+
+SCHEMA = """
+    CREATE TABLE PRODUCT (Product_ID INTEGER PRIMARY KEY, P_Name TEXT, Price REAL);
+    CREATE TABLE Inventory (Inventory_ID INTEGER PRIMARY KEY, Product_ID INT, Warehouse_ID INT, Quantity INT);
+    CREATE TABLE Inventory_Shard (Product_ID INT, Warehouse_ID INT, Shard_No INT, Quantity INT);
+    CREATE TABLE Product_Availability (Product_ID INT PRIMARY KEY, Total_Quantity INT, Listed INT);
+    CREATE TABLE Stock_Reservation (Cart_Token TEXT, Product_ID INT, Quantity INT, Expires_At TEXT);
+"""
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+class SqliteConnection:
+    """Runs the service's MySQL-dialect queries on SQLite (%s placeholders, GREATEST, NOW)."""
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.create_function("GREATEST", -1, max)
+        self.db.create_function("NOW", 0, lambda: NOW.isoformat(" "))
+        self.db.executescript(SCHEMA)
+
+    def cursor(self, dictionary=False):
+        return SqliteCursor(self.db.cursor(), dictionary)
+
+
+class SqliteCursor:
+    def __init__(self, cursor, dictionary):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql.replace("%s", "?"), params)
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        if not self._dictionary:
+            return rows
+        names = [col[0] for col in self._cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+
+def hold(conn, product_id, quantity, minutes=10):
+    conn.db.execute("INSERT INTO Stock_Reservation VALUES ('cart', ?, ?, ?)",
+                    (product_id, quantity, (NOW + timedelta(minutes=minutes)).isoformat(" ")))
+
+
+@pytest.fixture
+def conn():
+    conn = SqliteConnection()
+    conn.db.executescript("""
+        INSERT INTO PRODUCT VALUES (1, 'Milk', 1.5), (2, 'Bread', 2.0);
+        -- Milk: 5 in warehouse 1 and 20 in warehouse 2; bread: 3 in warehouse 1
+        INSERT INTO Inventory VALUES (10, 1, 1, 5), (11, 1, 2, 20), (12, 2, 1, 3);
+        INSERT INTO Product_Availability VALUES (1, 25, 1), (2, 3, 1);
+    """)
+    return conn
+
+def stock(conn, warehouse_id=None):
+    rows = fetch_available_products(conn, warehouse_id, "p.Product_ID", [1, 2])
+    return {row['Product_ID']: row['Quantity'] for row in rows}
+
+
+def test_without_holds_stock_is_on_hand(conn):
+    assert stock(conn) == {1: 25, 2: 3}
+    assert stock(conn, 1) == {1: 5, 2: 3}
+
+def test_live_holds_are_subtracted(conn):
+    hold(conn, 1, 4)
+    hold(conn, 1, 2)
+    assert stock(conn) == {1: 19, 2: 3}
+    assert stock(conn, 2) == {1: 14}  # Holds are per product, so every warehouse loses them
+
+def test_expired_holds_are_ignored(conn):
+    hold(conn, 2, 3, minutes=-1)
+    assert stock(conn)[2] == 3
+    assert stock(conn, 1)[2] == 3
+
+def test_warehouse_stock_is_floored_at_zero(conn):
+    hold(conn, 1, 12)  # More than warehouse 1 holds, less than the total
+    assert stock(conn, 1)[1] == 0
+    assert stock(conn, 2)[1] == 8
+    assert stock(conn)[1] == 13
+
+def test_all_warehouse_stock_is_floored_at_zero(conn):
+    hold(conn, 2, 3)
+    conn.db.execute("UPDATE Product_Availability SET Total_Quantity = 1 WHERE Product_ID = 2")  # Stock fell below the holds
+    assert stock(conn)[2] == 0
+
+def test_shards_are_added_before_holds_are_subtracted(conn):
+    conn.db.execute("INSERT INTO Inventory_Shard VALUES (2, 1, 0, 4), (2, 1, 1, 4)")
+    hold(conn, 2, 6)
+    assert stock(conn)[2] == 5
+    assert stock(conn, 1)[2] == 5
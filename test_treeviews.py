@@ -0,0 +1,101 @@
+"""Tests for treeviews.TreeSync reconciliation."""
+import tkinter as tk
+
+from treeviews import TreeSync
+
+
+class FakeTree:
+    """The slice of ttk.Treeview that TreeSync uses, with a count of Tk calls."""
+
+    def __init__(self):
+        self.order = []
+        self.values = {}
+        self.calls = 0
+
+    def get_children(self):
+        return tuple(self.order)
+
+    def exists(self, iid):
+        return iid in self.values
+
+    def insert(self, parent, index, iid, values):
+        self.calls += 1
+        self.order.insert(len(self.order) if index == tk.END else index, iid)
+        self.values[iid] = values
+
+    def move(self, iid, parent, index):
+        self.calls += 1
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def item(self, iid, values):
+        self.calls += 1
+        self.values[iid] = values
+
+    def delete(self, *iids):
+        self.calls += 1
+        for iid in iids:
+            self.order.remove(iid)
+            del self.values[iid]
+
+    def rows(self):
+        return [self.values[iid] for iid in self.order]
+
+
+def synced(*rows):
+    tree = FakeTree()
+    sync = TreeSync(tree)
+    sync.apply(rows)
+    return tree, sync
+
+
+def test_apply_inserts_rows_in_order():
+    tree, _ = synced((1, "a"), (2, "b"), (3, "c"))
+    assert tree.order == ["1", "2", "3"]
+    assert tree.rows() == [(1, "a"), (2, "b"), (3, "c")]
+
+def test_unchanged_rows_cost_no_tk_calls():
+    tree, sync = synced((1, "a"), (2, "b"))
+    tree.calls = 0
+    counts = sync.apply([(1, "a"), (2, "b")])
+    assert tree.calls == 0
+    assert counts == {'inserted': 0, 'updated': 0, 'deleted': 0, 'moved': 0}
+
+def test_apply_reorders_updates_and_deletes():
+    tree, sync = synced((1, "a"), (2, "b"), (3, "c"), (4, "d"))
+    counts = sync.apply([(3, "c"), (1, "A"), (5, "e"), (4, "d")])
+    assert tree.order == ["3", "1", "5", "4"]
+    assert tree.rows() == [(3, "c"), (1, "A"), (5, "e"), (4, "d")]
+    assert counts['deleted'] == 1 and counts['inserted'] == 1 and counts['updated'] == 1
+    assert counts['moved'] >= 1
+
+def test_apply_empty_clears_the_tree():
+    tree, sync = synced((1, "a"), (2, "b"))
+    assert sync.apply([])['deleted'] == 2
+    assert tree.order == []
+
+def test_upsert_updates_in_place_and_appends_new_rows():
+    tree, sync = synced((1, "a"), (2, "b"))
+    sync.upsert((1, "A"))
+    sync.upsert((7, "g"))
+    assert tree.order == ["1", "2", "7"]
+    assert tree.rows()[0] == (1, "A")
+
+def test_upsert_at_sorted_index_keeps_key_order():
+    tree, sync = synced((1, "a"), (4, "d"), (9, "i"))
+    sync.upsert((5, "e"), sync.sorted_index(5))
+    sync.upsert((0, "z"), sync.sorted_index(0))
+    assert tree.order == ["0", "1", "4", "5", "9"]
+
+def test_delete_ignores_missing_keys_and_forgets_values():
+    tree, sync = synced((1, "a"), (2, "b"))
+    sync.delete(2, 99)
+    assert tree.order == ["1"]
+    sync.apply([(1, "a"), (2, "b")])  # Re-added rows are written again
+    assert tree.rows() == [(1, "a"), (2, "b")]
+
+def test_clear_then_apply_rewrites_every_row():
+    tree, sync = synced((1, "a"))
+    sync.clear()
+    assert tree.order == []
+    assert sync.apply([(1, "a")])['inserted'] == 1
@@ -0,0 +1,338 @@
+"""Treeview helpers for large tables.
+
+TreeSync reconciles a Treeview against a fresh result set by primary key and
+only issues the insert/update/delete/move calls for rows that changed, so
+selection and scroll position survive a refresh.
+
+PagedTreeview shows a table through a sliding window of keyset-paginated
+pages: rows are fetched on the primary key as the user scrolls, and rows that
+fall outside the window are evicted, so memory and render time stay flat no
+matter how large the table grows.
+"""
+import bisect
+import tkinter as tk
+from tkinter import ttk
+
+from sql_util import in_clause
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_MAX_PAGES = 3      # Pages kept in the widget at once
+EDGE_FRACTION = 0.1        # Fetch more when the view is this close to either end
+
+
+# --- QUERIES (run on DB worker threads) ---
+
+def fetch_page(conn, table, columns, key_col, after=None, before=None, limit=DEFAULT_PAGE_SIZE, inclusive=False):
+    """Returns up to `limit` rows ordered by key_col, starting after/before the given key.
+
+    Table and column names come from code, never from user input.
+    """
+    col_list = ", ".join(columns)
+    params = []
+    where = ""
+    descending = before is not None
+    if after is not None:
+        where = f"WHERE {key_col} {'>=' if inclusive else '>'} %s"
+        params.append(after)
+    elif before is not None:
+        where = f"WHERE {key_col} < %s"
+        params.append(before)
+    order = "DESC" if descending else "ASC"
+    query = f"SELECT {col_list} FROM {table} {where} ORDER BY {key_col} {order} LIMIT %s"
+    params.append(limit)
+
+    cursor = conn.cursor()
+    cursor.execute(query, tuple(params))
+    rows = cursor.fetchall()
+    if descending:
+        rows.reverse()
+    return rows
+
+def fetch_rows_by_key(conn, table, columns, key_col, keys):
+    """Re-reads specific rows by primary key (used for delta sync)."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {key_col} IN ({in_clause(keys)}) ORDER BY {key_col}",
+                   tuple(keys))
+    return cursor.fetchall()
+
+def fetch_row_count(conn, table):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+# --- RECONCILIATION ---
+
+class TreeSync:
+    """Keeps a Treeview in step with result sets, keyed on one column.
+
+    Item iids are the string form of the key. The last values written for
+    each row are remembered so unchanged rows cost no Tk calls at all.
+    """
+
+    def __init__(self, tree, key_index=0):
+        self.tree = tree
+        self.key_index = key_index
+        self._values = {}  # iid -> values tuple as last written
+
+    def apply(self, rows):
+        """Makes the tree show exactly `rows`, in order. Returns change counts."""
+        tree = self.tree
+        new_iids = [str(row[self.key_index]) for row in rows]
+        new_set = set(new_iids)
+        counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'moved': 0}
+
+        current = list(tree.get_children())
+        stale = [iid for iid in current if iid not in new_set]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale:
+                self._values.pop(iid, None)
+            current = [iid for iid in current if iid in new_set]
+            counts['deleted'] = len(stale)
+
+        present = set(current)
+        for index, (iid, row) in enumerate(zip(new_iids, rows)):
+            values = tuple(row)
+            if iid not in present:
+                tree.insert("", index, iid=iid, values=values)
+                current.insert(index, iid)
+                present.add(iid)
+                counts['inserted'] += 1
+            else:
+                if index >= len(current) or current[index] != iid:
+                    tree.move(iid, "", index)
+                    current.remove(iid)
+                    current.insert(index, iid)
+                    counts['moved'] += 1
+                if self._values.get(iid) != values:
+                    tree.item(iid, values=values)
+                    counts['updated'] += 1
+            self._values[iid] = values
+        return counts
+
+    def upsert(self, row, index=tk.END):
+        """Inserts or updates a single row without touching the others."""
+        iid = str(row[self.key_index])
+        values = tuple(row)
+        if self.tree.exists(iid):
+            if self._values.get(iid) != values:
+                self.tree.item(iid, values=values)
+        else:
+            self.tree.insert("", index, iid=iid, values=values)
+        self._values[iid] = values
+
+    def sorted_index(self, key):
+        """Position that keeps a tree ordered by its integer key (for upsert of a new row)."""
+        return bisect.bisect_left([int(iid) for iid in self.tree.get_children()], key)
+
+    def delete(self, *keys):
+        iids = [str(key) for key in keys if self.tree.exists(str(key))]
+        if iids:
+            self.tree.delete(*iids)
+        for key in keys:
+            self._values.pop(str(key), None)
+
+    def clear(self):
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._values.clear()
+
+
+# --- WIDGET ---
+
+class PagedTreeview(ttk.Frame):
+    """A Treeview that loads `table` in keyset-paginated windows as it scrolls.
+
+    run_db(key, work, *args, on_success=..., on_error=...) runs `work` off the UI thread and
+    calls back on it (QuickCommerceApp.run_db). The first column must be the
+    table's primary key. The inner Treeview is exposed as `.tree`.
+    """
+
+    def __init__(self, parent, run_db, table, columns, page_size=DEFAULT_PAGE_SIZE,
+                 max_pages=DEFAULT_MAX_PAGES, **tree_options):
+        super().__init__(parent)
+        self.run_db = run_db
+        self.table = table
+        self.columns = tuple(columns)
+        self.key_col = self.columns[0]
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+
+        self._keys = []            # Primary keys of the loaded rows, in display order
+        self._has_before = False
+        self._has_after = True
+        self._loading = False
+        self._total = None
+
+        body = ttk.Frame(self)
+        body.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(body, columns=self.columns, show="headings", **tree_options)
+        for col in self.columns:
+            self.tree.heading(col, text=col)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+        self.tree.pack(side=tk.LEFT, fill="both", expand=True)
+        self.sync = TreeSync(self.tree)
+        self.scrollbar.pack(side=tk.RIGHT, fill="y")
+
+        self.status_label = ttk.Label(self, text="", font=("Arial", 9, "italic"))
+        self.status_label.pack(anchor="w")
+
+    # --- Public API ---
+
+    def reload(self):
+        """Jumps back to the first page and refreshes the total count."""
+        self._keys = []
+        self._has_before = False
+        self._has_after = True
+        self._request(self._apply_reload, after=None)
+        self.refresh_count()
+
+    def refresh(self):
+        """Re-fetches the rows in the current window, keeping the scroll position."""
+        if not self._keys:
+            self.reload()
+            return
+        limit = max(len(self._keys), self.page_size)
+        self._request(self._apply_refresh, after=self._keys[0], limit=limit, inclusive=True)
+        self.refresh_count()
+
+    def fetch_rows(self, conn, keys):
+        """Re-reads rows by key for delta sync. Runs on a worker thread."""
+        return fetch_rows_by_key(conn, self.table, self.columns, self.key_col, keys)
+
+    def apply_delta(self, rows, deleted_keys):
+        """Patches the window with changed rows and deletions from delta sync."""
+        loaded = set(self._keys)
+        gone = {key for key in deleted_keys if key in loaded}
+        if gone:
+            self.sync.delete(*gone)
+            self._keys = [key for key in self._keys if key not in gone]
+
+        # Deletions, new rows and rows outside the window may change the total.
+        count_changed = bool(deleted_keys)
+        for row in rows:
+            key = row[0]
+            if key in loaded:
+                self.sync.upsert(row)
+                continue
+            count_changed = True
+            at_end = not self._keys or key > self._keys[-1]
+            if (at_end and not self._has_after) or (self._keys and self._keys[0] < key < self._keys[-1]):
+                index = bisect.bisect_left(self._keys, key)
+                self.sync.upsert(row, index)
+                self._keys.insert(index, key)
+        self._evict(from_top=False)
+        if count_changed:
+            self.refresh_count()
+        else:
+            self._update_status()
+
+    def refresh_count(self):
+        self.run_db(f"{self.table}:count", fetch_row_count, self.table,
+                    on_success=self._apply_count, error_prefix=f"Failed to count {self.table} rows")
+
+    # --- Fetching ---
+
+    def _request(self, on_rows, after=None, before=None, limit=None, inclusive=False):
+        self._loading = True
+
+        def on_success(rows):
+            self._loading = False
+            on_rows(rows)
+
+        def on_error(err):
+            self._loading = False  # Scrolling to the edge again retries the page
+
+        # One key per widget: a reload supersedes any in-flight page fetch.
+        self.run_db(f"{self.table}:page", fetch_page, self.table, self.columns, self.key_col,
+                    after, before, limit or self.page_size, inclusive,
+                    on_success=on_success, on_error=on_error, error_prefix=f"Failed to fetch {self.table} rows")
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._loading or not self._keys:
+            return
+        first, last = float(first), float(last)
+        if last >= 1.0 - EDGE_FRACTION and self._has_after:
+            self._request(self._apply_next, after=self._keys[-1])
+        elif first <= EDGE_FRACTION and self._has_before:
+            self._request(self._apply_prev, before=self._keys[0])
+
+    # --- Applying results (Tk thread) ---
+
+    def _apply_reload(self, rows):
+        self.sync.apply(rows)
+        self._keys = [row[0] for row in rows]
+        self._has_after = len(rows) == self.page_size
+        self.tree.yview_moveto(0)
+        self._update_status()
+
+    def _apply_refresh(self, rows):
+        # Only changed rows are touched, so selection and scroll position survive.
+        self.sync.apply(rows)
+        self._keys = [row[0] for row in rows]
+        self._update_status()
+
+    def _apply_next(self, rows):
+        self._has_after = len(rows) == self.page_size
+        if not rows:
+            return
+        top_index = self._top_index()
+        self._append(rows)
+        evicted = self._evict(from_top=True)
+        self._restore_top(top_index - evicted)
+        self._update_status()
+
+    def _apply_prev(self, rows):
+        self._has_before = len(rows) == self.page_size
+        if not rows:
+            return
+        top_index = self._top_index()
+        for index, row in enumerate(rows):
+            self.sync.upsert(row, index)
+        self._keys[0:0] = [row[0] for row in rows]
+        self._evict(from_top=False)
+        self._restore_top(top_index + len(rows))
+        self._update_status()
+
+    def _apply_count(self, total):
+        self._total = total
+        self._update_status()
+
+    def _append(self, rows):
+        for row in rows:
+            self.sync.upsert(row)
+        self._keys.extend(row[0] for row in rows)
+
+    def _evict(self, from_top):
+        """Drops rows beyond max_rows from one end of the window; returns how many."""
+        excess = len(self._keys) - self.max_rows
+        if excess <= 0:
+            return 0
+        if from_top:
+            dropped, self._keys = self._keys[:excess], self._keys[excess:]
+            self._has_before = True
+        else:
+            dropped, self._keys = self._keys[-excess:], self._keys[:-excess]
+            self._has_after = True
+        self.sync.delete(*dropped)
+        return excess
+
+    def _top_index(self):
+        return int(round(self.tree.yview()[0] * len(self._keys)))
+
+    def _restore_top(self, index):
+        if self._keys:
+            index = min(max(index, 0), len(self._keys) - 1)
+            self.tree.yview_moveto(index / len(self._keys))
+
+    def _update_status(self):
+        total = "?" if self._total is None else f"{self._total:,}"
+        if self._keys:
+            text = f"Showing {len(self._keys):,} loaded rows ({self._keys[0]} to {self._keys[-1]}) of {total}"
+        else:
+            text = f"No rows loaded of {total}"
+        self.status_label.config(text=text)